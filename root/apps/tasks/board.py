@@ -0,0 +1,60 @@
+# apps/tasks/board.py
+from django.conf import settings
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from root.utils.pagination import KeysetPaginator
+
+from .models import Task
+
+# board columns, left to right
+BOARD_COLUMNS = Task.STATUS_CHOICES
+
+# same order as the task list, so a column's cursor is a task list cursor
+board_paginator = KeysetPaginator(
+    ordering=("-created_at", "-id"),
+    page_size=getattr(settings, "TASK_BOARD_COLUMN_SIZE", 20),
+    max_page_size=getattr(settings, "TASK_BOARD_MAX_COLUMN_SIZE", 100),
+)
+
+
+def _window_ordering():
+    return [
+        F(field).desc() if name.startswith("-") else F(field).asc()
+        for name, field in zip(board_paginator.ordering, board_paginator.fields)
+    ]
+
+
+def board_columns(queryset, columns, limit):
+    """
+    {status: (rows, total)}: the first `limit` rows of every status column in
+    board order, and each column's total, in one query. ROW_NUMBER() and
+    COUNT(*) windows partitioned by status are computed over the project's
+    tasks, then filtered on the rank; task_project_status_idx serves the scan.
+    Statuses outside BOARD_COLUMNS are left out.
+    """
+    ranked = (
+        queryset
+        .filter(status__in=[value for value, _ in BOARD_COLUMNS])
+        .annotate(
+            board_rank=Window(RowNumber(), partition_by=[F("status")], order_by=_window_ordering()),
+            board_total=Window(Count("*"), partition_by=[F("status")]),
+        )
+        .filter(board_rank__lte=limit)
+        .order_by("status", "board_rank")
+        .values(*columns, "status", "board_rank", "board_total")
+    )
+    board = {value: ([], 0) for value, _ in BOARD_COLUMNS}
+    for row in ranked:
+        rows, _ = board[row["status"]]
+        rows.append(row)
+        board[row["status"]] = (rows, row["board_total"])
+    return board
+
+
+def column_cursor(rows, total):
+    """Cursor after the last of a column's first rows, or None if it holds them all."""
+    if not rows or len(rows) >= total:
+        return None
+    last = rows[-1]
+    return board_paginator.encode_cursor([last[field] for field in board_paginator.fields])
@@ -0,0 +1,158 @@
+# apps/tasks/consumers.py
+import asyncio
+import time
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from apps.project.models import Project
+from apps.tenants.cache import get_organization
+from apps.tenants.membership import resolve_membership
+from .realtime import DIFF_MESSAGE_TYPE, task_group
+
+# close codes sent after accepting, so browsers can tell the reasons apart
+CLOSE_UNAUTHENTICATED = 4401  # missing, invalid or expired access token
+CLOSE_FORBIDDEN = 4403        # not an active member of the organization
+CLOSE_NOT_FOUND = 4404        # no such project in the organization
+
+# Sec-WebSocket-Protocol the client offers with its token, e.g.
+# new WebSocket(url, ["access_token", token]); the server selects it
+TOKEN_SUBPROTOCOL = "access_token"
+
+
+class SocketRejected(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+def authorize(raw_token, org_id, project_id):
+    """
+    Check a socket's access token and project; returns (organization, user,
+    token) or raises SocketRejected. org_id defaults to the token's org_id claim.
+    """
+    authentication = JWTAuthentication()
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user = authentication.get_user(token)
+    except (InvalidToken, AuthenticationFailed):
+        raise SocketRejected(CLOSE_UNAUTHENTICATED)
+
+    organization = get_organization(org_id or token.get("org_id"))
+    if organization is None:
+        raise SocketRejected(CLOSE_FORBIDDEN)
+    membership = resolve_membership(organization, user, token)
+    if not (membership and membership.is_active):
+        raise SocketRejected(CLOSE_FORBIDDEN)
+    if not Project.objects.filter(pk=project_id, organization=organization).exists():
+        raise SocketRejected(CLOSE_NOT_FOUND)
+    return organization, user, token
+
+
+def is_still_member(organization, user, token):
+    membership = resolve_membership(organization, user, token)
+    return bool(membership and membership.is_active)
+
+
+def _offered_token(subprotocols):
+    """The token offered after TOKEN_SUBPROTOCOL in the handshake, or ""."""
+    if TOKEN_SUBPROTOCOL in subprotocols[:-1]:
+        return subprotocols[subprotocols.index(TOKEN_SUBPROTOCOL) + 1]
+    return ""
+
+
+class TaskBoardConsumer(AsyncWebsocketConsumer):
+    """
+    ws/tasks/<project_id>/[?org_id=<organization>], offering the subprotocols
+    ["access_token", <access token>]
+
+    Streams the project's task changes as compact JSON diffs
+    (apps/tasks/realtime.py) instead of clients polling the task list. The
+    token is the same JWT access token the API takes; it rides in
+    Sec-WebSocket-Protocol rather than the URL so it stays out of access logs.
+    Every TASK_BOARD_AUTH_RECHECK_INTERVAL seconds the membership is checked
+    again: the socket is closed with 4403 once it is revoked, and with 4401
+    once the token expires, and the client reconnects with a fresh one.
+    Send "ping" to get "pong".
+    """
+
+    group_name = None
+    recheck = None
+
+    async def connect(self):
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        subprotocols = self.scope.get("subprotocols") or []
+        raw_token = _offered_token(subprotocols)
+        org_id = (params.get("org_id") or [None])[0]
+        project_id = self.scope["url_route"]["kwargs"]["project_id"]
+        # browsers fail a handshake that offered subprotocols but got none back,
+        # which would hide the close code
+        subprotocol = TOKEN_SUBPROTOCOL if TOKEN_SUBPROTOCOL in subprotocols else None
+
+        try:
+            organization, user, token = await database_sync_to_async(authorize)(raw_token, org_id, project_id)
+        except SocketRejected as rejected:
+            await self.accept(subprotocol)
+            await self.close(code=rejected.code)
+            return
+
+        self.organization, self.user, self.token = organization, user, token
+        self.expires_at = token.get("exp")
+        self.group_name = task_group(organization.pk, project_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept(subprotocol)
+        self.recheck = asyncio.ensure_future(self.recheck_access())
+
+    async def disconnect(self, code):
+        if self.recheck is not None:
+            self.recheck.cancel()
+        if self.group_name is not None:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def recheck_access(self):
+        """Close the socket once the token expires or the membership is revoked."""
+        interval = getattr(settings, "TASK_BOARD_AUTH_RECHECK_INTERVAL", 15)
+        while True:
+            delay = interval
+            if self.expires_at is not None:
+                delay = max(0.0, min(delay, self.expires_at - time.time()))
+            await asyncio.sleep(delay)
+            if self.expires_at is not None and time.time() >= self.expires_at:
+                await self.revoke(CLOSE_UNAUTHENTICATED)
+                return
+            if not await database_sync_to_async(is_still_member)(self.organization, self.user, self.token):
+                await self.revoke(CLOSE_FORBIDDEN)
+                return
+
+    async def revoke(self, code):
+        """Stop the diffs right away, then close with `code`."""
+        if self.group_name is not None:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            self.group_name = None
+        await self.close(code=code)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data == "ping":
+            await self.send(text_data="pong")
+
+    async def dispatch(self, message):
+        # Channels runs close_old_connections() on the single sync thread before
+        # every handler; with many sockets that hop serializes the whole fan-out.
+        # Diff pushes never touch the database, so they skip it.
+        if message["type"] == DIFF_MESSAGE_TYPE:
+            await self.task_diff(message)
+        else:
+            await super().dispatch(message)
+
+    async def task_diff(self, event):
+        if self.group_name is None:  # revoked, diffs still queued
+            return
+        if self.expires_at is not None and time.time() >= self.expires_at:
+            await self.revoke(CLOSE_UNAUTHENTICATED)
+            return
+        # already encoded once by the sender for every socket in the group
+        await self.send(text_data=event["text"])
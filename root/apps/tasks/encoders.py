@@ -0,0 +1,171 @@
+# apps/tasks/encoders.py
+from rest_framework import serializers
+from rest_framework.settings import api_settings, ISO_8601
+
+from apps.project.models import Project
+from apps.users.serializers import UserSummarySerializer
+
+from .serializers import TaskCommentSerializer, TaskSerializer
+
+
+def _identity(value):
+    return value
+
+
+def _none_safe(convert):
+    # DRF's Serializer.to_representation emits None without calling the field
+    def wrapper(value):
+        return None if value is None else convert(value)
+    return wrapper
+
+
+def _iso_datetime(field):
+    # DateTimeField.to_representation with the timezone lookup hoisted out of
+    # the per-row path (it goes through asgiref locals); odd values fall back.
+    fallback = field.to_representation
+
+    def convert(value, tz):
+        if value is None:
+            return None
+        if tz is None or getattr(value, "tzinfo", None) is None:
+            return fallback(value)
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    convert.needs_timezone = True
+    return convert
+
+
+def _iso_date(value):
+    return None if value is None else value.isoformat()
+
+
+def _field_timezone(field):
+    return field.timezone if hasattr(field, "timezone") else field.default_timezone()
+
+
+def _converter_for(field):
+    """
+    Specialized replacement for field.to_representation on a .values() value.
+    Falls back to the field's own to_representation for anything not listed.
+    """
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and not field.pk_field:
+        return _identity  # .values() already yields the FK id
+    if isinstance(field, serializers.UUIDField) and field.uuid_format == "hex_verbose":
+        return _none_safe(str)
+    if isinstance(field, (serializers.ChoiceField, serializers.CharField, serializers.BooleanField)):
+        # values come back from the DB already as str / bool
+        return _identity
+    if isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if output_format and output_format.lower() == ISO_8601:
+            return _iso_datetime(field)
+    if isinstance(field, serializers.DateField):
+        output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+        if output_format and output_format.lower() == ISO_8601:
+            return _iso_date
+    return _none_safe(field.to_representation)
+
+
+class ValuesEncoder:
+    """
+    Precompiled encoder turning .values() rows into exactly what
+    serializer_class(instance).data would render, without building model
+    instances or walking the serializer per row.
+
+    ``fields`` is the list to pass to QuerySet.values(); ``encode(row)`` and
+    ``encode_many(rows)`` produce the representation dicts. ``only(names)``
+    returns an encoder restricted to a subset of the output fields.
+    """
+
+    def __init__(self, serializer_class, field_names=None):
+        self.serializer_class = serializer_class
+        serializer_fields = serializer_class().fields
+        readable = [
+            f for f in serializer_fields.values()
+            if not f.write_only and (field_names is None or f.field_name in field_names)
+        ]
+        for field in readable:
+            if field.source == "*" or "." in field.source:
+                raise ValueError(f"{serializer_class.__name__}.{field.field_name}: only plain model fields can be read from .values()")
+
+        self.field_names = tuple(f.field_name for f in readable)
+        self.fields = tuple(f.source for f in readable)
+        self._subsets = {}
+        self._datetime_fields = []
+        namespace = {}
+        items = []
+        for index, field in enumerate(readable):
+            converter = _converter_for(field)
+            key, value = repr(field.field_name), f"row[{field.source!r}]"
+            if converter is _identity:
+                items.append(f"{key}: {value}")
+                continue
+            namespace[f"_c{index}"] = converter
+            if getattr(converter, "needs_timezone", False):
+                # timezone resolved once per call and passed in as tz[n]
+                items.append(f"{key}: _c{index}({value}, tz[{len(self._datetime_fields)}])")
+                self._datetime_fields.append(field)
+            else:
+                items.append(f"{key}: _c{index}({value})")
+
+        source = "def encode(row, tz):\n    return {" + ", ".join(items) + "}\n"
+        exec(compile(source, f"<{serializer_class.__name__} values encoder>", "exec"), namespace)
+        self._encode = namespace["encode"]
+
+    def only(self, field_names):
+        """Encoder for a subset of the output fields (compiled once per subset)."""
+        key = frozenset(field_names)
+        if key not in self._subsets:
+            self._subsets[key] = ValuesEncoder(self.serializer_class, key)
+        return self._subsets[key]
+
+    def _timezones(self):
+        return [_field_timezone(field) for field in self._datetime_fields]
+
+    def encode(self, row):
+        return self._encode(row, self._timezones())
+
+    def encode_many(self, rows):
+        encode, tz = self._encode, self._timezones()
+        return [encode(row, tz) for row in rows]
+
+
+class RelatedValuesEncoder:
+    """
+    Inlines a forward FK (?expand=) from the same .values() query: the related
+    columns are selected as ``<relation>__<column>`` (one JOIN, no extra query
+    per row) and encoded with ``serializer_class``. A null FK expands to None.
+    """
+
+    def __init__(self, relation, serializer_class):
+        self.relation = relation
+        self.encoder = ValuesEncoder(serializer_class)
+        self._columns = tuple((f"{relation}__{name}", name) for name in self.encoder.fields)
+        self.fields = tuple(prefixed for prefixed, _ in self._columns)
+        self._pk = f"{relation}__{serializer_class.Meta.model._meta.pk.name}"
+
+    def expand_many(self, rows, encoded):
+        """Replace ``encoded[i][relation]`` with the nested object for rows[i]."""
+        encode, tz = self.encoder._encode, self.encoder._timezones()
+        columns, pk, relation = self._columns, self._pk, self.relation
+        for row, item in zip(rows, encoded):
+            if row[pk] is None:
+                item[relation] = None
+            else:
+                item[relation] = encode({name: row[prefixed] for prefixed, name in columns}, tz)
+        return encoded
+
+
+class ProjectSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = [f.name for f in Project._meta.concrete_fields]
+
+
+task_values_encoder = ValuesEncoder(TaskSerializer)
+comment_values_encoder = ValuesEncoder(TaskCommentSerializer)
+
+task_expansions = {
+    "assigned_to": RelatedValuesEncoder("assigned_to", UserSummarySerializer),
+    "project": RelatedValuesEncoder("project", ProjectSummarySerializer),
+}
@@ -0,0 +1,71 @@
+# apps/tasks/management/commands/bench_envelope.py
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.tasks.models import Task
+from apps.tasks.serializers import TaskSerializer
+from root.utils.custom_response import build_envelope
+from root.utils.renderers import ORJSONRenderer
+
+
+def legacy_envelope(message, meta, status_code, request):
+    # the envelope as success_response built it before build_envelope()
+    return {
+        "message": message,
+        "meta": meta if meta else {},
+        "error": None,
+        "status_code": status_code,
+        "success": True,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "request_id": str(uuid.uuid4()),
+        "path": request.path,
+        "method": request.method,
+        "version": "v1",
+    }
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark: envelope + JSON rendering of a task list (stock JSONRenderer vs orjson)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        now = datetime.now(timezone.utc)
+        org_id, project_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        tasks = [
+            Task(
+                id=uuid.uuid4(), title=f"Task {i}", description="Lorem ipsum dolor sit amet " * 4,
+                priority=Task.PRIORITY_MEDIUM, status=Task.STATUS_TODO,
+                due_date=(now + timedelta(days=i % 30)).date(),
+                project_id=project_id, organization_id=org_id,
+                assigned_to_id=user_id, created_by_id=user_id,
+                created_at=now - timedelta(minutes=i), updated_at=now,
+            )
+            for i in range(options["tasks"])
+        ]
+        data = TaskSerializer(tasks, many=True).data
+        request = APIRequestFactory().get(f"/tasks/{project_id}/", HTTP_X_REQUEST_ID="bench")
+
+        stock, fast = JSONRenderer(), ORJSONRenderer()
+
+        def run_legacy():
+            stock.render(legacy_envelope("Tasks fetched", data, 200, request))
+
+        def run_fast():
+            fast.render(build_envelope("Tasks fetched", data, None, 200, request, success=True))
+
+        repeat = options["repeat"]
+        legacy_s = min(timeit.repeat(run_legacy, number=repeat, repeat=3)) / repeat
+        fast_s = min(timeit.repeat(run_fast, number=repeat, repeat=3)) / repeat
+
+        self.stdout.write(f"{options['tasks']} tasks, best of 3 x {repeat} runs")
+        self.stdout.write(f"  legacy envelope + JSONRenderer : {legacy_s * 1000:8.3f} ms/response")
+        self.stdout.write(f"  build_envelope + ORJSONRenderer: {fast_s * 1000:8.3f} ms/response")
+        self.stdout.write(f"  speedup: {legacy_s / fast_s:.1f}x")
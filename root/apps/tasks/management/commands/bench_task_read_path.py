@@ -0,0 +1,108 @@
+# apps/tasks/management/commands/bench_task_read_path.py
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.tasks.encoders import task_values_encoder
+from apps.tasks.models import Task
+from apps.tasks.serializers import TaskSerializer
+from root.utils.renderers import ORJSONRenderer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark TaskSerializer vs the precompiled .values() encoder on N rows "
+        "and check that both render byte-for-byte identical JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--db", action="store_true",
+            help="Also time the query: insert rows in a transaction (rolled back) and "
+                 "fetch model instances vs .values() from the configured database.",
+        )
+
+    def _best(self, fn, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    def _make_tasks(self, rows):
+        now = datetime.now(timezone.utc)
+        org_id, project_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        return [
+            Task(
+                id=uuid.uuid4(), title=f"Task {i}", description="Lorem ipsum dolor sit amet " * 4,
+                priority=Task.PRIORITY_HIGH, status=Task.STATUS_IN_PROGRESS,
+                due_date=(now + timedelta(days=i % 30)).date() if i % 3 else None,
+                project_id=project_id, organization_id=org_id,
+                assigned_to_id=user_id if i % 2 else None, created_by_id=user_id,
+                is_archived=False, created_at=now - timedelta(seconds=i), updated_at=now,
+            )
+            for i in range(rows)
+        ]
+
+    def _report(self, label, slow, fast):
+        self.stdout.write(f"  {label}")
+        self.stdout.write(f"    TaskSerializer(many=True) : {slow * 1000:9.1f} ms")
+        self.stdout.write(f"    values() + encoder        : {fast * 1000:9.1f} ms")
+        self.stdout.write(f"    speedup: {slow / fast:.1f}x")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        renderer = ORJSONRenderer()
+        tasks = self._make_tasks(rows)
+        value_rows = [{name: getattr(t, Task._meta.get_field(name).attname) for name in task_values_encoder.fields} for t in tasks]
+
+        slow_bytes = renderer.render(TaskSerializer(tasks, many=True).data)
+        fast_bytes = renderer.render(task_values_encoder.encode_many(value_rows))
+        if slow_bytes != fast_bytes:
+            raise CommandError("encoder output differs from TaskSerializer output")
+
+        self.stdout.write(f"{rows} rows, best of {repeat}; rendered JSON identical ({len(fast_bytes)} bytes)")
+        self._report(
+            "serialize + render",
+            self._best(lambda: renderer.render(TaskSerializer(tasks, many=True).data), repeat),
+            self._best(lambda: renderer.render(task_values_encoder.encode_many(value_rows)), repeat),
+        )
+
+        if options["db"]:
+            self._bench_db(tasks, repeat, renderer)
+
+    def _bench_db(self, tasks, repeat, renderer):
+        from apps.project.models import Project
+        from apps.tenants.models import Organization
+
+        try:
+            with transaction.atomic():
+                org = Organization.objects.create(name="bench", slug=f"bench-{uuid.uuid4().hex[:8]}")
+                project = Project.objects.create(name="bench", organization=org)
+                for t in tasks:
+                    t.organization_id, t.project_id = org.pk, project.pk
+                    t.assigned_to_id = t.created_by_id = None
+                Task.objects.bulk_create(tasks, batch_size=1000)
+                qs = Task.objects.filter(project=project, organization=org, is_archived=False)
+
+                self._report(
+                    "query + serialize + render",
+                    self._best(lambda: renderer.render(TaskSerializer(list(qs), many=True).data), repeat),
+                    self._best(lambda: renderer.render(
+                        task_values_encoder.encode_many(qs.values(*task_values_encoder.fields))
+                    ), repeat),
+                )
+                raise _Rollback
+        except _Rollback:
+            pass
@@ -0,0 +1,140 @@
+# apps/tasks/management/commands/loadtest_task_board.py
+import asyncio
+import time
+import uuid
+
+import orjson
+from channels.layers import DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer, channel_layers
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.project.models import Project
+from apps.tasks.consumers import TOKEN_SUBPROTOCOL
+from apps.tasks.realtime import DIFF_MESSAGE_TYPE, encode_diffs, task_group
+from apps.tenants.membership import add_org_claims
+from apps.tenants.models import OrganizationMembership
+
+
+class LoadTestChannelLayer(InMemoryChannelLayer):
+    """
+    InMemoryChannelLayer sweeps every channel and group for expired messages
+    on each receive(), which costs O(sockets) per delivered message; with
+    1000 sockets that sweep, not the consumers, dominates the run. Sweep at
+    most once a second instead (the Redis layer has no such sweep).
+    """
+
+    _swept_at = 0.0
+
+    def _clean_expired(self):
+        now = time.monotonic()
+        if now - self._swept_at >= 1.0:
+            self._swept_at = now
+            super()._clean_expired()
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the task board WebSocket (ws/tasks/<project>/) in-process: "
+        "open many concurrent sockets through the ASGI application on the "
+        "in-memory channel layer, push task diffs to the project group and "
+        "report handshake and fan-out latency. Needs an existing project and "
+        "a user who is an active member of its organization."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--project", required=True, help="Project id.")
+        parser.add_argument("--user", required=True, help="Username of an active member of the project's organization.")
+        parser.add_argument("--sockets", type=int, default=1000)
+        parser.add_argument("--messages", type=int, default=50, help="Diffs pushed to the group.")
+        parser.add_argument("--rate", type=float, default=20.0, help="Diffs per second.")
+        parser.add_argument("--connect-batch", type=int, default=100, help="Handshakes in flight at once.")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--origin", default="http://localhost", help="Origin header; must be in ALLOWED_HOSTS.")
+        parser.add_argument(
+            "--stock-layer", action="store_true",
+            help="Use channels' InMemoryChannelLayer as is (expiry sweep on every receive).",
+        )
+
+    def handle(self, *args, **options):
+        project = Project.objects.filter(pk=options["project"]).first()
+        user = get_user_model().objects.filter(username=options["user"]).first()
+        if project is None or user is None:
+            raise CommandError("Unknown project or user")
+        membership = OrganizationMembership.objects.filter(
+            user=user, organization_id=project.organization_id, is_active=True
+        ).first()
+        if membership is None:
+            raise CommandError("The user is not an active member of the project's organization")
+        token = str(add_org_claims(RefreshToken.for_user(user).access_token, membership))
+
+        # each socket's inbox must hold the whole burst if the consumers fall behind
+        layer_class = InMemoryChannelLayer if options["stock_layer"] else LoadTestChannelLayer
+        channel_layers.set(DEFAULT_CHANNEL_LAYER, layer_class(capacity=max(100, options["messages"] * 2)))
+        asyncio.run(self._run(project, token, options))
+
+    async def _run(self, project, token, options):
+        from root.asgi import application
+
+        path = f"/ws/tasks/{project.pk}/?org_id={project.organization_id}"
+        headers = [(b"origin", options["origin"].encode())]
+        sockets, connect_times = [], []
+
+        async def open_socket():
+            communicator = WebsocketCommunicator(
+                application, path, headers=headers, subprotocols=[TOKEN_SUBPROTOCOL, token],
+            )
+            started = time.perf_counter()
+            connected, _ = await communicator.connect(timeout=options["timeout"])
+            connect_times.append(time.perf_counter() - started)
+            if connected:
+                sockets.append(communicator)
+            else:
+                await communicator.disconnect()
+
+        started = time.perf_counter()
+        for first in range(0, options["sockets"], options["connect_batch"]):
+            batch = min(options["connect_batch"], options["sockets"] - first)
+            await asyncio.gather(*(open_socket() for _ in range(batch)))
+        connect_wall = time.perf_counter() - started
+        self.stdout.write(
+            f"{len(sockets)}/{options['sockets']} sockets open in {connect_wall:.2f}s | handshake "
+            f"p50 {_percentile(connect_times, 50) * 1000:.1f} ms p99 {_percentile(connect_times, 99) * 1000:.1f} ms"
+        )
+
+        latencies = []
+
+        async def read(communicator):
+            for _ in range(options["messages"]):
+                text = await communicator.receive_from(timeout=options["timeout"])
+                latencies.append(time.perf_counter() - orjson.loads(text)["sent"])
+
+        readers = [asyncio.ensure_future(read(communicator)) for communicator in sockets]
+        layer = channel_layers[DEFAULT_CHANNEL_LAYER]
+        group = task_group(project.organization_id, project.pk)
+        started = time.perf_counter()
+        for n in range(options["messages"]):
+            # the send timestamp rides in the diff, so latency is measured per socket
+            diff = {"op": "updated", "id": uuid.uuid4(), "updated_at": timezone.now(),
+                    "fields": {"title": f"load test {n}"}, "sent": time.perf_counter()}
+            await layer.group_send(group, {"type": DIFF_MESSAGE_TYPE, "text": encode_diffs([diff])})
+            await asyncio.sleep(max(0.0, started + (n + 1) / options["rate"] - time.perf_counter()))
+        results = await asyncio.gather(*readers, return_exceptions=True)
+        wall = time.perf_counter() - started
+
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        self.stdout.write(
+            f"{options['messages']} diffs x {len(sockets)} sockets: {len(latencies)} delivered in {wall:.2f}s "
+            f"({len(latencies) / wall:.0f} msgs/s), {failed} sockets fell behind | fan-out "
+            f"p50 {_percentile(latencies, 50) * 1000:.1f} ms p99 {_percentile(latencies, 99) * 1000:.1f} ms"
+        )
+        await asyncio.gather(*(communicator.disconnect() for communicator in sockets))
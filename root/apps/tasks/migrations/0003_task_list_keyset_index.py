@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0001_initial'),
+        ('tasks', '0002_taskcomment'),
+        ('tenants', '0004_organizationinvitation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'project', '-created_at', '-id'], name='task_list_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0001_initial'),
+        ('tasks', '0003_task_list_keyset_index'),
+        ('tenants', '0004_organizationinvitation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'project', 'status', '-created_at', '-id'], name='task_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'assigned_to', 'status'], name='task_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'due_date'], name='task_due_date_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:25
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_updated_at(apps, schema_editor):
+    # last real change instead of the migration time, so existing comments
+    # don't all look freshly changed to sync clients
+    TaskComment = apps.get_model("tasks", "TaskComment")
+    TaskComment.objects.update(updated_at=Coalesce("edited_at", "created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('project', '0001_initial'),
+        ('tasks', '0004_task_query_indexes'),
+        ('tenants', '0005_plan_webhook_limits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcomment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_comment_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'project', 'updated_at', 'id'], name='task_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['task', 'updated_at', 'id'], name='task_comment_sync_idx'),
+        ),
+    ]
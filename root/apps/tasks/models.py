@@ -64,10 +64,50 @@ class Task(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # project task list: equality on org/project, keyset on (created_at, id).
+            # is_archived stays out of the key: SQLite/Postgres compile is_archived=False
+            # to "NOT is_archived", which can't seek an index column and would force a sort.
+            models.Index(
+                fields=["organization", "project", "-created_at", "-id"],
+                name="task_list_keyset_idx",
+            ),
+            # status columns within a project (board / ?status= filters), newest first
+            models.Index(
+                fields=["organization", "project", "status", "-created_at", "-id"],
+                name="task_project_status_idx",
+            ),
+            # "my tasks": assignee across projects, optionally by status
+            models.Index(
+                fields=["organization", "assigned_to", "status"],
+                name="task_assignee_status_idx",
+            ),
+            # due / overdue tasks, range scans on due_date
+            models.Index(
+                fields=["organization", "due_date"],
+                name="task_due_date_idx",
+            ),
+            # delta sync (TaskChangesView): a project's rows past an (updated_at, id)
+            # cursor, archived ones included as tombstones
+            models.Index(
+                fields=["organization", "project", "updated_at", "id"],
+                name="task_sync_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # loaded column values, so task_post_save can tell whether a save changed
+        # anything its webhook payload reports (apps/tasks/signals.py)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return instance
+
 class TaskComment(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     task = models.ForeignKey('project.Project', on_delete=models.CASCADE, related_name='comments')
@@ -75,9 +115,14 @@ class TaskComment(models.Model):
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     edited_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # delta sync cursor
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # delta sync (TaskChangesView): a project's comments past an (updated_at, id) cursor
+            models.Index(fields=["task", "updated_at", "id"], name="task_comment_sync_idx"),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author} on {self.task}"
\ No newline at end of file
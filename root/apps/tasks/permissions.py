@@ -1,16 +1,13 @@
 from rest_framework import permissions
-from apps.tenants.models import OrganizationMembership
+from apps.tenants.membership import get_membership, ADMIN_ROLES
 
 class IsOrgMember(permissions.BasePermission):
     def has_permission(self, request, view):
         org = getattr(request, "organization", None)
         if not org or not request.user.is_authenticated:
             return False
-        return OrganizationMembership.objects.filter(
-            user=request.user,
-            organization=org,
-            is_active=True
-        ).exists()
+        membership = get_membership(request, org)
+        return bool(membership and membership.is_active)
 
 
 class IsOrgAdminOrOwner(permissions.BasePermission):
@@ -21,11 +18,11 @@ class IsOrgAdminOrOwner(permissions.BasePermission):
         org = getattr(request, "organization", None)
         user = request.user
 
+        if not org or not user.is_authenticated:
+            return False
+
         if org.owner_id == user.id:
             return True
 
-        try:
-            membership = OrganizationMembership.objects.get(user=user, organization=org)
-            return membership.role in ("admin", "owner")
-        except:
-            return False
+        membership = get_membership(request, org)
+        return bool(membership and membership.is_active and membership.role in ADMIN_ROLES)
@@ -0,0 +1,90 @@
+# apps/tasks/realtime.py
+import logging
+
+import orjson
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# group message type, handled by TaskBoardConsumer.task_diff
+DIFF_MESSAGE_TYPE = "task.diff"
+
+# model attribute -> name in a diff (the names build_task_payload uses)
+DIFF_FIELDS = {
+    "project_id": "project_id",
+    "title": "title",
+    "description": "description",
+    "status": "status",
+    "priority": "priority",
+    "assigned_to_id": "assigned_to",
+    "due_date": "due_date",
+}
+
+
+def task_group(org_id, project_id):
+    """Channel layer group of the sockets watching one project's tasks."""
+    return f"tasks.{org_id}.{project_id}"
+
+
+def task_diff(task, op, fields=None):
+    """
+    Compact diff of one task:
+        {"op": "created" | "updated" | "deleted", "id": ..., "updated_at": ..., "fields": {...}}
+    `fields` lists the changed model attributes; None sends all of them.
+    Deletes carry no fields.
+    """
+    diff = {"op": op, "id": task.pk, "updated_at": task.updated_at}
+    if op != "deleted":
+        names = DIFF_FIELDS if fields is None else [name for name in fields if name in DIFF_FIELDS]
+        diff["fields"] = {DIFF_FIELDS[name]: getattr(task, name) for name in names}
+    return diff
+
+
+def task_change_diffs(task, op, changed=None):
+    """
+    {project_id: [diff]} for one saved task. A task moved to another project
+    is a delete for the old project's board and a full create for the new one;
+    an unarchived task is a create.
+    """
+    if op == "updated" and changed and "is_archived" in changed and not task.is_archived:
+        op, changed = "created", None
+    if op == "updated" and changed and "project_id" in changed:
+        previous = getattr(task, "_loaded_values", {}).get("project_id")
+        if previous is not None and previous != task.project_id:
+            return {previous: [task_diff(task, "deleted")], task.project_id: [task_diff(task, "created")]}
+    return {task.project_id: [task_diff(task, op, changed)]}
+
+
+def encode_diffs(diffs):
+    """One wire message: a single diff, or {"op": "batch", "diffs": [...]}."""
+    payload = diffs[0] if len(diffs) == 1 else {"op": "batch", "diffs": diffs}
+    return orjson.dumps(payload, option=orjson.OPT_UTC_Z).decode()
+
+
+def broadcast(org_id, diffs_by_project):
+    """
+    Send {project_id: [diff, ...]} to the project groups once the current
+    transaction commits. Each message is encoded once here, not per socket.
+    Best effort: a channel layer outage is logged, and clients catch up on
+    their next list fetch.
+    """
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    messages = [
+        (task_group(org_id, project_id), encode_diffs(diffs))
+        for project_id, diffs in diffs_by_project.items() if diffs
+    ]
+    if not messages:
+        return
+
+    def send():
+        for group, text in messages:
+            try:
+                async_to_sync(layer.group_send)(group, {"type": DIFF_MESSAGE_TYPE, "text": text})
+            except Exception:
+                logger.exception("could not push task diffs to %s", group)
+
+    transaction.on_commit(send)
@@ -0,0 +1,8 @@
+# apps/tasks/routing.py
+from django.urls import path
+
+from .consumers import TaskBoardConsumer
+
+websocket_urlpatterns = [
+    path("ws/tasks/<uuid:project_id>/", TaskBoardConsumer.as_asgi(), name="task-board"),
+]
@@ -1,5 +1,7 @@
+import uuid
 from rest_framework import serializers
-from .models import Task
+from django.contrib.auth import get_user_model
+from .models import Task, TaskComment
 
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,3 +11,42 @@ class TaskSerializer(serializers.ModelSerializer):
             "id", "created_by", "created_at", "updated_at",
             "organization"
         ]
+
+
+class TaskCommentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskComment
+        fields = ["id", "task", "author", "body", "created_at", "edited_at", "updated_at"]
+        read_only_fields = fields
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PK field that resolves against objects prefetched into the serializer
+    context (context[context_key] = {str(pk): obj}) instead of one query per value.
+    """
+
+    def __init__(self, context_key, **kwargs):
+        self.context_key = context_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            key = str(uuid.UUID(str(data)))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        obj = self.context.get(self.context_key, {}).get(key)
+        if obj is None:
+            self.fail("does_not_exist", pk_value=data)
+        return obj
+
+
+class TaskBulkItemSerializer(TaskSerializer):
+    """
+    One item of a bulk create/update. The project comes from the URL and
+    assigned_to is checked against users prefetched for the whole batch.
+    """
+    project = serializers.PrimaryKeyRelatedField(read_only=True)
+    assigned_to = PrefetchedPrimaryKeyRelatedField(
+        "assignees", queryset=get_user_model().objects.all(), allow_null=True, required=False
+    )
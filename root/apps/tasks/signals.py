@@ -1,32 +1,80 @@
 # apps/tasks/signals.py
-from django.db.models.signals import post_save
-from django.db import transaction
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from .models import Task, TaskComment
+from .realtime import broadcast, task_change_diffs
+from apps.project.models import Project
+from apps.tenants.cache import bump_on_commit, tenant_scope
 from apps.webhooks.dispatcher import emit_event
 
 def build_task_payload(task: Task) -> dict:
     """Return a serializable representation of the task for webhook payloads."""
     return {
         "task_id": task.id,
-        "project_id": getattr(task.project, "id", None),
+        # use the FK ids directly; reading task.project/assigned_to costs a query each
+        "project_id": task.project_id,
         "title": task.title,
         "description": task.description,
         "status": task.status,
         "priority": getattr(task, "priority", None),
-        "assigned_to": getattr(task.assigned_to, "id", None),
+        "assigned_to": task.assigned_to_id,
         "due_date": task.due_date.isoformat() if task.due_date else None,
         "updated_at": task.updated_at.isoformat() if getattr(task, "updated_at", None) else None,
     }
 
+# Task columns behind build_task_payload (plus is_archived, which decides
+# task.deleted); updated_at is left out since every save bumps it.
+PAYLOAD_FIELDS = (
+    "project_id", "title", "description", "status", "priority", "assigned_to_id", "due_date", "is_archived",
+)
+
+_MISSING = object()
+
+
+def changed_payload_fields(task: Task) -> list:
+    """
+    PAYLOAD_FIELDS in which `task` differs from what was loaded from the
+    database. Tasks not loaded via a query report every field.
+    """
+    loaded = getattr(task, "_loaded_values", None)
+    if loaded is None:
+        return list(PAYLOAD_FIELDS)
+    changed = []
+    for name in PAYLOAD_FIELDS:
+        # read __dict__: a deferred field that was never set is unchanged, and
+        # getattr() would load it
+        current = task.__dict__.get(name, _MISSING)
+        if current is not _MISSING and loaded.get(name, _MISSING) != current:
+            changed.append(name)
+    return changed
+
+
+def was_archived(task: Task) -> bool:
+    """True if the save archived `task` (the soft delete of TaskDetailView.delete)."""
+    return task.is_archived and not getattr(task, "_loaded_values", {}).get("is_archived", False)
+
+
+def mark_saved(task: Task):
+    """Make the task's current payload fields the baseline for the next save."""
+    loaded = getattr(task, "_loaded_values", None)
+    if loaded is None:
+        loaded = task._loaded_values = {}
+    loaded.update((name, task.__dict__[name]) for name in PAYLOAD_FIELDS if name in task.__dict__)
+
+
+def task_event_key(task: Task) -> str:
+    return f"task:{task.pk}"
+
+
 def build_comment_payload(comment: TaskComment) -> dict:
     """Return a serializable representation of a comment for webhook payloads."""
     return {
         "comment_id": comment.id,
-        "task_id": getattr(comment.task, "id", None),
-        "user_id": getattr(comment.user, "id", None),
-        "comment": comment.comment,
+        "task_id": comment.task_id,
+        "user_id": comment.author_id,
+        "comment": comment.body,
         "created_at": comment.created_at.isoformat() if getattr(comment, "created_at", None) else None,
     }
 
@@ -35,14 +83,34 @@ def task_post_save(sender, instance: Task, created: bool, **kwargs):
     """
     Fires:
       - 'task.created' when created == True
-      - 'task.updated' for updates (created == False)
-    NOTE: uses transaction.on_commit to ensure webhook jobs only enqueue after commit.
+      - 'task.deleted' when the save archived the task
+      - 'task.updated' for other updates that change a payload field; saves that
+        change none of them emit nothing
+    Events of one task are coalesced in the outbox: updates wait
+    WEBHOOK_COALESCE_WINDOW seconds, and a burst of them (PATCHes while a user
+    types) produces one event with the final state.
+    The changed fields are also pushed to the project's task board sockets
+    (apps/tasks/realtime.py), without the coalescing delay.
+    NOTE: the event goes to the webhook outbox inside the caller's transaction, so
+    it is only relayed if the save commits (wrap the save in transaction.atomic).
     """
-    event = "task.created" if created else "task.updated"
-    payload = build_task_payload(instance)
-
-    # Use transaction.on_commit to avoid firing webhooks on failed transactions.
-    transaction.on_commit(lambda: emit_event(instance.project.organization, event, payload))
+    changed = None
+    if created:
+        event, delay = "task.created", 0
+    else:
+        changed = changed_payload_fields(instance)
+        if not changed:
+            return
+        if was_archived(instance):
+            event, delay = "task.deleted", 0
+        else:
+            event, delay = "task.updated", getattr(settings, "WEBHOOK_COALESCE_WINDOW", 2.0)
+    emit_event(
+        instance.organization_id, event, build_task_payload(instance),
+        coalesce_key=task_event_key(instance), delay=delay,
+    )
+    broadcast(instance.organization_id, task_change_diffs(instance, event.split(".", 1)[1], changed))
+    mark_saved(instance)
 
 @receiver(post_save, sender=TaskComment)
 def comment_post_save(sender, instance: TaskComment, created: bool, **kwargs):
@@ -54,4 +122,23 @@ def comment_post_save(sender, instance: TaskComment, created: bool, **kwargs):
         return
 
     payload = build_comment_payload(instance)
-    transaction.on_commit(lambda: emit_event(instance.task.project.organization, "comment.added", payload))
+    # TaskComment.task points at the project
+    emit_event(instance.task.organization_id, "comment.added", payload)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def task_changed(sender, instance: Task, **kwargs):
+    """
+    Invalidate the organization's cached task lists. Unlike task_post_save
+    this runs for every save: lists show updated_at. bulk_create/bulk_update
+    send no signals; TaskBulkView bumps the scope itself.
+    """
+    bump_on_commit(tenant_scope(instance.organization_id, "tasks"))
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance: Project, **kwargs):
+    """Task lists inline the project with ?expand=project."""
+    bump_on_commit(tenant_scope(instance.organization_id, "tasks"))
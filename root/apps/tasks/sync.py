@@ -0,0 +1,68 @@
+# apps/tasks/sync.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from root.utils.pagination import KeysetPaginator, InvalidCursor
+
+from .models import Task, TaskComment
+
+# ascending (updated_at, id): a position is the last row a client has seen
+sync_paginator = KeysetPaginator(
+    ordering=("updated_at", "id"),
+    page_size=getattr(settings, "TASK_SYNC_PAGE_SIZE", 500),
+    max_page_size=getattr(settings, "TASK_SYNC_MAX_PAGE_SIZE", 2000),
+)
+
+
+def decode_sync_cursor(token):
+    """
+    (task position, comment position) of a sync cursor; each is an
+    [updated_at, id] pair or None. Raises InvalidCursor.
+    """
+    if not token:
+        return None, None
+    parts = token.split(".")
+    if len(parts) != 2:
+        raise InvalidCursor("Invalid cursor")
+    return tuple(
+        sync_paginator.decode_cursor(part, model) if part else None
+        for part, model in zip(parts, (Task, TaskComment))
+    )
+
+
+def encode_sync_cursor(task_position, comment_position):
+    # two keyset tokens joined by ".", which base64url never contains
+    return ".".join(
+        sync_paginator.encode_cursor(position) if position else ""
+        for position in (task_position, comment_position)
+    )
+
+
+def sync_horizon():
+    """
+    Newest updated_at a sync may return. updated_at is set when a row is
+    saved, not when its transaction commits, so a slower transaction can
+    still commit a row older than what a client already saw. Holding back
+    the last TASK_SYNC_SETTLE_SECONDS keeps the cursor behind those.
+    """
+    return timezone.now() - timedelta(seconds=getattr(settings, "TASK_SYNC_SETTLE_SECONDS", 2.0))
+
+
+def changes_since(queryset, position, columns, limit, horizon):
+    """
+    Rows of `queryset` after `position` up to `horizon`, oldest change first,
+    as .values(*columns) dicts (columns must include updated_at and id).
+    Returns (rows, new position, has_more). Each call is one index range scan,
+    so the cost follows the number of changes, not the size of the table.
+    """
+    queryset = queryset.filter(updated_at__lte=horizon)
+    if position is not None:
+        queryset = queryset.filter(sync_paginator.seek_filter(position))
+    rows = list(queryset.order_by(*sync_paginator.ordering).values(*columns)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        position = [rows[-1]["updated_at"], rows[-1]["id"]]
+    return rows, position, has_more
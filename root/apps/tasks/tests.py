@@ -1,3 +1,522 @@
-from django.test import TestCase
+import unittest
+import uuid
+from datetime import date, timedelta
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.project.models import Project
+from apps.tenants.membership import add_org_claims
+from apps.tenants.models import Organization, OrganizationMembership
+from apps.users.serializers import UserSummarySerializer
+from apps.webhooks.models import WebhookOutbox, WebhookSubscription
+from root.asgi import application
+
+from .consumers import CLOSE_FORBIDDEN, CLOSE_UNAUTHENTICATED, TOKEN_SUBPROTOCOL
+from .encoders import ProjectSummarySerializer, comment_values_encoder, task_expansions, task_values_encoder
+from .models import Task, TaskComment
+from .serializers import TaskCommentSerializer, TaskSerializer
+from .sync import encode_sync_cursor
+from .views import task_paginator
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite-specific")
+class TaskQueryPlanTests(TestCase):
+    """
+    Every hot Task query must be answered from an index, not a table scan.
+    Plans are captured with QuerySet.explain() (EXPLAIN QUERY PLAN on SQLite).
+    """
+
+    def setUp(self):
+        self.org_id = uuid.uuid4()
+        self.project_id = uuid.uuid4()
+        self.user_id = uuid.uuid4()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"USING (COVERING )?INDEX {index_name}\b", msg=plan)
+        self.assertNotRegex(plan, r"SCAN tasks_task(?! USING)", msg=plan)
+
+    def project_tasks(self):
+        # TaskListCreateView.get
+        return Task.objects.filter(project_id=self.project_id, organization_id=self.org_id, is_archived=False)
+
+    def test_task_list_first_page(self):
+        qs = self.project_tasks().order_by(*task_paginator.ordering)[:51]
+        self.assertUsesIndex(qs, "task_list_keyset_idx")
+
+    def test_task_list_deep_page(self):
+        seek = task_paginator.seek_filter(["2025-01-01T00:00:00+00:00", str(uuid.uuid4())])
+        qs = self.project_tasks().filter(seek).order_by(*task_paginator.ordering)[:51]
+        self.assertUsesIndex(qs, "task_list_keyset_idx")
+
+    def test_tasks_by_status_in_project(self):
+        qs = Task.objects.filter(
+            organization_id=self.org_id, project_id=self.project_id,
+            status=Task.STATUS_IN_PROGRESS, is_archived=False,
+        )
+        self.assertUsesIndex(qs, "task_project_status_idx")
+
+    def test_tasks_assigned_to_user(self):
+        qs = Task.objects.filter(organization_id=self.org_id, assigned_to_id=self.user_id, status=Task.STATUS_TODO)
+        self.assertUsesIndex(qs, "task_assignee_status_idx")
+
+    def test_tasks_due_before(self):
+        qs = Task.objects.filter(organization_id=self.org_id, due_date__lte=date(2025, 1, 31)).order_by("due_date")
+        self.assertUsesIndex(qs, "task_due_date_idx")
+
+    def test_task_detail(self):
+        # TaskDetailView: primary key lookup
+        plan = Task.objects.filter(pk=uuid.uuid4()).explain()
+        self.assertIn("USING INDEX sqlite_autoindex_tasks_task_1", plan)
+
+
+class TaskApiTestCase(TestCase):
+    """An organization with one owner and one project, and an API client acting as the owner."""
+
+    def setUp(self):
+        self.user = self.make_user("owner")
+        self.org, self.project = self.make_organization("acme", self.user)
+        self.client = self.client_for(self.user, self.org)
+
+    def make_user(self, username):
+        return get_user_model().objects.create(username=username)
+
+    def make_organization(self, slug, owner):
+        org = Organization.objects.create(name=slug, slug=slug, owner=owner)
+        OrganizationMembership.objects.create(user=owner, organization=org, role=OrganizationMembership.ROLE_OWNER)
+        return org, Project.objects.create(organization=org, name=f"{slug} project")
+
+    def client_for(self, user, org):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.credentials(HTTP_X_ORGANIZATION_ID=str(org.pk))
+        return client
+
+    def make_task(self, title="Task", project=None, **fields):
+        project = project or self.project
+        return Task.objects.create(project=project, organization_id=project.organization_id, title=title, **fields)
+
+
+class TaskValuesEncoderTests(TaskApiTestCase):
+    """The .values() encoders must render exactly what the serializers render."""
+
+    def setUp(self):
+        super().setUp()
+        assignee = get_user_model().objects.create(username="dev", display_name="Dev", avatar="https://x.test/a.png")
+        self.make_task("Assigned", assigned_to=assignee, created_by=self.user, due_date=date(2025, 3, 1),
+                       description="Details", priority=Task.PRIORITY_CRITICAL, status=Task.STATUS_REVIEW)
+        self.make_task("Bare", is_archived=True)
+
+    def tasks(self):
+        return Task.objects.filter(project=self.project).order_by("title")
+
+    def test_tasks(self):
+        rows = self.tasks().values(*task_values_encoder.fields)
+        self.assertEqual(task_values_encoder.encode_many(rows), TaskSerializer(self.tasks(), many=True).data)
+
+    def test_field_subsets(self):
+        encoder = task_values_encoder.only({"id", "due_date", "assigned_to", "updated_at"})
+        expected = [
+            {name: item[name] for name in encoder.field_names}
+            for item in TaskSerializer(self.tasks(), many=True).data
+        ]
+        self.assertEqual(encoder.encode_many(self.tasks().values(*encoder.fields)), expected)
+
+    def test_comments(self):
+        TaskComment.objects.create(task=self.project, author=self.user, body="First")
+        TaskComment.objects.create(task=self.project, author=None, body="Orphan", edited_at=timezone.now())
+        comments = TaskComment.objects.filter(task=self.project).order_by("body")
+        self.assertEqual(
+            comment_values_encoder.encode_many(comments.values(*comment_values_encoder.fields)),
+            TaskCommentSerializer(comments, many=True).data,
+        )
+
+    def test_expansions(self):
+        serializers = {"assigned_to": UserSummarySerializer, "project": ProjectSummarySerializer}
+        columns = set(task_values_encoder.fields)
+        for name in serializers:
+            columns.update(task_expansions[name].fields)
+        rows = list(self.tasks().values(*columns))
+        encoded = task_values_encoder.encode_many(rows)
+        for name in serializers:
+            task_expansions[name].expand_many(rows, encoded)
+
+        for task, item in zip(self.tasks(), encoded):
+            for name, serializer_class in serializers.items():
+                related = getattr(task, name)
+                expected = serializer_class(related).data if related is not None else None
+                self.assertEqual(item[name], expected, (task.title, name))
+
+
+class TaskBulkTests(TaskApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = self.make_task("Existing")
+        self.url = reverse("task-bulk", args=[self.project.pk])
+
+    def bulk(self, url=None, **body):
+        return self.client.post(url or self.url, body, format="json")
+
+    def assertUnchanged(self):
+        self.assertEqual(list(Task.objects.values_list("title", "is_archived")), [("Existing", False)])
+
+    def test_applies_a_valid_batch(self):
+        other = self.make_task("Other")
+        response = self.bulk(
+            create=[{"title": "New"}], update=[{"id": str(self.task.pk), "title": "Renamed"}], archive=[str(other.pk)],
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            sorted(Task.objects.values_list("title", "is_archived")),
+            [("New", False), ("Other", True), ("Renamed", False)],
+        )
+
+    def test_one_invalid_item_rejects_the_whole_batch(self):
+        response = self.bulk(
+            create=[{"title": "Fine"}, {"title": "Bad", "priority": "urgent!"}],
+            update=[{"id": str(self.task.pk), "title": "Renamed"}],
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()["error"]["create"]), ["1"])
+        self.assertUnchanged()
+
+    def test_tasks_of_other_projects_and_organizations_are_rejected(self):
+        same_org_project = Project.objects.create(organization=self.org, name="Elsewhere")
+        _, foreign_project = self.make_organization("other", self.make_user("other"))
+        for project in (same_org_project, foreign_project):
+            foreign = self.make_task("Foreign", project=project)
+            response = self.bulk(update=[{"id": str(foreign.pk), "title": "Mine"}])
+            self.assertEqual(response.status_code, 400, project)
+            self.assertEqual(self.bulk(archive=[str(foreign.pk)]).status_code, 400, project)
+            foreign.refresh_from_db()
+            self.assertEqual((foreign.title, foreign.is_archived), ("Foreign", False))
+
+    def test_projects_of_other_organizations_are_not_found(self):
+        _, foreign_project = self.make_organization("other", self.make_user("other"))
+        response = self.bulk(reverse("task-bulk", args=[foreign_project.pk]), create=[{"title": "Planted"}])
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Task.objects.filter(title="Planted").exists())
+
+    @override_settings(TASK_BULK_MAX_ITEMS=2)
+    def test_batch_size_is_limited(self):
+        response = self.bulk(create=[{"title": "A"}, {"title": "B"}], archive=[str(self.task.pk)])
+        self.assertEqual(response.status_code, 400)
+        self.assertUnchanged()
+
+
+class TaskDetailTenancyTests(TaskApiTestCase):
+    def setUp(self):
+        super().setUp()
+        other_owner = self.make_user("other")
+        _, other_project = self.make_organization("other", other_owner)
+        self.foreign = self.make_task("Not yours", project=other_project)
+        self.url = reverse("task-detail", args=[self.foreign.pk])
+
+    def test_tasks_of_another_organization_are_not_found(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.patch(self.url, {"title": "mine"}, format="json").status_code, 404)
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.title, "Not yours")
+        self.assertFalse(self.foreign.is_archived)
+
+    def test_preconditions_do_not_reveal_tasks_of_another_organization(self):
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH="*").status_code, 404)
+        response = self.client.patch(self.url, {"title": "mine"}, format="json", HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, 404)
+
+    def test_own_tasks_support_conditional_requests(self):
+        url = reverse("task-detail", args=[self.make_task().pk])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.patch(url, {"title": "New"}, format="json", HTTP_IF_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.patch(url, {"title": "Newer"}, format="json", HTTP_IF_MATCH=etag).status_code, 412)
+
+
+TAMPERED_POSITIONS = (["x", "y"], [None, None], [1, 2], [["a"], {"b": 1}], ["2025-01-01T00:00:00+00:00", "y"])
+
+
+class TaskCursorValidationTests(TaskApiTestCase):
+    """Cursors are opaque but client-held: a tampered one is a 400, never a 500."""
+
+    def assertRejected(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 400, (params, response.content))
+
+    def test_task_list(self):
+        url = reverse("task-list-create", args=[self.project.pk])
+        self.assertRejected(url, {"cursor": "not a cursor"})
+        for position in TAMPERED_POSITIONS:
+            self.assertRejected(url, {"cursor": task_paginator.encode_cursor(position)})
+
+    def test_board_column(self):
+        url = reverse("task-board", args=[self.project.pk])
+        for position in TAMPERED_POSITIONS:
+            self.assertRejected(url, {"status": Task.STATUS_TODO, "cursor": task_paginator.encode_cursor(position)})
+
+    def test_changes(self):
+        url = reverse("task-changes", args=[self.project.pk])
+        valid = ["2025-01-01T00:00:00+00:00", str(uuid.uuid4())]
+        for position in TAMPERED_POSITIONS:
+            self.assertRejected(url, {"cursor": encode_sync_cursor(position, valid)})
+            self.assertRejected(url, {"cursor": encode_sync_cursor(valid, position)})
+
+    def test_valid_cursor_is_accepted(self):
+        url = reverse("task-list-create", args=[self.project.pk])
+        cursor = task_paginator.encode_cursor(["2025-01-01T00:00:00+00:00", str(uuid.uuid4())])
+        self.assertEqual(self.client.get(url, {"cursor": cursor}).status_code, 200)
+
+
+class TaskWebhookEventTests(TaskApiTestCase):
+    def setUp(self):
+        super().setUp()
+        WebhookSubscription.objects.create(
+            organization=self.org, url="https://example.com/hook",
+            events=["task.created", "task.updated", "task.deleted"],
+        )
+
+    def outbox(self):
+        return list(WebhookOutbox.objects.order_by("id").values_list("event", "payload__title"))
+
+    def test_a_burst_of_saves_is_one_event(self):
+        task = Task.objects.get(pk=self.make_task("a").pk)
+        for title in ("b", "c", "d"):
+            task.title = title
+            task.save()
+        self.assertEqual(self.outbox(), [("task.created", "d")])
+
+    def test_saves_that_change_no_payload_field_emit_nothing(self):
+        task = Task.objects.get(pk=self.make_task("a").pk)
+        WebhookOutbox.objects.all().delete()
+        task.save()
+        task.title = "a"
+        task.save()
+        self.assertEqual(self.outbox(), [])
+
+    def test_archiving_emits_a_delete(self):
+        task = Task.objects.get(pk=self.make_task("a").pk)
+        WebhookOutbox.objects.all().delete()
+        task.is_archived = True
+        task.save()
+        self.assertEqual(self.outbox(), [("task.deleted", "a")])
+
+
+class TaskChangesTests(TaskApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse("task-changes", args=[self.project.pk])
+
+    def make_task(self, title="Task", project=None, age=60, **fields):
+        task = super().make_task(title, project, **fields)
+        self.age(task, age)
+        return task
+
+    def age(self, task, seconds, **fields):
+        Task.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timedelta(seconds=seconds), **fields)
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["meta"]
+
+    def titles(self, page):
+        return [row["title"] for row in page["tasks"]]
+
+    def test_changes_inside_the_settle_horizon_wait_for_the_next_sync(self):
+        self.make_task("settled")
+        recent = self.make_task("recent", age=0)
+        page = self.sync()
+        self.assertEqual(self.titles(page), ["settled"])
+        self.assertEqual(self.sync(page["cursor"])["tasks"], [])
+
+        self.age(recent, 10)
+        self.assertEqual(self.titles(self.sync(page["cursor"])), ["recent"])
+
+    def test_archived_tasks_come_back_as_tombstones(self):
+        kept, archived = self.make_task("kept", age=60), self.make_task("archived", age=50)
+        page = self.sync()
+        self.age(archived, 10, is_archived=True)
+        page = self.sync(page["cursor"])
+        self.assertEqual((page["tasks"], page["deleted"]), ([], [str(archived.pk)]))
+        self.assertEqual(self.sync(page["cursor"])["deleted"], [])
+
+    def test_the_first_sync_leaves_archived_tasks_out(self):
+        self.make_task("kept")
+        self.make_task("archived", is_archived=True)
+        page = self.sync()
+        self.assertEqual((self.titles(page), page["deleted"]), (["kept"], []))
+
+    def test_pages_resume_where_the_last_one_ended(self):
+        for age in (50, 40, 30):
+            self.make_task(f"{age}s ago", age=age)
+        first = self.sync(page_size=2)
+        second = self.sync(first["cursor"], page_size=2)
+        self.assertEqual(self.titles(first), ["50s ago", "40s ago"])
+        self.assertTrue(first["has_more"])
+        self.assertEqual(self.titles(second), ["30s ago"])
+        self.assertFalse(second["has_more"])
+
+
+class TaskListCacheTests(TaskApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.task = self.make_task("Old")
+        self.url = reverse("task-list-create", args=[self.project.pk])
+
+    def titles(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row["title"] for row in response.json()["meta"]["results"]]
+
+    def test_pages_are_cached_until_a_write(self):
+        self.assertEqual(self.titles(), ["Old"])
+        # a queryset update sends no signal, so the cached page is still served
+        Task.objects.filter(pk=self.task.pk).update(title="Sneaky")
+        self.assertEqual(self.titles(), ["Old"])
+
+    def test_saves_invalidate_on_commit(self):
+        self.titles()
+        detail = reverse("task-detail", args=[self.task.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.patch(detail, {"title": "New"}, format="json").status_code, 200)
+        self.assertEqual(self.titles(), ["New"])
+
+    def test_bulk_writes_invalidate_on_commit(self):
+        self.titles()
+        bulk = reverse("task-bulk", args=[self.project.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(bulk, {"archive": [str(self.task.pk)]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.titles(), [])
+
+    def test_writes_in_another_organization_keep_the_cache(self):
+        self.titles()
+        other_owner = self.make_user("other")
+        _, other_project = self.make_organization("other", other_owner)
+        Task.objects.filter(pk=self.task.pk).update(title="Sneaky")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_task("Theirs", project=other_project)
+        self.assertEqual(self.titles(), ["Old"])
+
+
+class TaskBoardTests(TaskApiTestCase):
+    def setUp(self):
+        super().setUp()
+        statuses = [Task.STATUS_TODO] * 5 + [Task.STATUS_IN_PROGRESS] * 3 + [Task.STATUS_DONE]
+        start = timezone.now() - timedelta(hours=1)
+        for n, task_status in enumerate(statuses):
+            task = self.make_task(f"Task {n}", status=task_status)
+            # two tasks share each timestamp, so ties are broken on id
+            Task.objects.filter(pk=task.pk).update(created_at=start + timedelta(minutes=n // 2))
+        self.make_task("Archived", is_archived=True)
+        other_project = Project.objects.create(organization=self.org, name="Other")
+        self.make_task("Elsewhere", project=other_project)
+        self.board_url = reverse("task-board", args=[self.project.pk])
+        self.list_url = reverse("task-list-create", args=[self.project.pk])
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["meta"]
+
+    def task_list(self, **params):
+        return [row["id"] for row in self.get(self.list_url, page_size=200, **params)["results"]]
+
+    def listed_statuses(self):
+        return {row["id"]: row["status"] for row in self.get(self.list_url, page_size=200)["results"]}
+
+    def test_columns_match_the_task_list(self):
+        statuses = self.listed_statuses()
+        ordered = self.task_list()
+        for column in self.get(self.board_url, page_size=2)["columns"]:
+            in_column = [pk for pk in ordered if statuses[pk] == column["status"]]
+            self.assertEqual(column["count"], len(in_column), column["status"])
+
+            seen, page = [], column
+            while True:
+                seen += [row["id"] for row in page["results"]]
+                if page["next_cursor"] is None:
+                    break
+                page = self.get(
+                    self.board_url, status=column["status"], cursor=page["next_cursor"], page_size=2,
+                )["columns"][0]
+            self.assertEqual(seen, in_column, column["status"])
+
+    def test_column_cursors_continue_the_task_list(self):
+        ordered = self.task_list()
+        todo = self.get(self.board_url, page_size=2)["columns"][0]
+        self.assertEqual(todo["status"], Task.STATUS_TODO)
+        last = todo["results"][-1]["id"]
+        self.assertEqual(self.task_list(cursor=todo["next_cursor"]), ordered[ordered.index(last) + 1:])
+
+    def test_full_columns_have_no_cursor(self):
+        columns = {column["status"]: column for column in self.get(self.board_url, page_size=3)["columns"]}
+        self.assertEqual(columns[Task.STATUS_IN_PROGRESS]["count"], 3)
+        self.assertIsNone(columns[Task.STATUS_IN_PROGRESS]["next_cursor"])
+        self.assertEqual((columns[Task.STATUS_REVIEW]["count"], columns[Task.STATUS_REVIEW]["results"]), (0, []))
+
+
+class TaskBoardSocketTests(TransactionTestCase):
+    """ws/tasks/<project>/ through the full ASGI application (origin check included)."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="owner")
+        self.org = Organization.objects.create(name="acme", slug="acme", owner=self.user)
+        self.membership = OrganizationMembership.objects.create(
+            user=self.user, organization=self.org, role=OrganizationMembership.ROLE_OWNER,
+        )
+        self.project = Project.objects.create(organization=self.org, name="acme project")
+        self.token = str(add_org_claims(AccessToken.for_user(self.user), self.membership))
+
+    def communicator(self, query="", subprotocols=None, origin=b"http://testserver"):
+        headers = [(b"origin", origin)] if origin else []
+        return WebsocketCommunicator(
+            application, f"/ws/tasks/{self.project.pk}/{query}", headers=headers,
+            subprotocols=subprotocols if subprotocols is not None else [TOKEN_SUBPROTOCOL, self.token],
+        )
+
+    async def assertClosedWith(self, communicator, code):
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_output(), {"type": "websocket.close", "code": code})
+
+    async def test_token_in_subprotocol(self):
+        communicator = self.communicator()
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, TOKEN_SUBPROTOCOL)
+        await communicator.send_to(text_data="ping")
+        self.assertEqual(await communicator.receive_from(), "pong")
+        await communicator.disconnect()
+
+    async def test_token_in_query_string_is_not_accepted(self):
+        communicator = self.communicator(query=f"?token={self.token}", subprotocols=[])
+        await self.assertClosedWith(communicator, CLOSE_UNAUTHENTICATED)
+
+    async def test_foreign_origins_are_rejected(self):
+        for origin in (b"https://evil.example", None):
+            connected, _ = await self.communicator(origin=origin).connect()
+            self.assertFalse(connected, origin)
+
+    @override_settings(TASK_BOARD_AUTH_RECHECK_INTERVAL=0.05)
+    async def test_socket_is_closed_once_the_membership_is_revoked(self):
+        communicator = self.communicator()
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+
+        self.membership.is_active = False
+        await sync_to_async(self.membership.save)()
+        self.assertEqual(
+            await communicator.receive_output(timeout=2), {"type": "websocket.close", "code": CLOSE_FORBIDDEN},
+        )
@@ -1,7 +1,10 @@
 from django.urls import path
-from .views import TaskListCreateView, TaskDetailView
+from .views import TaskListCreateView, TaskBoardView, TaskBulkView, TaskChangesView, TaskDetailView
 
 urlpatterns = [
     path('<uuid:project_id>/', TaskListCreateView.as_view(), name="task-list-create"),
+    path('<uuid:project_id>/bulk/', TaskBulkView.as_view(), name="task-bulk"),
+    path('<uuid:project_id>/changes/', TaskChangesView.as_view(), name="task-changes"),
+    path('<uuid:project_id>/board/', TaskBoardView.as_view(), name="task-board"),
     path('detail/<uuid:pk>/', TaskDetailView.as_view(), name="task-detail"),
 ]
@@ -4,28 +4,117 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from .models import Task
-from .serializers import TaskSerializer
+from django.http import Http404
+import uuid
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.project.models import Project
+from apps.webhooks.dispatcher import emit_bulk_event
+from .models import Task, TaskComment
+from .serializers import TaskSerializer, TaskBulkItemSerializer
+from .encoders import comment_values_encoder, task_values_encoder, task_expansions
+from .realtime import broadcast, task_change_diffs
+from .signals import build_task_payload, changed_payload_fields, mark_saved, task_event_key, was_archived
+from .board import BOARD_COLUMNS, board_columns, board_paginator, column_cursor
+from .sync import changes_since, decode_sync_cursor, encode_sync_cursor, sync_horizon, sync_paginator
 from .permissions import IsOrgMember, IsOrgAdminOrOwner
+from apps.tenants.cache import USERS_SCOPE, bump_on_commit, cached_response_data, tenant_scope
 from apps.tenants.response import success_response, error_response
+from root.utils.conditional import conditional_response, is_conditional, make_validators, with_validators
+from root.utils.pagination import KeysetPaginator, InvalidCursor
+from root.utils.sparse import parse_field_list, InvalidFieldSelection
 from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+task_paginator = KeysetPaginator(
+    ordering=("-created_at", "-id"),
+    page_size=getattr(settings, "TASK_PAGE_SIZE", 50),
+    max_page_size=getattr(settings, "TASK_MAX_PAGE_SIZE", 200),
+)
+
+
+def _organization_tasks(request):
+    # detail lookups go by task id alone: scope them, or any member could reach
+    # (and probe with 304/412) another organization's tasks
+    return Task.objects.filter(organization=request.organization)
+
+
+def task_validators(pk, updated_at):
+    # every write path bumps updated_at (auto_now, or set explicitly by the bulk view)
+    return make_validators("task", pk, updated_at.isoformat(), last_modified=updated_at)
+
+
+def _task_columns(request):
+    """
+    (encoder, .values() columns, expand names) for the ?fields= / ?expand= of a
+    task list read. Raises InvalidFieldSelection.
+    """
+    fields = parse_field_list(request, "fields", task_values_encoder.field_names)
+    expand = parse_field_list(request, "expand", task_expansions) or []
+    encoder = task_values_encoder if fields is None else task_values_encoder.only(set(fields) | set(expand))
+    # the cursor needs the ordering columns even when the client didn't ask for them
+    columns = set(encoder.fields) | {"created_at", "id"}
+    for name in expand:
+        columns.update(task_expansions[name].fields)
+    return encoder, columns, expand
+
+
+def _encode_tasks(encoder, expand, rows):
+    results = encoder.encode_many(rows)
+    for name in expand:
+        task_expansions[name].expand_many(rows, results)
+    return results
+
 
 class TaskListCreateView(APIView):
     permission_classes = [IsOrgMember]
 
     @swagger_auto_schema(
         operation_summary="List tasks in a project",
+        operation_description="Newest first, keyset-paginated on (created_at, id). "
+                              "Pass meta.next_cursor back as ?cursor= to get the next page. "
+                              "?fields=id,title,status narrows the columns; "
+                              "?expand=assigned_to,project inlines the related objects.",
         tags=["Tasks"],
+        manual_parameters=[
+            openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter("page_size", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False),
+            openapi.Parameter("fields", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter("expand", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+        ],
         responses={200: TaskSerializer(many=True)}
     )
     def get(self, request, project_id=None):
         org = request.organization
-        tasks = Task.objects.filter(project_id=project_id, organization=org, is_archived=False)
-        return success_response(TaskSerializer(tasks, many=True).data, "Tasks fetched", request)
+        try:
+            encoder, columns, expand = _task_columns(request)
+        except InvalidFieldSelection as e:
+            return error_response(str(e), "Invalid field selection", status.HTTP_400_BAD_REQUEST, request)
+
+        # read path: .values() rows + precompiled encoder, same output as TaskSerializer
+        tasks = (
+            Task.objects
+            .filter(project_id=project_id, organization=org, is_archived=False)
+            .values(*columns)
+        )
+
+        def page():
+            rows, next_cursor = task_paginator.paginate(tasks, request)
+            return {"results": _encode_tasks(encoder, expand, rows), "next_cursor": next_cursor}
+
+        # every member of the organization sees the same page
+        scopes = [tenant_scope(org.pk, "tasks")]
+        if "assigned_to" in expand:
+            scopes.append(USERS_SCOPE)
+        try:
+            data = cached_response_data(request, "tasks.list", scopes, page, vary=(project_id,))
+        except InvalidCursor as e:
+            return error_response(str(e), "Invalid cursor", status.HTTP_400_BAD_REQUEST, request)
+        return success_response(data, "Tasks fetched", request=request)
 
     @swagger_auto_schema(
         operation_summary="Create new task",
@@ -39,47 +128,368 @@ class TaskListCreateView(APIView):
 
         data = request.data.copy()
         data["project"] = project_id
-        data["organization"] = str(org.id)
 
         serializer = TaskSerializer(data=data)
         if serializer.is_valid():
-            task = serializer.save(created_by=user)
+            # the webhook outbox row is written by task_post_save in the same transaction
+            with transaction.atomic():
+                task = serializer.save(created_by=user, organization=org)
             return success_response(TaskSerializer(task).data, "Task created", status.HTTP_201_CREATED, request)
 
         return error_response(serializer.errors, "Validation failed", status.HTTP_400_BAD_REQUEST, request)
 
+def _canonical_id(value):
+    """UUID string in canonical form, or None if value is not a UUID."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+class TaskBulkView(APIView):
+    """
+    POST -> create, update and archive many tasks of a project in one request.
+
+    Body: {"create": [{...}], "update": [{"id": ..., ...}], "archive": [id, ...]}
+    All items are validated up front; nothing is written unless every item is
+    valid. Writes use bulk_create/bulk_update in a single transaction and the
+    webhooks get one coalesced 'task.bulk' event per subscription.
+    """
+    permission_classes = [IsOrgMember]
+
+    @swagger_auto_schema(
+        operation_summary="Bulk create / update / archive tasks",
+        tags=["Tasks"],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "create": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                "update": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                "archive": openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+            }
+        ),
+    )
+    def post(self, request, project_id=None):
+        org = request.organization
+        body = request.data if isinstance(request.data, dict) else {}
+        creates = body.get("create") or []
+        updates = body.get("update") or []
+        archives = body.get("archive") or []
+
+        if not all(isinstance(v, list) for v in (creates, updates, archives)):
+            return error_response("create, update and archive must be lists", "Validation failed", status.HTTP_400_BAD_REQUEST, request)
+        if not all(isinstance(item, dict) for item in creates + updates):
+            return error_response("create and update items must be objects", "Validation failed", status.HTTP_400_BAD_REQUEST, request)
+
+        max_items = getattr(settings, "TASK_BULK_MAX_ITEMS", 500)
+        if len(creates) + len(updates) + len(archives) > max_items:
+            return error_response(f"At most {max_items} items per request", "Validation failed", status.HTTP_400_BAD_REQUEST, request)
+
+        project = Project.objects.filter(pk=project_id, organization=org).first()
+        if project is None:
+            return error_response("Project not found", "Validation failed", status.HTTP_404_NOT_FOUND, request)
+
+        # ---- load everything the batch references, one query per table ----
+        update_ids = [_canonical_id(item.get("id")) for item in updates]
+        archive_ids = [_canonical_id(pk) for pk in archives]
+        target_ids = [pk for pk in update_ids + archive_ids if pk]
+        if len(set(target_ids)) != len(target_ids):
+            return error_response("A task may appear only once across update/archive", "Validation failed", status.HTTP_400_BAD_REQUEST, request)
+        existing = {str(t.pk): t for t in Task.objects.filter(project=project, organization=org, pk__in=target_ids)}
+
+        assignee_ids = {_canonical_id(item.get("assigned_to")) for item in creates + updates} - {None}
+        assignees = {str(u.pk): u for u in User.objects.filter(pk__in=assignee_ids)} if assignee_ids else {}
+        context = {"request": request, "assignees": assignees}
+
+        # ---- validate the whole batch before writing anything ----
+        errors = {}
+        create_serializer = TaskBulkItemSerializer(data=creates, many=True, context=context)
+        if not create_serializer.is_valid():
+            errors["create"] = create_serializer.errors
+
+        update_errors, pending_updates = {}, []
+        for index, item in enumerate(updates):
+            task = existing.get(update_ids[index])
+            if task is None:
+                update_errors[index] = {"id": ["Task not found in this project."]}
+                continue
+            serializer = TaskBulkItemSerializer(task, data=item, partial=True, context=context)
+            if serializer.is_valid():
+                pending_updates.append((task, serializer.validated_data))
+            else:
+                update_errors[index] = serializer.errors
+        if update_errors:
+            errors["update"] = update_errors
+
+        missing = [raw for raw, pk in zip(archives, archive_ids) if pk not in existing]
+        if missing:
+            errors["archive"] = {"not_found": missing}
+
+        if errors:
+            return error_response(errors, "Validation failed", status.HTTP_400_BAD_REQUEST, request)
+
+        # ---- write ----
+        now = timezone.now()
+        created = [
+            Task(**data, project=project, organization=org, created_by=request.user)
+            for data in create_serializer.validated_data
+        ]
+        changed, update_fields = [], {"updated_at"}
+        for task, data in pending_updates:
+            for field, value in data.items():
+                setattr(task, field, value)
+            update_fields.update(data.keys())
+            changed.append(task)
+        archived = [existing[pk] for pk in archive_ids]
+        for task in archived:
+            task.is_archived = True
+        if archived:
+            update_fields.add("is_archived")
+        for task in changed + archived:
+            task.updated_at = now
+
+        with transaction.atomic():
+            if created:
+                Task.objects.bulk_create(created)
+            if changed or archived:
+                Task.objects.bulk_update(changed + archived, fields=sorted(update_fields))
+
+            # as in task_post_save: skip no-op updates, report archiving as a delete
+            changed_fields = {t.pk: changed_payload_fields(t) for t in changed}
+            updated = [t for t in changed if changed_fields[t.pk] and not was_archived(t)]
+            deleted = [t for t in archived if was_archived(t)]
+            events = {
+                "task.created": [build_task_payload(t) for t in created],
+                "task.updated": [build_task_payload(t) for t in updated],
+                "task.deleted": [build_task_payload(t) for t in deleted],
+            }
+            emit_bulk_event(org, events, coalesce_keys=[task_event_key(t) for t in updated + deleted])
+
+            # one board message per project for the whole batch
+            diffs = {}
+            for op, tasks in (("created", created), ("updated", updated), ("deleted", deleted)):
+                for task in tasks:
+                    for project_id, items in task_change_diffs(task, op, changed_fields.get(task.pk)).items():
+                        diffs.setdefault(project_id, []).extend(items)
+            broadcast(org.pk, diffs)
+            # bulk writes send no model signals (see task_changed)
+            bump_on_commit(tenant_scope(org.pk, "tasks"))
+            for task in changed + archived:
+                mark_saved(task)
+
+        return success_response({
+            "created": TaskSerializer(created, many=True).data,
+            "updated": TaskSerializer(changed, many=True).data,
+            "archived": [str(t.pk) for t in archived],
+        }, "Bulk operation applied", request=request)
+
+
+class TaskChangesView(APIView):
+    """
+    GET -> tasks and comments of a project changed since a sync cursor.
+
+    Response: {"tasks": [...], "deleted": [task id, ...], "comments": [...],
+    "cursor": ..., "has_more": bool}. Archived tasks come back as ids in
+    "deleted" (tombstones). Store "cursor" and send it as ?cursor= next time;
+    while has_more is true, call again right away. Without a cursor the sync
+    starts from the beginning and its first page leaves out archived tasks
+    (later pages may still list some in "deleted"; unknown ids can be ignored).
+    """
+    permission_classes = [IsOrgMember]
+
+    @swagger_auto_schema(
+        operation_summary="Task and comment changes since a cursor",
+        operation_description="Delta sync for offline clients, oldest change first. "
+                              "Archived tasks are returned as ids in `deleted`.",
+        tags=["Tasks"],
+        manual_parameters=[
+            openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter("page_size", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False),
+        ],
+    )
+    def get(self, request, project_id=None):
+        org = request.organization
+        try:
+            task_position, comment_position = decode_sync_cursor(request.query_params.get("cursor"))
+        except InvalidCursor as e:
+            return error_response(str(e), "Invalid cursor", status.HTTP_400_BAD_REQUEST, request)
+        limit = sync_paginator.get_page_size(request)
+        horizon = sync_horizon()
+
+        tasks = Task.objects.filter(organization=org, project_id=project_id)
+        if task_position is None:
+            tasks = tasks.filter(is_archived=False)
+        columns = set(task_values_encoder.fields) | {"updated_at", "id", "is_archived"}
+        task_rows, task_position, more_tasks = changes_since(tasks, task_position, columns, limit, horizon)
+
+        # TaskComment.task points at the project
+        comments = TaskComment.objects.filter(task_id=project_id, task__organization=org)
+        comment_rows, comment_position, more_comments = changes_since(
+            comments, comment_position, comment_values_encoder.fields, limit, horizon,
+        )
+
+        return success_response({
+            "tasks": task_values_encoder.encode_many([row for row in task_rows if not row["is_archived"]]),
+            "deleted": [row["id"] for row in task_rows if row["is_archived"]],
+            "comments": comment_values_encoder.encode_many(comment_rows),
+            "cursor": encode_sync_cursor(task_position, comment_position),
+            "has_more": more_tasks or more_comments,
+        }, "Changes fetched", request=request)
+
+
+class TaskBoardView(APIView):
+    """
+    GET -> a project's tasks as a board: one column per Task.STATUS_CHOICES.
+
+    Response: {"columns": [{"status", "label", "count", "results", "next_cursor"}, ...]}
+    with the newest ?page_size= tasks of every column and each column's total,
+    read in one query (apps/tasks/board.py). To load more of one column, send
+    its next_cursor back with ?status=<column>&cursor=...; that response holds
+    just the column's next page (no count). ?fields= / ?expand= work as on
+    the task list.
+    """
+    permission_classes = [IsOrgMember]
+
+    @swagger_auto_schema(
+        operation_summary="Task board of a project",
+        operation_description="The first page_size tasks of every status column plus per-column counts. "
+                              "?status=<column>&cursor=<column next_cursor> loads more of one column.",
+        tags=["Tasks"],
+        manual_parameters=[
+            openapi.Parameter("page_size", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, required=False,
+                              description="Tasks per column"),
+            openapi.Parameter("status", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                              enum=[value for value, _ in BOARD_COLUMNS]),
+            openapi.Parameter("cursor", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter("fields", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter("expand", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False),
+        ],
+    )
+    def get(self, request, project_id=None):
+        org = request.organization
+        try:
+            encoder, columns, expand = _task_columns(request)
+        except InvalidFieldSelection as e:
+            return error_response(str(e), "Invalid field selection", status.HTTP_400_BAD_REQUEST, request)
+
+        labels = dict(BOARD_COLUMNS)
+        column = request.query_params.get("status")
+        cursor = request.query_params.get("cursor")
+        if column is not None and column not in labels:
+            return error_response(
+                f"Unknown status: {column}. Allowed: {', '.join(labels)}", "Invalid status",
+                status.HTTP_400_BAD_REQUEST, request,
+            )
+        if cursor and column is None:
+            return error_response(
+                "A cursor continues one column; pass its ?status= too", "Invalid cursor",
+                status.HTTP_400_BAD_REQUEST, request,
+            )
+
+        tasks = Task.objects.filter(project_id=project_id, organization=org, is_archived=False)
+        if column is not None:
+            tasks = tasks.filter(status=column)
+
+        def board():
+            if cursor:
+                rows, next_cursor = board_paginator.paginate(tasks.values(*columns), request)
+                return {"columns": [{
+                    "status": column,
+                    "label": labels[column],
+                    "results": _encode_tasks(encoder, expand, rows),
+                    "next_cursor": next_cursor,
+                }]}
+            found = board_columns(tasks, columns, board_paginator.get_page_size(request))
+            result = []
+            for value, label in BOARD_COLUMNS:
+                if column is not None and value != column:
+                    continue
+                rows, total = found[value]
+                result.append({
+                    "status": value,
+                    "label": label,
+                    "count": total,
+                    "results": _encode_tasks(encoder, expand, rows),
+                    "next_cursor": column_cursor(rows, total),
+                })
+            return {"columns": result}
+
+        scopes = [tenant_scope(org.pk, "tasks")]
+        if "assigned_to" in expand:
+            scopes.append(USERS_SCOPE)
+        try:
+            data = cached_response_data(request, "tasks.board", scopes, board, vary=(project_id,))
+        except InvalidCursor as e:
+            return error_response(str(e), "Invalid cursor", status.HTTP_400_BAD_REQUEST, request)
+        return success_response(data, "Board fetched", request=request)
+
+
 class TaskDetailView(APIView):
     permission_classes = [IsOrgMember]
 
     @swagger_auto_schema(
         operation_summary="Get task details",
-        tags=["Tasks"]
+        operation_description="Sends ETag and Last-Modified; If-None-Match / If-Modified-Since "
+                              "return 304 Not Modified when the task is unchanged.",
+        tags=["Tasks"],
+        manual_parameters=[
+            openapi.Parameter("If-None-Match", openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter("If-Modified-Since", openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False),
+        ],
     )
     def get(self, request, pk=None):
-        task = get_object_or_404(Task, pk=pk)
-        return success_response(TaskSerializer(task).data, "Task fetched", request)
+        if is_conditional(request):
+            # validate against the timestamp alone; an unchanged task is never loaded or serialized
+            updated_at = _organization_tasks(request).filter(pk=pk).values_list("updated_at", flat=True).first()
+            if updated_at is None:
+                raise Http404
+            not_modified = conditional_response(request, task_validators(pk, updated_at))
+            if not_modified is not None:
+                return not_modified
+
+        row = _organization_tasks(request).filter(pk=pk).values(*task_values_encoder.fields).first()
+        if row is None:
+            raise Http404
+        response = success_response(task_values_encoder.encode(row), "Task fetched", request=request)
+        return with_validators(response, task_validators(pk, row["updated_at"]))
 
     @swagger_auto_schema(
         operation_summary="Update task",
+        operation_description="Send the ETag of the version being edited as If-Match to get "
+                              "412 Precondition Failed instead of overwriting a newer change.",
         tags=["Tasks"],
-        request_body=TaskSerializer
+        request_body=TaskSerializer,
+        manual_parameters=[
+            openapi.Parameter("If-Match", openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False),
+        ],
     )
     def patch(self, request, pk=None):
-        task = get_object_or_404(Task, pk=pk)
-        serializer = TaskSerializer(task, data=request.data, partial=True)
+        queryset = _organization_tasks(request)
+        if is_conditional(request):
+            # hold the row from the check to the save, so two clients sending
+            # the same If-Match cannot both win
+            queryset = queryset.select_for_update()
 
-        if serializer.is_valid():
+        with transaction.atomic():
+            task = get_object_or_404(queryset, pk=pk)
+            failed = conditional_response(request, task_validators(task.pk, task.updated_at))
+            if failed is not None:
+                return failed
+            serializer = TaskSerializer(task, data=request.data, partial=True)
+            if not serializer.is_valid():
+                return error_response(serializer.errors, "Validation failed", status.HTTP_400_BAD_REQUEST, request)
             serializer.save()
-            return success_response(serializer.data, "Task updated", request)
 
-        return error_response(serializer.errors, "Validation failed", status.HTTP_400_BAD_REQUEST, request)
+        response = success_response(serializer.data, "Task updated", request=request)
+        return with_validators(response, task_validators(task.pk, task.updated_at))
 
     @swagger_auto_schema(
         operation_summary="Delete task",
         tags=["Tasks"]
     )
     def delete(self, request, pk=None):
-        task = get_object_or_404(Task, pk=pk)
+        task = get_object_or_404(_organization_tasks(request), pk=pk)
         task.is_archived = True
-        task.save()
+        with transaction.atomic():
+            task.save()
         return success_response({}, "Task deleted", status.HTTP_204_NO_CONTENT, request)
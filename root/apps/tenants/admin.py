@@ -16,4 +16,4 @@ class OrganizationMembershipAdmin(admin.ModelAdmin):
 
 @admin.register(Plan)
 class PlanAdmin(admin.ModelAdmin):
-    list_display = ('name', 'max_users')
+    list_display = ('name', 'max_users', 'webhook_weight', 'webhook_rate', 'webhook_burst')
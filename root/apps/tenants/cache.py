@@ -0,0 +1,99 @@
+# apps/tenants/cache.py
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from root.utils.cache import TwoTierCache, VersionedCache
+
+tenant_cache = TwoTierCache(
+    "tenants:organization:v2",  # holds field values; bump when Organization's fields change
+    local_maxsize=getattr(settings, "TENANT_CACHE_LOCAL_MAXSIZE", 1024),
+    local_ttl=getattr(settings, "TENANT_CACHE_LOCAL_TTL", 30),
+    shared_ttl=getattr(settings, "TENANT_CACHE_SHARED_TTL", 300),
+)
+
+
+def _normalize_org_id(org_id):
+    # header values may differ in case/format; key the cache on the canonical UUID string
+    try:
+        return str(uuid.UUID(str(org_id)))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _organization_field_names(Organization):
+    # from_db() expects names in concrete-field order
+    return [f.attname for f in Organization._meta.concrete_fields]
+
+
+def get_organization(org_id):
+    """
+    Return the Organization for org_id (or None), served from the tenant cache.
+    Ids that are not valid UUIDs resolve to None without touching the DB.
+
+    The cache holds the row's field values and every call builds its own
+    instance, so whatever one request sets or caches on its organization
+    (e.g. org.plan) is not seen by other requests or threads.
+    """
+    key = _normalize_org_id(org_id)
+    if key is None:
+        return None
+
+    Organization = apps.get_model("tenants", "Organization")
+    field_names = _organization_field_names(Organization)
+    row = tenant_cache.get_or_load(
+        key, lambda: Organization.objects.filter(id=key).values(*field_names).first()
+    )
+    if row is None:
+        return None
+    return Organization.from_db(DEFAULT_DB_ALIAS, field_names, [row[name] for name in field_names])
+
+
+def invalidate_organization(org_id):
+    key = _normalize_org_id(org_id)
+    if key is not None:
+        tenant_cache.invalidate(key)
+
+
+# Versioned cache of list endpoint payloads (the envelope's meta). Entries are
+# keyed by endpoint, query params, the requesting scope and the versions of
+# the scopes below; the model signals bump those versions on commit.
+response_cache = VersionedCache(
+    "responses",
+    ttl=getattr(settings, "RESPONSE_CACHE_TTL", 300),
+    lock_timeout=getattr(settings, "RESPONSE_CACHE_LOCK_TIMEOUT", 10),
+    wait=getattr(settings, "RESPONSE_CACHE_WAIT", 2.0),
+)
+
+PLANS_SCOPE = "plans"
+ORGANIZATIONS_SCOPE = "organizations"  # any organization's own fields
+USERS_SCOPE = "users"                  # user summaries inlined by ?expand=
+
+
+def tenant_scope(org_id, resource):
+    """Version scope of one organization's `resource` ("members", "tasks")."""
+    return f"tenant:{_normalize_org_id(org_id)}:{resource}"
+
+
+def user_organizations_scope(user_id):
+    """Version scope of the set of organizations a user belongs to."""
+    return f"user:{user_id}:organizations"
+
+
+def cached_response_data(request, name, scopes, compute, vary=()):
+    """
+    compute() through response_cache, keyed on `name`, the request's query
+    params and `vary`. Only for payloads that are the same for every caller
+    matching those; anything per-user must be in `vary`.
+    """
+    if not getattr(settings, "RESPONSE_CACHE_ENABLED", True):
+        return compute()
+    params = sorted((key, tuple(values)) for key, values in request.query_params.lists())
+    return response_cache.get_or_compute(name, scopes, compute, vary=(*vary, params))
+
+
+def bump_on_commit(*scopes):
+    """Bump `scopes` once the current transaction commits (right away outside one)."""
+    transaction.on_commit(lambda: response_cache.bump(*scopes))
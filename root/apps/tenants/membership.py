@@ -0,0 +1,155 @@
+# apps/tenants/membership.py
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from root.utils.cache import TwoTierCache, LocalTTLCache
+from .models import OrganizationMembership
+
+# Lightweight, picklable view of a membership row; all the permission classes need.
+Membership = namedtuple("Membership", ["role", "is_active"])
+
+ADMIN_ROLES = (OrganizationMembership.ROLE_OWNER, OrganizationMembership.ROLE_ADMIN)
+
+membership_cache = TwoTierCache(
+    "tenants:membership",
+    local_maxsize=getattr(settings, "MEMBERSHIP_CACHE_LOCAL_MAXSIZE", 4096),
+    local_ttl=getattr(settings, "MEMBERSHIP_CACHE_LOCAL_TTL", 5),
+    shared_ttl=getattr(settings, "MEMBERSHIP_CACHE_SHARED_TTL", 60),
+)
+
+
+# Last-seen membership versions; its TTL is the window in which a role
+# downgrade may still be honoured from an already-issued token.
+_local_versions = LocalTTLCache(
+    maxsize=getattr(settings, "MEMBERSHIP_CACHE_LOCAL_MAXSIZE", 4096),
+    ttl=getattr(settings, "TENANT_JWT_CLAIMS_VERSION_TTL", 5),
+)
+
+
+def _cache_key(org_id, user_id):
+    return f"{org_id}:{user_id}"
+
+
+def _version_key(org_id, user_id):
+    return f"tenants:membership_version:{org_id}:{user_id}"
+
+
+def _version_timeout():
+    lifetime = getattr(settings, "SIMPLE_JWT", {}).get("ACCESS_TOKEN_LIFETIME")
+    return int(lifetime.total_seconds()) if lifetime else None
+
+
+def membership_version(org_id, user_id):
+    """
+    Return the current membership version stamp, creating one if none exists.
+    Embedded in access tokens as the "mv" claim when they are issued.
+    """
+    key = _version_key(org_id, user_id)
+    cache.add(key, time.time_ns(), _version_timeout())
+    return cache.get(key)
+
+
+def bump_membership_version(org_id, user_id):
+    """
+    Revoke the org/role claims of every token issued before now; at once in
+    this process, within TENANT_JWT_CLAIMS_VERSION_TTL in the others.
+    """
+    key = _version_key(org_id, user_id)
+    cache.set(key, time.time_ns(), _version_timeout())
+    _local_versions.delete(key)
+
+
+def add_org_claims(token, membership):
+    """
+    Scope an access token to the membership's organization. Only active
+    memberships get the "mv" stamp that get_membership's claim fast path needs.
+    """
+    token["org_id"] = str(membership.organization_id)
+    token["role"] = membership.role
+    if membership.is_active:
+        token["mv"] = membership_version(membership.organization_id, membership.user_id)
+    return token
+
+
+def _membership_from_claims(token, org, user):
+    """
+    Trust the signed org_id/role claims when they match the requested org and
+    the token's membership version is still current. Returns None to fall back
+    to the membership lookup (no claims, other org, missing/stale version).
+    """
+    if token is None or not hasattr(token, "get"):
+        return None
+    if token.get("org_id") != str(org.pk) or not token.get("role") or token.get("mv") is None:
+        return None
+
+    vkey = _version_key(org.pk, user.pk)
+    current = _local_versions.get(vkey)
+    if current is None:
+        current = cache.get(vkey)
+        if current is None:
+            return None
+        _local_versions.set(vkey, current)
+
+    if token.get("mv") != current:
+        return None
+    return Membership(token.get("role"), True)
+
+
+def _load_membership(org_id, user_id):
+    row = (
+        OrganizationMembership.objects
+        .filter(organization_id=org_id, user_id=user_id)
+        .values_list("role", "is_active")
+        .first()
+    )
+    return Membership(*row) if row else None
+
+
+def get_membership(request, org=None):
+    """
+    Return the current user's Membership in the request organization (or None).
+
+    Resolved at most once per request: the result is memoized on the underlying
+    HttpRequest, so every permission class in a view shares one lookup. Across
+    requests it is served from a short-TTL cache invalidated on membership saves.
+
+    With TENANT_AUTHZ_TRUST_JWT_CLAIMS enabled, a token scoped to this org
+    (org_id/role/mv claims) is trusted without any membership query.
+    """
+    org = org if org is not None else getattr(request, "organization", None)
+    user = getattr(request, "user", None)
+    if not org or not user or not user.is_authenticated:
+        return None
+
+    # DRF's Request proxies attributes, but memoize on the HttpRequest it wraps
+    http_request = getattr(request, "_request", request)
+    memo = getattr(http_request, "_membership_memo", None)
+    if memo is None:
+        memo = http_request._membership_memo = {}
+    key = _cache_key(org.pk, user.pk)
+    if key not in memo:
+        memo[key] = resolve_membership(org, user, getattr(request, "auth", None))
+    return memo[key]
+
+
+def resolve_membership(org, user, token=None):
+    """
+    get_membership without a request (e.g. a WebSocket handshake): the same
+    JWT-claim fast path for `token` and the same cache, but no memo.
+    """
+    membership = None
+    if getattr(settings, "TENANT_AUTHZ_TRUST_JWT_CLAIMS", False):
+        membership = _membership_from_claims(token, org, user)
+    if membership is None:
+        membership = membership_cache.get_or_load(
+            _cache_key(org.pk, user.pk), lambda: _load_membership(org.pk, user.pk)
+        )
+    return membership
+
+
+def invalidate_membership(org_id, user_id):
+    membership_cache.invalidate(_cache_key(org_id, user_id))
+    bump_membership_version(org_id, user_id)
@@ -1,16 +1,43 @@
 # apps/tenants/middleware.py
-from django.apps import apps
+from django.conf import settings
+from django.http import Http404
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .cache import get_organization
+
+
+def _organization_or_404(org_id):
+    organization = get_organization(org_id)
+    if organization is None:
+        raise Http404("Unknown organization")
+    return organization
+
 
 class TenantMiddleware(MiddlewareMixin):
     """
     Read tenant identifier from header X-ORGANIZATION-ID (or query param)
-    and attach the Organization instance on request.tenant (or None).
+    and attach the Organization on request.tenant, or None without one.
+
+    request.tenant (and its alias request.organization) is lazy: the
+    Organization is only looked up when a view or permission reads it, and
+    an id that matches no organization raises Http404 at that point.
+    Paths starting with a prefix in settings.TENANT_EXEMPT_PATHS skip tenant
+    handling entirely.
     """
 
     HEADER_NAME = "HTTP_X_ORGANIZATION_ID"  # Django prefixes HTTP_ for headers in request.META
 
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.exempt_paths = tuple(getattr(settings, "TENANT_EXEMPT_PATHS", ()))
+
     def process_request(self, request):
+        if request.path.startswith(self.exempt_paths):
+            request.tenant_id = None
+            request.tenant = request.organization = None
+            return None
+
         # preferred: header first
         org_id = None
         # 1) look in headers
@@ -20,15 +47,11 @@ class TenantMiddleware(MiddlewareMixin):
             org_id = request.GET.get("organization_id") or request.GET.get("org_id") or request.GET.get("tenant")
         # 3) fallback to body (not safe for GET) — we do not read body here
 
+        request.tenant_id = org_id or None
         if not org_id:
-            request.tenant = None
+            request.tenant = request.organization = None
             return None
 
-        # Resolve Organization model lazily
-        Organization = apps.get_model("tenants", "Organization")
-        try:
-            org = Organization.objects.filter(id=org_id).first()
-        except Exception:
-            org = None
-        request.tenant = org
+        # Resolved on first access, served from the tenant cache; DB only on a miss
+        request.tenant = request.organization = SimpleLazyObject(lambda: _organization_or_404(org_id))
         return None
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0004_organizationinvitation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='webhook_burst',
+            field=models.PositiveIntegerField(default=500),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='webhook_rate',
+            field=models.FloatField(default=50.0),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='webhook_weight',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:29
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Last-Modified of existing rows: their creation rather than the migration time
+    for name in ("Organization", "Plan"):
+        apps.get_model("tenants", name).objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0005_plan_webhook_limits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
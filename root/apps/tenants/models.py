@@ -13,7 +13,14 @@ class Plan(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100, unique=True)
     max_users = models.PositiveIntegerField(default=5)
+
+    # webhook fair queuing (apps/webhooks/scheduling.py): relative share of the
+    # relay when tenants compete, and a token bucket capping deliveries per second
+    webhook_weight = models.PositiveSmallIntegerField(default=1)
+    webhook_rate = models.FloatField(default=50.0)
+    webhook_burst = models.PositiveIntegerField(default=500)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # organization detail ETag (inlines the plan)
 
     def __str__(self):
         return self.name
@@ -27,6 +34,7 @@ class Organization(models.Model):
                               on_delete=models.SET_NULL, null=True, blank=True)
     plan = models.ForeignKey(Plan, null=True, blank=True, on_delete=models.SET_NULL)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # conditional GET / If-Match validator
     is_active = models.BooleanField(default=True)
 
     class Meta:
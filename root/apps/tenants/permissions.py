@@ -1,6 +1,6 @@
 # apps/tenants/permissions.py
 from rest_framework import permissions
-from .models import OrganizationMembership
+from .membership import get_membership, ADMIN_ROLES
 
 class IsTenantProvided(permissions.BasePermission):
     """
@@ -9,7 +9,9 @@ class IsTenantProvided(permissions.BasePermission):
     message = "Organization (tenant) is required in request header: X-ORGANIZATION-ID"
 
     def has_permission(self, request, view):
-        return getattr(request, 'organization', None) is not None
+        # request.organization is None without a tenant header; reading an
+        # unknown one raises Http404 (apps/tenants/middleware.py)
+        return bool(getattr(request, 'organization', None))
 
 
 class IsOrgOwnerOrAdmin(permissions.BasePermission):
@@ -43,10 +45,6 @@ class IsOrgOwnerOrAdmin(permissions.BasePermission):
             if getattr(org, "owner_id", None) == getattr(user, "pk", None):
                 return True
 
-        # Check for an active membership with allowed roles
-        return OrganizationMembership.objects.filter(
-            user=user,
-            organization=org,
-            is_active=True,
-            role__in=(OrganizationMembership.ROLE_OWNER, OrganizationMembership.ROLE_ADMIN)
-        ).exists()
+        # Check for an active membership with allowed roles (memoized per request)
+        membership = get_membership(request, org)
+        return bool(membership and membership.is_active and membership.role in ADMIN_ROLES)
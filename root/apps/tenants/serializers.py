@@ -1,14 +1,15 @@
 from rest_framework import serializers
+from root.utils.sparse import SparseFieldsMixin
 from .models import Organization, OrganizationMembership, Plan
 
 
 class PlanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Plan
-        fields = ['id', 'name', 'max_users']
+        fields = ['id', 'name', 'max_users', 'webhook_weight', 'webhook_rate', 'webhook_burst']
 
 
-class OrganizationSerializer(serializers.ModelSerializer):
+class OrganizationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     plan = PlanSerializer(read_only=True)
     plan_id = serializers.PrimaryKeyRelatedField(queryset=Plan.objects.all(), source='plan', write_only=True, required=False)
 
@@ -25,9 +26,17 @@ class OrganizationSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class OrganizationMembershipSerializer(serializers.ModelSerializer):
+class OrganizationMembershipSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
     class Meta:
         model = OrganizationMembership
         fields = ['id', 'user', 'organization', 'role', 'joined_at', 'is_active']
         read_only_fields = ['id', 'joined_at']
+
+
+class OrganizationSummarySerializer(serializers.ModelSerializer):
+    """Read-only organization shape used when a membership inlines it (?expand=organization)."""
+    class Meta:
+        model = Organization
+        fields = ['id', 'name', 'slug', 'is_active']
+        read_only_fields = fields
@@ -0,0 +1,43 @@
+# apps/tenants/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Organization, OrganizationMembership, Plan
+from .cache import (
+    ORGANIZATIONS_SCOPE, PLANS_SCOPE, bump_on_commit, invalidate_organization, tenant_scope,
+    user_organizations_scope,
+)
+from .membership import invalidate_membership
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def organization_changed(sender, instance: Organization, **kwargs):
+    """
+    Drop the cached tenant so the next request reloads it. Deferred to commit,
+    so a concurrent request can't re-cache the row as it was before the save.
+    """
+    org_id = instance.pk
+    transaction.on_commit(lambda: invalidate_organization(org_id))
+    # membership lists inline the organization with ?expand=organization
+    bump_on_commit(ORGANIZATIONS_SCOPE, tenant_scope(instance.pk, "members"))
+
+
+@receiver(post_save, sender=OrganizationMembership)
+@receiver(post_delete, sender=OrganizationMembership)
+def membership_changed(sender, instance: OrganizationMembership, **kwargs):
+    """
+    Drop the cached membership and revoke token claims so role/is_active
+    changes apply on the next request; on commit, like organization_changed.
+    """
+    org_id, user_id = instance.organization_id, instance.user_id
+    transaction.on_commit(lambda: invalidate_membership(org_id, user_id))
+    bump_on_commit(tenant_scope(instance.organization_id, "members"), user_organizations_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def plan_changed(sender, instance: Plan, **kwargs):
+    """Organization responses inline the plan, so they are stale too."""
+    bump_on_commit(PLANS_SCOPE, ORGANIZATIONS_SCOPE)
@@ -0,0 +1,338 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.tasks.permissions import IsOrgMember
+from root.utils.renderers import ORJSONRenderer
+
+from .cache import get_organization, invalidate_organization
+from .membership import add_org_claims
+from .middleware import TenantMiddleware
+from .models import Organization, OrganizationMembership, Plan
+from .permissions import IsOrgOwnerOrAdmin
+
+
+class TenantApiTestCase(TestCase):
+    """Two organizations, each with an owner."""
+
+    def setUp(self):
+        self.owner = self.make_user("owner")
+        self.org = self.make_organization("acme", self.owner)
+        self.other_owner = self.make_user("other")
+        self.other_org = self.make_organization("other", self.other_owner)
+
+    def make_user(self, username):
+        return get_user_model().objects.create(username=username)
+
+    def make_organization(self, slug, owner):
+        org = Organization.objects.create(name=slug, slug=slug, owner=owner)
+        self.add_member(owner, org, OrganizationMembership.ROLE_OWNER)
+        return org
+
+    def add_member(self, user, org, role=OrganizationMembership.ROLE_MEMBER):
+        return OrganizationMembership.objects.create(user=user, organization=org, role=role)
+
+    def client_for(self, user, org):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.credentials(HTTP_X_ORGANIZATION_ID=str(org.pk))
+        return client
+
+
+class OrganizationDetailTenancyTests(TenantApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.owner, self.org)
+        self.url = reverse("organizations-detail", args=[self.org.pk])
+        self.foreign_url = reverse("organizations-detail", args=[self.other_org.pk])
+
+    def test_other_organizations_are_not_found(self):
+        etag = self.client_for(self.other_owner, self.other_org).get(self.foreign_url)["ETag"]
+        responses = {
+            "GET": self.client.get(self.foreign_url),
+            "conditional GET": self.client.get(self.foreign_url, HTTP_IF_NONE_MATCH=etag),
+            "PUT": self.client.put(self.foreign_url, {"name": "mine", "slug": "mine"}, format="json"),
+            "PATCH": self.client.patch(self.foreign_url, {"name": "mine"}, format="json", HTTP_IF_MATCH=etag),
+            "DELETE": self.client.delete(self.foreign_url),
+        }
+        for name, response in responses.items():
+            self.assertEqual(response.status_code, 404, name)
+        self.other_org.refresh_from_db()
+        self.assertEqual(self.other_org.name, "other")
+
+    def test_a_tenant_header_of_a_foreign_organization_is_forbidden(self):
+        client = self.client_for(self.owner, self.other_org)
+        self.assertEqual(client.get(self.foreign_url).status_code, 403)
+        self.assertEqual(client.get(self.foreign_url, HTTP_IF_NONE_MATCH="*").status_code, 403)
+
+    def test_members_read_and_admins_write(self):
+        member = self.make_user("member")
+        self.add_member(member, self.org)
+        client = self.client_for(member, self.org)
+        self.assertEqual(client.get(self.url).status_code, 200)
+        self.assertEqual(client.patch(self.url, {"name": "Renamed"}, format="json").status_code, 403)
+        self.assertEqual(self.client.patch(self.url, {"name": "Renamed"}, format="json").status_code, 200)
+
+    def test_conditional_requests(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.patch(self.url, {"name": "New"}, format="json", HTTP_IF_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.patch(self.url, {"name": "Newer"}, format="json", HTTP_IF_MATCH=etag).status_code, 412)
+
+
+class MembersOnlyView(APIView):
+    permission_classes = [IsOrgMember]
+
+    def get(self, request):
+        return Response(status=204)
+
+
+class AdminsOnlyView(APIView):
+    permission_classes = [IsOrgOwnerOrAdmin]
+
+    def post(self, request):
+        return Response(status=204)
+
+
+urlpatterns = [
+    path("members-only", MembersOnlyView.as_view()),
+    path("admins-only", AdminsOnlyView.as_view()),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class MembershipClaimTests(TenantApiTestCase):
+    """Tokens scoped to an organization (org_id/role/mv claims) and their revocation."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = self.make_user("admin")
+        self.membership = self.add_member(self.admin, self.org, OrganizationMembership.ROLE_ADMIN)
+
+    def client_with_token(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}", HTTP_X_ORGANIZATION_ID=str(self.org.pk))
+        return client
+
+    def scoped_token(self):
+        return add_org_claims(AccessToken.for_user(self.admin), self.membership)
+
+    def read(self, client):
+        return client.get("/members-only").status_code
+
+    def write(self, client):
+        return client.post("/admins-only").status_code
+
+    def membership_queries(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.read(client), 204)
+        return [q["sql"] for q in queries if OrganizationMembership._meta.db_table in q["sql"]]
+
+    def test_current_claims_skip_the_membership_lookup(self):
+        client = self.client_with_token(self.scoped_token())
+        self.assertEqual(self.membership_queries(client), [])
+        self.assertEqual(self.write(client), 204)
+
+    def test_a_stale_version_falls_back_to_the_membership_row(self):
+        token = self.scoped_token()
+        token["mv"] -= 1
+        token["role"] = OrganizationMembership.ROLE_OWNER
+        OrganizationMembership.objects.filter(pk=self.membership.pk).update(role=OrganizationMembership.ROLE_MEMBER)
+        client = self.client_with_token(token)
+        self.assertNotEqual(self.membership_queries(client), [])
+        # the row's role applies, not the claimed one
+        self.assertEqual(self.write(client), 403)
+
+    def test_a_role_change_revokes_issued_tokens(self):
+        client = self.client_with_token(self.scoped_token())
+        self.assertEqual(self.write(client), 204)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.role = OrganizationMembership.ROLE_MEMBER
+            self.membership.save()
+        self.assertEqual(self.write(client), 403)
+        self.assertEqual(self.read(client), 204)
+
+    def test_removal_revokes_issued_tokens(self):
+        client = self.client_with_token(self.scoped_token())
+        self.assertEqual(self.read(client), 204)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.membership.delete()
+        self.assertEqual(self.read(client), 403)
+
+
+class TenantCacheTests(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="acme", slug="acme")
+
+    def test_lookups_after_the_first_are_served_from_the_cache(self):
+        get_organization(self.org.pk)
+        with self.assertNumQueries(0):
+            org = get_organization(str(self.org.pk).upper())
+        self.assertEqual((org.pk, org.name), (self.org.pk, "acme"))
+
+    def test_each_lookup_builds_its_own_instance(self):
+        first = get_organization(self.org.pk)
+        first.name = "changed"
+        self.assertIsNot(get_organization(self.org.pk), first)
+        self.assertEqual(get_organization(self.org.pk).name, "acme")
+
+    def test_saves_invalidate_on_commit(self):
+        get_organization(self.org.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.org.name = "renamed"
+            self.org.save()
+        # until the transaction commits, other requests may only see the old row
+        self.assertEqual(get_organization(self.org.pk).name, "acme")
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_organization(self.org.pk).name, "renamed")
+
+    def test_non_uuid_ids_resolve_to_none_without_a_query(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_organization("not-a-uuid"))
+
+
+class TenantMiddlewareTests(TenantApiTestCase):
+    def process(self, path, org_id):
+        request = RequestFactory().get(path, HTTP_X_ORGANIZATION_ID=str(org_id))
+        TenantMiddleware(lambda request: None).process_request(request)
+        return request
+
+    @override_settings(TENANT_EXEMPT_PATHS=("/swagger", "/userslogin"))
+    def test_exempt_paths_skip_tenant_resolution(self):
+        with self.assertNumQueries(0):
+            request = self.process("/userslogin", self.org.pk)
+        self.assertIsNone(request.organization)
+        self.assertIsNone(request.tenant_id)
+
+    def test_an_untouched_tenant_is_never_loaded(self):
+        invalidate_organization(self.org.pk)
+        with self.assertNumQueries(0):
+            request = self.process("/tasks/", self.org.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(request.organization.pk, self.org.pk)
+
+    def test_without_a_header_the_tenant_is_none(self):
+        request = RequestFactory().get("/tasks/")
+        TenantMiddleware(lambda request: None).process_request(request)
+        self.assertIsNone(request.organization)
+
+    def test_unknown_organizations_are_not_found(self):
+        request = self.process("/tasks/", uuid.uuid4())
+        with self.assertRaises(Http404):
+            bool(request.organization)
+
+        client = self.client_for(self.owner, self.org)
+        client.credentials(HTTP_X_ORGANIZATION_ID=str(uuid.uuid4()))
+        self.assertEqual(client.get(reverse("memberships-list")).status_code, 404)
+
+
+class ResponseEnvelopeTests(TenantApiTestCase):
+    def request_id(self, value):
+        client = self.client_for(self.owner, self.org)
+        return client.get(reverse("memberships-list"), HTTP_X_REQUEST_ID=value).json()["request_id"]
+
+    def test_incoming_request_ids_are_reused(self):
+        for value in ("3f2a9c1e-5b7d-4e2a-9f3c-1a2b3c4d5e6f", "trace.abc:01-xyz", "a" * 128):
+            self.assertEqual(self.request_id(value), value)
+
+    def test_junk_request_ids_are_replaced(self):
+        for value in ("a" * 129, "bad id", "x\u2028y", "<script>", "id\tinjected"):
+            minted = self.request_id(value)
+            self.assertNotEqual(minted, value)
+            uuid.UUID(minted)
+
+    def test_orjson_output_matches_the_json_renderer(self):
+        data = {
+            "utc": datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+            "offset": datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+            "naive": datetime(2025, 1, 2, 3, 4, 5),
+            "date": date(2025, 1, 2),
+            "decimal": Decimal("12.50"),
+            "uuid": uuid.UUID("3f2a9c1e-5b7d-4e2a-9f3c-1a2b3c4d5e6f"),
+            "nested": [{"none": None, "text": "naïve ✓", "bool": True, "int": 7}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_str_keys_are_rendered(self):
+        # e.g. the per-index error maps of the bulk task endpoint
+        self.assertEqual(ORJSONRenderer().render({1: "a"}), JSONRenderer().render({1: "a"}))
+
+
+class SparseListTests(TenantApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.plan = Plan.objects.create(name="Pro", max_users=50)
+        Organization.objects.filter(pk=self.org.pk).update(plan=self.plan)
+        for slug in ("beta", "gamma"):
+            org = self.make_organization(slug, self.make_user(slug))
+            self.add_member(self.owner, org)
+            Organization.objects.filter(pk=org.pk).update(plan=self.plan)
+        for username in ("ann", "bob"):
+            self.add_member(self.make_user(username), self.org)
+        self.client = self.client_for(self.owner, self.org)
+
+    def get(self, name, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name), query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()["meta"], [q["sql"] for q in queries]
+
+    def selects_from(self, queries, model):
+        table = connection.ops.quote_name(model._meta.db_table)
+        return [sql for sql in queries if sql.startswith("SELECT") and f"FROM {table}" in sql]
+
+    def selected_columns(self, sql):
+        return {column.rsplit(".", 1)[-1].strip('" ') for column in sql.split(" FROM ", 1)[0].split(",")}
+
+    def test_organization_fields_narrow_the_output_and_the_select(self):
+        data, queries = self.get("organizations-list", {"fields": "id,name"})
+        self.assertEqual(len(data), 3)
+        self.assertEqual({frozenset(item) for item in data}, {frozenset({"id", "name"})})
+        [select] = self.selects_from(queries, Organization)
+        # created_at rides along for the DISTINCT ... ORDER BY
+        self.assertEqual(self.selected_columns(select), {"id", "name", "created_at"})
+
+    def test_organizations_inline_the_plan_and_expand_the_owner_in_one_query(self):
+        data, queries = self.get("organizations-list", {"fields": "id,plan", "expand": "owner"})
+        self.assertEqual({item["plan"]["name"] for item in data}, {"Pro"})
+        self.assertEqual({item["owner"]["username"] for item in data}, {"owner", "beta", "gamma"})
+        self.assertEqual(len(self.selects_from(queries, Organization)), 1)
+        self.assertEqual(self.selects_from(queries, Plan), [])
+        self.assertEqual(self.selects_from(queries, get_user_model()), [])
+
+    def test_membership_fields_narrow_the_output_and_the_select(self):
+        data, queries = self.get("memberships-list", {"fields": "id,role"})
+        self.assertEqual(len(data), 3)
+        self.assertEqual({frozenset(item) for item in data}, {frozenset({"id", "role"})})
+        [select] = self.selects_from(queries, OrganizationMembership)
+        self.assertEqual(self.selected_columns(select), {"id", "role"})
+
+    def test_memberships_expand_the_user_in_one_query(self):
+        data, queries = self.get("memberships-list", {"fields": "role", "expand": "user"})
+        self.assertEqual({item["user"]["username"] for item in data}, {"owner", "ann", "bob"})
+        self.assertEqual({frozenset(item) for item in data}, {frozenset({"role", "user"})})
+        self.assertEqual(len(self.selects_from(queries, OrganizationMembership)), 1)
+        self.assertEqual(self.selects_from(queries, get_user_model()), [])
+
+    def test_unknown_names_are_rejected(self):
+        for name, query in (
+            ("organizations-list", {"fields": "id,secret"}),
+            ("organizations-list", {"expand": "plan"}),
+            ("memberships-list", {"fields": "password"}),
+            ("memberships-list", {"expand": "owner"}),
+        ):
+            response = self.client.get(reverse(name), query)
+            self.assertEqual(response.status_code, 400, (name, query))
@@ -4,19 +4,48 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.http import Http404
 from .models import Organization, OrganizationMembership, Plan
 from .serializers import (
     OrganizationSerializer,
     OrganizationMembershipSerializer,
+    OrganizationSummarySerializer,
     PlanSerializer
 )
+from apps.users.serializers import UserSummarySerializer
+from .cache import (
+    ORGANIZATIONS_SCOPE, PLANS_SCOPE, USERS_SCOPE, cached_response_data, tenant_scope, user_organizations_scope,
+)
+from root.utils.conditional import conditional_response, is_conditional, make_validators, with_validators
+from root.utils.sparse import parse_field_list, expand_fields, narrow_queryset, InvalidFieldSelection
 from .permissions import IsTenantProvided, IsOrgOwnerOrAdmin
+from apps.tasks.permissions import IsOrgMember, IsOrgAdminOrOwner
 from .response import success_response, error_response
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .response import success_response, error_response
 from django.contrib.auth.models import User
 
+# ?expand= name -> serializer inlined in place of the primary key
+ORGANIZATION_EXPANSIONS = {"owner": UserSummarySerializer}
+MEMBERSHIP_EXPANSIONS = {"user": UserSummarySerializer, "organization": OrganizationSummarySerializer}
+
+
+def organization_validators(pk, updated_at, plan_updated_at=None):
+    # the detail body inlines the plan, so a plan edit is a new version too
+    last_modified = max(filter(None, (updated_at, plan_updated_at)))
+    return make_validators("organization", pk, updated_at.isoformat(), plan_updated_at, last_modified=last_modified)
+
+
+def _organization_version(org):
+    return organization_validators(org.pk, org.updated_at, org.plan.updated_at if org.plan else None)
+
+
+def _request_organization(request, pk):
+    """The organization `pk` if it is the request's tenant; any other is a 404."""
+    return Organization.objects.filter(pk=request.organization.pk).filter(pk=pk)
+
 
 class PlanListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -30,9 +59,11 @@ class PlanListView(APIView):
 
     def get(self, request):
         try:
-            queryset = Plan.objects.all()
-            serializer = PlanSerializer(queryset, many=True)
-            return success_response(serializer.data, "Plans fetched successfully", request=request)
+            data = cached_response_data(
+                request, "plans.list", [PLANS_SCOPE],
+                lambda: PlanSerializer(Plan.objects.all(), many=True).data,
+            )
+            return success_response(data, "Plans fetched successfully", request=request)
         except Exception as e:
             return error_response(str(e), "Something went wrong", status.HTTP_500_INTERNAL_SERVER_ERROR, request)
 
@@ -44,19 +75,47 @@ class OrganizationListCreateView(APIView):
     @swagger_auto_schema(
         operation_summary="List My Organizations",
         tags=["Organizations"],
+        manual_parameters=[
+            openapi.Parameter("fields", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                              description="Comma-separated subset of fields, e.g. id,name"),
+            openapi.Parameter("expand", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                              description="Inline related objects: owner"),
+        ],
         responses={200: OrganizationSerializer(many=True)}
     )
 
     def get(self, request):
+        try:
+            fields = parse_field_list(request, "fields", OrganizationSerializer.readable_field_names())
+            expand = parse_field_list(request, "expand", ORGANIZATION_EXPANSIONS) or []
+        except InvalidFieldSelection as e:
+            return error_response(str(e), "Invalid field selection", status.HTTP_400_BAD_REQUEST, request)
+
         try:
             user = request.user
-            if user.is_superuser:
-                orgs = Organization.objects.all()
-            else:
-                orgs = Organization.objects.filter(memberships__user=user).distinct()
 
-            serializer = OrganizationSerializer(orgs, many=True)
-            return success_response(serializer.data, "Organizations fetched successfully", request=request)
+            def organizations():
+                if user.is_superuser:
+                    orgs = Organization.objects.all()
+                else:
+                    orgs = Organization.objects.filter(memberships__user=user).distinct()
+
+                orgs = narrow_queryset(orgs, OrganizationSerializer(
+                    fields=fields, expand=expand_fields(expand, ORGANIZATION_EXPANSIONS),
+                ))
+                return OrganizationSerializer(
+                    orgs, many=True, fields=fields, expand=expand_fields(expand, ORGANIZATION_EXPANSIONS),
+                ).data
+
+            # per user, not per tenant: the list spans the user's organizations.
+            # superusers see every organization, which ORGANIZATIONS_SCOPE covers
+            scopes = [ORGANIZATIONS_SCOPE, user_organizations_scope(user.pk)]
+            if "owner" in expand:
+                scopes.append(USERS_SCOPE)
+            data = cached_response_data(
+                request, "organizations.list", scopes, organizations, vary=(user.pk, user.is_superuser),
+            )
+            return success_response(data, "Organizations fetched successfully", request=request)
         except Exception as e:
             return error_response(str(e), "Failed to fetch organizations", status.HTTP_500_INTERNAL_SERVER_ERROR, request)
 
@@ -82,62 +141,96 @@ class OrganizationListCreateView(APIView):
 
 
 class OrganizationDetailView(APIView):
-    permission_classes = [permissions.IsAuthenticated, IsTenantProvided]
+    # members read their organization; owners/admins change it
+    permission_classes = [permissions.IsAuthenticated, IsTenantProvided, IsOrgMember, IsOrgAdminOrOwner]
     # permission_classes = []
 
     # ---------------------- GET ----------------------
     @swagger_auto_schema(
         operation_summary="Get Organization Details",
+        operation_description="Sends ETag and Last-Modified; If-None-Match / If-Modified-Since "
+                              "return 304 Not Modified when the organization is unchanged.",
         tags=["Organizations"],
+        manual_parameters=[
+            openapi.Parameter("If-None-Match", openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False),
+            openapi.Parameter("If-Modified-Since", openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False),
+        ],
         responses={200: OrganizationSerializer}
     )
     def get(self, request, pk=None):
         try:
-            org = get_object_or_404(Organization, pk=pk)
+            if is_conditional(request):
+                # validate against the timestamps alone; an unchanged organization is never serialized
+                stamps = _request_organization(request, pk).values_list("updated_at", "plan__updated_at").first()
+                if stamps is None:
+                    raise Http404
+                not_modified = conditional_response(request, organization_validators(pk, *stamps))
+                if not_modified is not None:
+                    return not_modified
+
+            org = get_object_or_404(_request_organization(request, pk).select_related("plan"))
             serializer = OrganizationSerializer(org)
-            return success_response(serializer.data, "Organization details fetched", request=request)
+            response = success_response(serializer.data, "Organization details fetched", request=request)
+            return with_validators(response, _organization_version(org))
         except Exception as e:
             return error_response(str(e), "Organization not found", status.HTTP_404_NOT_FOUND, request)
 
+    def _update(self, request, pk, partial, message):
+        queryset = _request_organization(request, pk).select_related("plan")
+        if is_conditional(request):
+            # hold the row from the If-Match check to the save
+            queryset = queryset.select_for_update(of=("self",))
+
+        with transaction.atomic():
+            org = get_object_or_404(queryset)
+            failed = conditional_response(request, _organization_version(org))
+            if failed is not None:
+                return failed
+            serializer = OrganizationSerializer(org, data=request.data, partial=partial)
+            if not serializer.is_valid():
+                return error_response(serializer.errors, "Validation failed", status.HTTP_400_BAD_REQUEST, request)
+            serializer.save()
+
+        response = success_response(serializer.data, message, request=request)
+        return with_validators(response, _organization_version(org))
+
     # ---------------------- PUT (Full Update) ----------------------
     @swagger_auto_schema(
         operation_summary="Update Organization (Full Update)",
+        operation_description="Send the ETag of the version being edited as If-Match to get "
+                              "412 Precondition Failed instead of overwriting a newer change.",
         tags=["Organizations"],
         request_body=OrganizationSerializer,
+        manual_parameters=[
+            openapi.Parameter("If-Match", openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False),
+        ],
         responses={200: OrganizationSerializer}
     )
     def put(self, request, pk=None):
         try:
-            org = get_object_or_404(Organization, pk=pk)
-            serializer = OrganizationSerializer(org, data=request.data)
-
-            if serializer.is_valid():
-                serializer.save()
-                return success_response(serializer.data, "Organization updated successfully", request=request)
-
-            return error_response(serializer.errors, "Validation failed", status.HTTP_400_BAD_REQUEST, request)
-
+            return self._update(request, pk, False, "Organization updated successfully")
+        except Http404 as e:
+            return error_response(str(e), "Organization not found", status.HTTP_404_NOT_FOUND, request)
         except Exception as e:
             return error_response(str(e), "Update failed", status.HTTP_500_INTERNAL_SERVER_ERROR, request)
 
     # ---------------------- PATCH (Partial Update) ----------------------
     @swagger_auto_schema(
         operation_summary="Update Organization (Partial Update)",
+        operation_description="Send the ETag of the version being edited as If-Match to get "
+                              "412 Precondition Failed instead of overwriting a newer change.",
         tags=["Organizations"],
         request_body=OrganizationSerializer,
+        manual_parameters=[
+            openapi.Parameter("If-Match", openapi.IN_HEADER, type=openapi.TYPE_STRING, required=False),
+        ],
         responses={200: OrganizationSerializer}
     )
     def patch(self, request, pk=None):
         try:
-            org = get_object_or_404(Organization, pk=pk)
-            serializer = OrganizationSerializer(org, data=request.data, partial=True)
-
-            if serializer.is_valid():
-                serializer.save()
-                return success_response(serializer.data, "Organization partially updated", request=request)
-
-            return error_response(serializer.errors, "Validation failed", status.HTTP_400_BAD_REQUEST, request)
-
+            return self._update(request, pk, True, "Organization partially updated")
+        except Http404 as e:
+            return error_response(str(e), "Organization not found", status.HTTP_404_NOT_FOUND, request)
         except Exception as e:
             return error_response(str(e), "Partial update failed", status.HTTP_500_INTERNAL_SERVER_ERROR, request)
 
@@ -149,7 +242,7 @@ class OrganizationDetailView(APIView):
     )
     def delete(self, request, pk=None):
         try:
-            org = get_object_or_404(Organization, pk=pk)
+            org = get_object_or_404(_request_organization(request, pk))
             org.delete()
 
             return success_response(
@@ -159,6 +252,8 @@ class OrganizationDetailView(APIView):
                 request=request
             )
 
+        except Http404 as e:
+            return error_response(str(e), "Organization not found", status.HTTP_404_NOT_FOUND, request)
         except Exception as e:
             return error_response(str(e), "Delete failed", status.HTTP_500_INTERNAL_SERVER_ERROR, request)
 
@@ -224,16 +319,38 @@ class MembershipListView(APIView):
                 description="Organization ID",
                 type=openapi.TYPE_STRING,
                 required=True
-            )
+            ),
+            openapi.Parameter("fields", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                              description="Comma-separated subset of fields, e.g. id,user,role"),
+            openapi.Parameter("expand", openapi.IN_QUERY, type=openapi.TYPE_STRING, required=False,
+                              description="Inline related objects: user, organization"),
         ],
         responses={200: OrganizationMembershipSerializer(many=True)}
     )
 
     def get(self, request):
+        try:
+            fields = parse_field_list(request, "fields", OrganizationMembershipSerializer.readable_field_names())
+            expand = parse_field_list(request, "expand", MEMBERSHIP_EXPANSIONS) or []
+        except InvalidFieldSelection as e:
+            return error_response(str(e), "Invalid field selection", status.HTTP_400_BAD_REQUEST, request)
+
         try:
             org = request.organization
-            memberships = OrganizationMembership.objects.filter(organization=org)
-            serializer = OrganizationMembershipSerializer(memberships, many=True)
-            return success_response(serializer.data, "Members fetched successfully", request=request)
+
+            def members():
+                memberships = narrow_queryset(
+                    OrganizationMembership.objects.filter(organization=org),
+                    OrganizationMembershipSerializer(fields=fields, expand=expand_fields(expand, MEMBERSHIP_EXPANSIONS)),
+                )
+                return OrganizationMembershipSerializer(
+                    memberships, many=True, fields=fields, expand=expand_fields(expand, MEMBERSHIP_EXPANSIONS),
+                ).data
+
+            scopes = [tenant_scope(org.pk, "members")]
+            if "user" in expand:
+                scopes.append(USERS_SCOPE)
+            data = cached_response_data(request, "memberships.list", scopes, members)
+            return success_response(data, "Members fetched successfully", request=request)
         except Exception as e:
             return error_response(str(e), "Failed to fetch members", status.HTTP_500_INTERNAL_SERVER_ERROR, request)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.users"
+
+    def ready(self):
+        # import signals so they are registered
+        from . import signals  # noqa: F401
@@ -0,0 +1,86 @@
+# apps/users/authentication.py
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from root.utils.cache import TwoTierCache
+
+# Profile fields kept in the snapshot; anything else is deferred and only
+# loaded from the DB if something actually reads it.
+SNAPSHOT_FIELDS = (
+    "id", "username", "email", "first_name", "last_name",
+    "display_name", "avatar", "is_active", "is_staff", "is_superuser",
+)
+
+user_snapshot_cache = TwoTierCache(
+    "users:snapshot",
+    local_maxsize=getattr(settings, "USER_SNAPSHOT_CACHE_LOCAL_MAXSIZE", 4096),
+    local_ttl=getattr(settings, "USER_SNAPSHOT_CACHE_LOCAL_TTL", 30),
+    shared_ttl=getattr(settings, "USER_SNAPSHOT_CACHE_SHARED_TTL", 300),
+)
+
+
+def _snapshot_field_names(User):
+    # from_db() expects names in concrete-field order
+    return [f.attname for f in User._meta.concrete_fields if f.attname in SNAPSHOT_FIELDS]
+
+
+def get_user_snapshot(user_id):
+    """
+    Return a users.User built from the cached profile snapshot (or None).
+
+    The instance is a normal model instance (usable as an FK value or in
+    filters); fields outside SNAPSHOT_FIELDS are deferred.
+    """
+    User = get_user_model()
+    field_names = _snapshot_field_names(User)
+
+    def load():
+        return User.objects.filter(pk=user_id).values(*field_names).first()
+
+    snapshot = user_snapshot_cache.get_or_load(str(user_id), load)
+    if snapshot is None:
+        return None
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, [snapshot[name] for name in field_names])
+
+
+def invalidate_user_snapshot(user_id):
+    user_snapshot_cache.invalidate(str(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that builds request.user from the token's user id plus a
+    cached profile snapshot instead of loading the users.User row per request.
+
+    Views that mutate the user list the affected HTTP methods in
+    ``db_user_methods``; those requests get the full row from the DB.
+    """
+
+    def authenticate(self, request):
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        self.load_full_user = request.method in getattr(view, "db_user_methods", ())
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if getattr(self, "load_full_user", False) or getattr(api_settings, "CHECK_REVOKE_TOKEN", False):
+            # password hash checks and user updates need the real row
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = get_user_snapshot(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
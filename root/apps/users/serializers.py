@@ -46,6 +46,14 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "username", "email")
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Public, read-only user shape used when another resource inlines a user (?expand=)."""
+    class Meta:
+        model = User
+        fields = ("id", "username", "display_name", "avatar")
+        read_only_fields = fields
+
+
 class AdminUserSerializer(serializers.ModelSerializer):
     """Used when admin/staff reads or updates other users."""
     class Meta:
@@ -80,11 +88,12 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
                 if membership:
                     # Create a fresh token with additional claims
                     from rest_framework_simplejwt.tokens import RefreshToken
+                    from apps.tenants.membership import add_org_claims
                     refresh = RefreshToken.for_user(self.user)
                     access = refresh.access_token
-                    # keep IDs as strings (UUIDs) to avoid int() failures
-                    access["org_id"] = str(org_id)
-                    access["role"] = membership.role
+                    # keep IDs as strings (UUIDs) to avoid int() failures;
+                    # also stamps the membership version used for revocation
+                    add_org_claims(access, membership)
 
                     data["refresh"] = str(refresh)
                     data["access"] = str(access)
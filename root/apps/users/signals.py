@@ -0,0 +1,25 @@
+# apps/users/signals.py
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.tenants.cache import USERS_SCOPE, bump_on_commit
+
+from .authentication import invalidate_user_snapshot
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """
+    Drop the cached profile snapshot used by CachedJWTAuthentication, once the
+    change commits (a concurrent request could otherwise re-cache the old row).
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user_snapshot(user_id))
+    # a login only stamps last_login, which no ?expand= summary shows
+    if kwargs.get("update_fields") != frozenset({"last_login"}):
+        bump_on_commit(USERS_SCOPE)
@@ -1,3 +1,65 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import CachedJWTAuthentication
+from .views import UserMeAPIView
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="alice", display_name="Alice")
+        self.token = str(AccessToken.for_user(self.user))
+
+    def authenticate(self, method="GET", view=None):
+        request = getattr(APIRequestFactory(), method.lower())("/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        request = APIView().initialize_request(request)
+        request.parser_context = {"view": view}
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def api_client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        return client
+
+    def test_later_requests_are_served_from_the_snapshot(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.username, user.display_name), (self.user.pk, "alice", "Alice"))
+
+    def test_saving_the_user_drops_the_snapshot_on_commit(self):
+        self.authenticate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.display_name = "Alicia"
+            self.user.save()
+        self.assertEqual(self.authenticate().display_name, "Alicia")
+
+    def test_deactivated_users_are_rejected(self):
+        url = reverse("user-me")
+        self.assertEqual(self.api_client().get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.api_client().get(url).status_code, 401)
+
+    def test_db_user_methods_get_the_full_row(self):
+        self.authenticate()
+        self.assertTrue(self.authenticate("GET", UserMeAPIView()).get_deferred_fields())
+        with self.assertNumQueries(1):
+            user = self.authenticate("PATCH", UserMeAPIView())
+        self.assertEqual(user.get_deferred_fields(), set())
+
+    def test_profile_updates_keep_unsnapshotted_fields(self):
+        self.user.set_password("secret-pass")
+        self.user.save()
+        self.authenticate()
+        response = self.api_client().patch(reverse("user-me"), {"display_name": "Al"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.display_name, "Al")
+        self.assertTrue(self.user.check_password("secret-pass"))
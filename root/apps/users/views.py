@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response  # only used by drf-yasg examples, logic uses custom_response
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+import uuid
 from .models import *
 from apps.tenants.models import OrganizationInvitation, OrganizationMembership  # if you want to auto-join on activation
 
@@ -217,6 +218,8 @@ class UserMeAPIView(APIView):
     PUT/PATCH -> update current user's profile
     """
     permission_classes = [permissions.IsAuthenticated]
+    # CachedJWTAuthentication loads the full user row only for these methods
+    db_user_methods = ("PUT", "PATCH")
 
     @swagger_auto_schema(
         operation_description="Get current user's profile.",
@@ -258,13 +261,13 @@ class SwitchOrgAPIView(APIView):
     @swagger_auto_schema(
         operation_description="Switch current organization (must be a member). Returns new tokens scoped to the org.",
         request_body=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
-            'org_id': openapi.Schema(type=openapi.TYPE_INTEGER)
+            'org_id': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID)
         }),
         responses={
             200: openapi.Response("Tokens", schema=openapi.Schema(type=openapi.TYPE_OBJECT, properties={
                 'refresh': openapi.Schema(type=openapi.TYPE_STRING),
                 'access': openapi.Schema(type=openapi.TYPE_STRING),
-                'org_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'org_id': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_UUID),
                 'role': openapi.Schema(type=openapi.TYPE_STRING),
             })),
             400: "Bad request",
@@ -277,14 +280,15 @@ class SwitchOrgAPIView(APIView):
         if org_id_raw is None:
             return custom_response("org_id is required", status_code=status.HTTP_400_BAD_REQUEST, request=request, error="missing_org_id")
 
-        # normalize org_id to int (handle string input)
+        # normalize org_id to the canonical UUID string (organizations use UUID PKs)
         try:
-            org_id = int(org_id_raw)
+            org_id = str(uuid.UUID(str(org_id_raw)))
         except (ValueError, TypeError):
-            return custom_response("org_id must be an integer", status_code=status.HTTP_400_BAD_REQUEST, request=request, error="invalid_org_id")
+            return custom_response("org_id must be a valid UUID", status_code=status.HTTP_400_BAD_REQUEST, request=request, error="invalid_org_id")
 
         try:
             from apps.tenants.models import OrganizationMembership
+            from apps.tenants.membership import add_org_claims
         except Exception:
             return custom_response("Tenants app is not available", status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, request=request, error="tenants_missing")
 
@@ -294,8 +298,7 @@ class SwitchOrgAPIView(APIView):
 
         refresh = RefreshToken.for_user(request.user)
         access = refresh.access_token
-        access["org_id"] = org_id
-        access["role"] = membership.role
+        add_org_claims(access, membership)
 
         return custom_response("Organization switched.", data={
             "refresh": str(refresh),
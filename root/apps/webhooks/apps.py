@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class WebhooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.webhooks'
+
+    def ready(self):
+        # import signals so they are registered
+        from . import signals  # noqa: F401
@@ -0,0 +1,107 @@
+# apps/webhooks/batching.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .health import BATCH_EVENT, Delivery, gate_deliveries, is_open
+from .models import WebhookBatchItem, WebhookEvent, WebhookParkedDelivery, WebhookSubscription
+
+
+def buffer_events(pairs):
+    """Buffer (subscription_id, WebhookEvent) pairs for batched subscriptions, in order."""
+    WebhookBatchItem.objects.bulk_create(
+        [WebhookBatchItem(subscription_id=sid, event=event) for sid, event in pairs]
+    )
+
+
+def _batch_body(bodies):
+    # item bodies are already serialized {"event": ..., "payload": ...} objects
+    return "[" + ",".join(bodies) + "]"
+
+
+def _flush(subscription, now):
+    """Move the subscription's oldest buffered items into one batch body; returns its Delivery."""
+    with transaction.atomic():
+        # serializes flushes of one subscription between relays (no-op lock on SQLite)
+        list(WebhookSubscription.objects.select_for_update().filter(pk=subscription.pk).values_list("pk"))
+        if WebhookBatchItem.objects.filter(subscription_id=subscription.pk, batch__isnull=False).exists():
+            return None  # previous batch still in flight; flushing now could reorder events
+        items = list(
+            WebhookBatchItem.objects
+            .filter(subscription_id=subscription.pk, batch__isnull=True)
+            .select_related("event")
+            .order_by("id")[:subscription.batch_max_events]
+        )
+        if not items:
+            return None
+        batch = WebhookEvent.objects.create(event=BATCH_EVENT, body=_batch_body(item.event.body for item in items))
+        WebhookBatchItem.objects.filter(pk__in=[item.pk for item in items]).update(batch=batch, batched_at=now)
+    return Delivery(subscription.pk, subscription.url, subscription.secret, batch.pk, batch.body.encode(),
+                    False, False, True)
+
+
+def _resend_stale(now):
+    """
+    Deliveries for batches in flight longer than WEBHOOK_BATCH_INFLIGHT_TIMEOUT
+    that are not parked (the delivery outcome was lost, e.g. a worker died).
+    """
+    cutoff = now - timedelta(seconds=getattr(settings, "WEBHOOK_BATCH_INFLIGHT_TIMEOUT", 900))
+    stale = (
+        WebhookBatchItem.objects
+        .filter(batch__isnull=False, batched_at__lt=cutoff)
+        .values("subscription_id", "batch_id").distinct()
+    )
+    deliveries = []
+    for row in stale:
+        sid, batch_id = row["subscription_id"], row["batch_id"]
+        if WebhookParkedDelivery.objects.filter(subscription_id=sid, event_id=batch_id).exists() or is_open(sid):
+            continue
+        subscription = WebhookSubscription.objects.filter(pk=sid, is_active=True).only("url", "secret").first()
+        batch = WebhookEvent.objects.filter(pk=batch_id).only("body").first()
+        if subscription is None or batch is None:
+            WebhookBatchItem.objects.filter(subscription_id=sid, batch_id=batch_id).delete()
+            continue
+        WebhookBatchItem.objects.filter(subscription_id=sid, batch_id=batch_id).update(batched_at=now)
+        deliveries.append(Delivery(sid, subscription.url, subscription.secret, batch_id, batch.body.encode(),
+                                   False, False, True))
+    return deliveries
+
+
+def take_due_batches():
+    """
+    Flush every batched subscription whose buffer reached batch_max_events or
+    whose oldest buffered event is older than batch_window_seconds, unless it
+    already has a batch in flight. Returns the deliveries to send (gated
+    through the circuit breakers).
+    """
+    now = timezone.now()
+    buffered = (
+        WebhookBatchItem.objects
+        .filter(batch__isnull=True, subscription__is_active=True)
+        .values("subscription_id")
+        .annotate(count=Count("id"), oldest=Min("created_at"))
+    )
+    due = []
+    if buffered:
+        limits = {
+            s.pk: s for s in WebhookSubscription.objects
+            .filter(pk__in=[row["subscription_id"] for row in buffered])
+            .only("url", "secret", "batch_max_events", "batch_window_seconds")
+        }
+        for row in buffered:
+            subscription = limits[row["subscription_id"]]
+            window = timedelta(seconds=subscription.batch_window_seconds)
+            if row["count"] >= subscription.batch_max_events or row["oldest"] <= now - window:
+                due.append(subscription)
+
+    deliveries = [delivery for delivery in (_flush(s, now) for s in due) if delivery is not None]
+    deliveries.extend(_resend_stale(now))
+    return gate_deliveries(deliveries) if deliveries else []
+
+
+def complete_batch(subscription_id, batch_id):
+    """The batch was delivered (or given up on): drop its items so the next one can flush."""
+    WebhookBatchItem.objects.filter(subscription_id=subscription_id, batch_id=batch_id).delete()
@@ -0,0 +1,170 @@
+# apps/webhooks/delivery.py
+import asyncio
+import logging
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import batching, health
+from .deliverylog import attempt_record, delivery_log
+from .signing import signed_headers
+from .tasks import MAX_RETRIES, retry_countdown
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookDeliveryError(Exception):
+    def __init__(self, message, status=None, body=b""):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+
+class AsyncDeliveryEngine:
+    """
+    Delivers signed webhook bodies on an asyncio event loop.
+
+    - one aiohttp session with keep-alive connections, at most `concurrency`
+      requests in flight overall and `per_host` per receiving host, so one
+      slow receiver can't take every slot. Requests queue for those slots
+      before they start: the `timeout` covers the request alone, not the wait
+      (inside the connector the wait would count against ClientTimeout(total=)
+      and a backlog to one slow host would time out unsent)
+    - same contract as send_webhook_request: X-Webhook-Signature HMAC, status
+      >= 400 / network errors / timeouts are failures, up to MAX_RETRIES
+      retries after retry_countdown(n) seconds. A request slot is not held
+      while waiting for a retry.
+    - submit_delivery() also drives the subscription's circuit breaker like
+      the Celery task: failures are recorded, and a delivery whose circuit
+      opens (or whose probe fails) is parked instead of retried, as is one
+      whose circuit another delivery opened in the meantime. Its attempts
+      go to the delivery log (apps/webhooks/deliverylog.py).
+
+    Use as ``async with AsyncDeliveryEngine() as engine``; submit() /
+    submit_delivery() schedule a delivery and return immediately, drain()
+    waits for all of them.
+    """
+
+    def __init__(self, concurrency=None, per_host=None, timeout=None, max_retries=MAX_RETRIES):
+        self.concurrency = concurrency or getattr(settings, "WEBHOOK_DELIVERY_CONCURRENCY", 200)
+        self.per_host = per_host or getattr(settings, "WEBHOOK_DELIVERY_PER_HOST_LIMIT", 20)
+        self.timeout = timeout or getattr(settings, "WEBHOOK_DELIVERY_TIMEOUT", 5.0)
+        self.max_retries = max_retries
+        self._session = None
+        self._slots = None
+        self._host_slots = {}
+        self._pending = set()
+        self.stats = {"delivered": 0, "failed": 0, "retried": 0, "parked": 0}
+
+    async def __aenter__(self):
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.drain()
+        await self._session.close()
+        await sync_to_async(delivery_log.flush)()
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def submit(self, url, secret, body):
+        """Schedule delivery of `body` (bytes) to `url`, signed with `secret`."""
+        return self._schedule(self._deliver(url, secret, body))
+
+    def submit_delivery(self, delivery):
+        """Schedule a health.Delivery, with circuit breaker bookkeeping."""
+        return self._schedule(self._deliver(delivery.url, delivery.secret, delivery.body, delivery))
+
+    def _schedule(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def drain(self):
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def wait_below(self, limit):
+        """Backpressure: wait until fewer than `limit` deliveries are pending."""
+        while len(self._pending) >= limit:
+            await asyncio.wait(list(self._pending), return_when=asyncio.FIRST_COMPLETED)
+
+    def _host_slot(self, url):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        slot = self._host_slots.get(key)
+        if slot is None:
+            slot = self._host_slots[key] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def _attempt(self, url, headers, body):
+        # the connection goes back to the pool when the response is released
+        async with self._session.post(url, data=body, headers=headers) as response:
+            content = await response.read()
+            if response.status >= 400:
+                raise WebhookDeliveryError(f"Webhook failed: {response.status}", response.status, content)
+            return response.status, content
+
+    async def _log(self, delivery, retries, started, status=None, content=b"", error=None):
+        row = attempt_record(
+            delivery.subscription_id, delivery.event_id, retries + 1, time.monotonic() - started, status, content, error,
+        )
+        if delivery_log.add(row):
+            await sync_to_async(delivery_log.flush)()
+
+    async def _deliver(self, url, secret, body, delivery=None):
+        headers = signed_headers(secret, body)
+        for retries in range(self.max_retries + 1):
+            if retries and delivery is not None and await sync_to_async(health.is_open)(delivery.subscription_id):
+                # another delivery tripped the breaker during the backoff
+                await sync_to_async(health.park)(delivery.subscription_id, delivery.event_id)
+                self.stats["parked"] += 1
+                return False
+            # slots are held for the request only, not for the retry backoff.
+            # The host slot comes first: a backlog to one slow host must not
+            # sit on global slots that requests to other hosts could use.
+            async with self._host_slot(url), self._slots:
+                started = time.monotonic()
+                try:
+                    status, content = await self._attempt(url, headers, body)
+                except (WebhookDeliveryError, aiohttp.ClientError, asyncio.TimeoutError, OSError) as exc:
+                    error = exc
+                else:
+                    error = None
+
+            if error is not None:
+                if delivery is not None:
+                    await self._log(delivery, retries, started, getattr(error, "status", None),
+                                    getattr(error, "body", b""), error)
+                    state = await sync_to_async(health.record_failure)(delivery.subscription_id, error)
+                    if delivery.probe or state != health.CLOSED:
+                        await sync_to_async(health.park)(delivery.subscription_id, delivery.event_id)
+                        self.stats["parked"] += 1
+                        return False
+                if retries == self.max_retries:
+                    self.stats["failed"] += 1
+                    logger.warning("webhook delivery to %s failed after %d retries: %s", url, retries, error)
+                    if delivery is not None and delivery.batch:
+                        await sync_to_async(batching.complete_batch)(delivery.subscription_id, delivery.event_id)
+                    return False
+                self.stats["retried"] += 1
+                await asyncio.sleep(retry_countdown(retries))
+            else:
+                self.stats["delivered"] += 1
+                if delivery is not None:
+                    await self._log(delivery, retries, started, status, content)
+                if delivery is not None and (delivery.probe or delivery.suspect or retries):
+                    await sync_to_async(health.record_success)(delivery.subscription_id)
+                if delivery is not None and delivery.batch:
+                    await sync_to_async(batching.complete_batch)(delivery.subscription_id, delivery.event_id)
+                return True
@@ -0,0 +1,117 @@
+# apps/webhooks/deliverylog.py
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .models import WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+
+def _response_chars():
+    return getattr(settings, "WEBHOOK_DELIVERY_LOG_RESPONSE_CHARS", 1024)
+
+
+def attempt_record(subscription_id, event_id, attempt, duration, status_code=None, response_body=b"", error=None):
+    """An unsaved WebhookDelivery for one attempt; duration in seconds, response_body bytes or str."""
+    if isinstance(response_body, bytes):
+        response_body = response_body[:_response_chars() * 4].decode("utf-8", "replace")
+    success = error is None and status_code is not None and status_code < 400
+    return WebhookDelivery(
+        subscription_id=subscription_id,
+        event_id=event_id,
+        attempt=attempt,
+        success=success,
+        status_code=status_code,
+        duration_ms=max(int(duration * 1000), 0),
+        error=(str(error) or type(error).__name__)[:255] if error is not None else "",
+        response_body=(response_body or "")[:_response_chars()],
+    )
+
+
+class DeliveryLog:
+    """
+    Per-process buffer of WebhookDelivery rows, written with one bulk INSERT
+    when it holds WEBHOOK_DELIVERY_LOG_BATCH_SIZE rows or its oldest row is
+    WEBHOOK_DELIVERY_LOG_FLUSH_INTERVAL seconds old. A timer thread flushes
+    an idle buffer, and what is left is written at interpreter exit. Rows
+    still buffered when a process is killed are lost: this is a log, not
+    the delivery state.
+
+    add() never touches the database, so it is safe on an event loop; it
+    returns True when a flush is due. record() is add() plus the flush, for
+    synchronous callers.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size or getattr(settings, "WEBHOOK_DELIVERY_LOG_BATCH_SIZE", 200)
+        self.flush_interval = flush_interval or getattr(settings, "WEBHOOK_DELIVERY_LOG_FLUSH_INTERVAL", 2.0)
+        self._rows = []
+        self._oldest = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, row):
+        with self._lock:
+            self._rows.append(row)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._start_timer()
+            return len(self._rows) >= self.batch_size or time.monotonic() - self._oldest >= self.flush_interval
+
+    def record(self, row):
+        if self.add(row):
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows; returns how many."""
+        with self._lock:
+            rows, self._rows, self._oldest = self._rows, [], None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return 0
+        try:
+            WebhookDelivery.objects.bulk_create(rows, batch_size=self.batch_size)
+        except DatabaseError:
+            # e.g. the subscription was deleted meanwhile; the log is best effort
+            logger.exception("could not write %d webhook delivery log rows", len(rows))
+            return 0
+        return len(rows)
+
+    def _start_timer(self):
+        self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # the timer thread's own connection; it would otherwise stay open
+            connections.close_all()
+
+
+delivery_log = DeliveryLog()
+atexit.register(delivery_log.flush)
+
+
+def prune_delivery_log(older_than_seconds=None, chunk_size=5000):
+    """Delete log rows older than WEBHOOK_DELIVERY_LOG_RETENTION seconds, in chunks; returns the count."""
+    if older_than_seconds is None:
+        older_than_seconds = getattr(settings, "WEBHOOK_DELIVERY_LOG_RETENTION", 3 * 24 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    deleted = 0
+    while True:
+        # short transactions: a single DELETE of millions of rows would hold locks for its whole run
+        ids = list(WebhookDelivery.objects.filter(created_at__lt=cutoff).values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += WebhookDelivery.objects.filter(pk__in=ids).delete()[0]
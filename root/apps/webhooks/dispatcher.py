@@ -1,18 +1,102 @@
-from .models import WebhookSubscription
-from .tasks import send_webhook_request
-
-def emit_event(organization, event_name, data):
-    webhooks = WebhookSubscription.objects.filter(
-        organization=organization,
-        is_active=True,
-        events__contains=[event_name]
-    )
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .cache import get_subscription_index
+from .models import WebhookOutbox
+
+
+def _organization_id(organization):
+    return getattr(organization, "pk", organization)
+
 
-    for webhook in webhooks:
-        send_webhook_request.delay(
-            webhook_id=webhook.id,
-            url=webhook.url,
-            secret=webhook.secret,
-            event=event_name,
-            payload=data
+def _merge_event(pending_event, event_name):
+    # an update folded into a pending create (or delete) keeps that event name
+    if event_name.endswith(".updated"):
+        return pending_event
+    return event_name
+
+
+def _coalesce(coalesce_key, event_name, data, available_at):
+    """Overwrite the unclaimed row of `coalesce_key` with the newer event; False if there is none."""
+    pending = (
+        WebhookOutbox.objects
+        .filter(coalesce_key=coalesce_key, dispatched_at__isnull=True, claimed_at__isnull=True)
+        .order_by("-id")
+        .values_list("pk", "event", "available_at")
+        .first()
+    )
+    if pending is None:
+        return False
+    pk, pending_event, pending_at = pending
+    # conditional on the row still being unclaimed: a relay may have taken it meanwhile
+    return bool(
+        WebhookOutbox.objects.filter(pk=pk, claimed_at__isnull=True).update(
+            event=_merge_event(pending_event, event_name),
+            payload=data,
+            available_at=min(pending_at, available_at),
         )
+    )
+
+
+def emit_event(organization, event_name, data, coalesce_key=None, delay=0):
+    """
+    Record an event in the webhook outbox.
+
+    Call it inside the transaction that makes the change: the outbox row
+    commits (or rolls back) together with it. Subscriptions are resolved and
+    Celery jobs enqueued later by the outbox relay (apps/webhooks/outbox.py).
+    organization may be an Organization or its id. Events nobody subscribed
+    to are dropped here, which costs no query once the subscription index is cached.
+
+    coalesce_key / delay: events about one object (e.g. "task:<id>") share a
+    key. The row is held back for `delay` seconds, and while it is unclaimed
+    later events with the same key overwrite it, so a burst produces one event
+    carrying the final state. The delay is counted from the first event of the
+    burst, which bounds how late it is delivered.
+    """
+    org_id = _organization_id(organization)
+    if event_name not in get_subscription_index(org_id):
+        return
+
+    available_at = timezone.now() + timedelta(seconds=delay)
+    if coalesce_key is not None and _coalesce(coalesce_key, event_name, data, available_at):
+        return
+
+    WebhookOutbox.objects.create(
+        organization_id=org_id,
+        event=event_name,
+        payload=data,
+        coalesce_key=coalesce_key,
+        available_at=available_at,
+    )
+
+
+def emit_bulk_event(organization, events, coalesce_keys=()):
+    """
+    Coalesced fan-out for bulk writes: one 'task.bulk' delivery per subscription
+    instead of one per row.
+
+    events: {"task.created": [payload, ...], "task.updated": [...], ...}
+    Each subscription only receives the event types it subscribed to, as
+    payload = {event_name: [payload, ...]}; subscriptions matching none are skipped
+    (the per-subscription filtering happens in the relay).
+    coalesce_keys: keys of the objects in `events`; their held-back rows are
+    released now so they are not delivered after this newer state.
+    """
+    org_id = _organization_id(organization)
+    index = get_subscription_index(org_id)
+    events = {name: items for name, items in events.items() if items and name in index}
+    if not events:
+        return
+
+    if coalesce_keys:
+        now = timezone.now()
+        WebhookOutbox.objects.filter(
+            coalesce_key__in=coalesce_keys, dispatched_at__isnull=True, available_at__gt=now,
+        ).update(available_at=now)
+    WebhookOutbox.objects.create(
+        organization_id=org_id,
+        event="task.bulk",
+        payload=events,
+    )
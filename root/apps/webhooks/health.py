@@ -0,0 +1,204 @@
+# apps/webhooks/health.py
+import random
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import WebhookHealth, WebhookParkedDelivery
+
+# One delivery to hand to Celery or the async engine. probe: this delivery
+# tests a half-open circuit. suspect: the subscription has a non-clean health
+# row, so a success must be recorded. batch: the body is a flushed batch
+# (apps/webhooks/batching.py) whose items are released once it is done.
+Delivery = namedtuple(
+    "Delivery", ["subscription_id", "url", "secret", "event_id", "body", "probe", "suspect", "batch"],
+    defaults=(False,),
+)
+
+BATCH_EVENT = "batch"  # WebhookEvent.event of a flushed batch body
+
+CLOSED, OPEN, HALF_OPEN = WebhookHealth.STATE_CLOSED, WebhookHealth.STATE_OPEN, WebhookHealth.STATE_HALF_OPEN
+
+
+def jittered_backoff(attempt, base=1.0, cap=None):
+    """
+    Exponential backoff with "equal jitter": base * 2**attempt capped at
+    `cap`, then a random point in its upper half. Keeps a floor but spreads
+    retries of endpoints that failed together.
+    """
+    delay = base * (2 ** attempt)
+    if cap is not None:
+        delay = min(cap, delay)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _cooldown(times_opened):
+    return jittered_backoff(
+        max(times_opened - 1, 0),
+        base=getattr(settings, "WEBHOOK_CIRCUIT_COOLDOWN", 30),
+        cap=getattr(settings, "WEBHOOK_CIRCUIT_MAX_COOLDOWN", 3600),
+    )
+
+
+def _probe_deadline(now):
+    return now + timedelta(seconds=getattr(settings, "WEBHOOK_CIRCUIT_PROBE_TIMEOUT", 60))
+
+
+def _claim_probe(health, now):
+    """Move a due open (or stuck half-open) circuit to half_open; True for exactly one caller."""
+    return bool(
+        WebhookHealth.objects
+        .filter(pk=health.pk, state=health.state, retry_at=health.retry_at)
+        .update(state=HALF_OPEN, retry_at=_probe_deadline(now))
+    )
+
+
+def delivery_gate(subscription_ids):
+    """
+    Classify subscriptions before fan-out; one query, returning empty sets
+    when every subscription is healthy.
+
+    Returns (blocked, probes, suspects): deliveries to `blocked` must be
+    parked, the first delivery to a `probes` subscription is its half-open
+    probe (park the rest), and `suspects` have a non-clean health row.
+    """
+    blocked, probes, suspects = set(), set(), set()
+    if not subscription_ids:
+        return blocked, probes, suspects
+    now = timezone.now()
+    unhealthy = WebhookHealth.objects.filter(subscription_id__in=subscription_ids).exclude(
+        state=CLOSED, consecutive_failures=0
+    )
+    for health in unhealthy:
+        suspects.add(health.subscription_id)
+        if health.state == CLOSED:
+            continue
+        if health.retry_at is not None and health.retry_at <= now and _claim_probe(health, now):
+            probes.add(health.subscription_id)
+        else:
+            blocked.add(health.subscription_id)
+    return blocked, probes, suspects
+
+
+def record_success(subscription_id):
+    """Close the circuit and reset counters; a no-op UPDATE when it is already clean."""
+    return bool(
+        WebhookHealth.objects
+        .filter(pk=subscription_id)
+        .exclude(state=CLOSED, consecutive_failures=0)
+        .update(state=CLOSED, consecutive_failures=0, times_opened=0, retry_at=None,
+                last_success_at=timezone.now())
+    )
+
+
+def record_failure(subscription_id, error):
+    """
+    Count a failed attempt and return the resulting state. The circuit opens
+    after WEBHOOK_CIRCUIT_FAILURE_THRESHOLD consecutive failures, or at once
+    when a half-open probe fails; each reopening doubles the (jittered) cooldown.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        health, _ = WebhookHealth.objects.select_for_update().get_or_create(subscription_id=subscription_id)
+        health.consecutive_failures += 1
+        health.last_failure_at = now
+        health.last_error = str(error)[:255]
+        threshold = getattr(settings, "WEBHOOK_CIRCUIT_FAILURE_THRESHOLD", 5)
+        if health.state == HALF_OPEN or (health.state == CLOSED and health.consecutive_failures >= threshold):
+            health.state = OPEN
+            health.times_opened += 1
+            health.retry_at = now + timedelta(seconds=_cooldown(health.times_opened))
+        health.save()
+    return health.state
+
+
+def is_open(subscription_id):
+    """True while deliveries to the subscription should be parked (open, or a probe in flight)."""
+    return WebhookHealth.objects.filter(pk=subscription_id, state__in=(OPEN, HALF_OPEN)).exists()
+
+
+def park(subscription_id, event_id):
+    WebhookParkedDelivery.objects.create(subscription_id=subscription_id, event_id=event_id)
+
+
+def park_many(pairs):
+    WebhookParkedDelivery.objects.bulk_create(
+        [WebhookParkedDelivery(subscription_id=sid, event_id=event_id) for sid, event_id in pairs]
+    )
+
+
+def _take(queryset, limit):
+    """Remove up to `limit` parked rows from `queryset` and return them (with subscription and event)."""
+    queryset = queryset.select_related("subscription", "event").order_by("id")
+    with transaction.atomic():
+        features = connection.features
+        if features.has_select_for_update_skip_locked:
+            of = ("self",) if features.has_select_for_update_of else ()
+            queryset = queryset.select_for_update(skip_locked=True, of=of)
+        rows = list(queryset[:limit])
+        WebhookParkedDelivery.objects.filter(pk__in=[row.pk for row in rows]).delete()
+    return rows
+
+
+def _as_delivery(row, probe=False, suspect=False):
+    return Delivery(
+        row.subscription_id, row.subscription.url, row.subscription.secret,
+        row.event_id, row.event.body.encode(), probe, suspect, row.event.event == BATCH_EVENT,
+    )
+
+
+def take_released(limit=500):
+    """
+    Deliveries to send now from the parked set:
+    - for each due open circuit with parked deliveries, its oldest one as the half-open probe
+    - parked deliveries of circuits that closed again, oldest first
+    Parked rows of disabled subscriptions stay until pruned.
+    """
+    now = timezone.now()
+    releases = []
+    parked_for = WebhookParkedDelivery.objects.filter(subscription_id=OuterRef("pk"))
+    due = (
+        WebhookHealth.objects
+        .filter(state__in=(OPEN, HALF_OPEN), retry_at__lte=now, subscription__is_active=True)
+        .filter(Exists(parked_for))
+    )
+    for health in due:
+        if _claim_probe(health, now):
+            rows = _take(WebhookParkedDelivery.objects.filter(subscription_id=health.pk), 1)
+            releases.extend(_as_delivery(row, probe=True, suspect=True) for row in rows)
+
+    closed = WebhookParkedDelivery.objects.filter(
+        Q(subscription__health__isnull=True) | Q(subscription__health__state=CLOSED),
+        subscription__is_active=True,
+    )
+    releases.extend(_as_delivery(row) for row in _take(closed, limit))
+    return releases
+
+
+def gate_deliveries(deliveries):
+    """
+    Apply delivery_gate to a list of Delivery: park what targets an open
+    circuit (one bulk insert) and return the ones to send, with probe/suspect set.
+    """
+    blocked, probes, suspects = delivery_gate({d.subscription_id for d in deliveries})
+    if not (blocked or probes or suspects):
+        return deliveries
+
+    send, parked = [], []
+    for delivery in deliveries:
+        sid = delivery.subscription_id
+        if sid in probes:
+            probes.discard(sid)
+            blocked.add(sid)  # one probe per subscription; the rest wait for its outcome
+            send.append(delivery._replace(probe=True, suspect=True))
+        elif sid in blocked:
+            parked.append((sid, delivery.event_id))
+        else:
+            send.append(delivery._replace(suspect=sid in suspects))
+    if parked:
+        park_many(parked)
+    return send
@@ -0,0 +1,117 @@
+# apps/webhooks/management/commands/bench_webhook_delivery.py
+import asyncio
+import multiprocessing
+import socket
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+
+from apps.webhooks.delivery import AsyncDeliveryEngine
+from apps.webhooks.signing import serialize_body, signed_headers
+
+
+def _slow_receiver(port, delay, ready):
+    """Minimal keep-alive HTTP/1.1 endpoint answering 200 after `delay` seconds."""
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                await asyncio.sleep(delay)
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=4096)
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark webhook delivery against a local slow receiver (separate "
+        "process): blocking requests.post as in one Celery worker process vs the "
+        "asyncio AsyncDeliveryEngine. Reports deliveries/s and deliveries per CPU-second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delay", type=float, default=0.2, help="Receiver latency in seconds.")
+        parser.add_argument("--deliveries", type=int, default=5000, help="Deliveries for the async engine.")
+        parser.add_argument("--sync-deliveries", type=int, default=25, help="Deliveries for the blocking baseline.")
+        parser.add_argument("--concurrency", type=int, default=500)
+        # below --concurrency, as in production (WEBHOOK_DELIVERY_PER_HOST_LIMIT):
+        # most deliveries queue for a slot to the one receiving host
+        parser.add_argument("--per-host", type=int, default=20)
+        parser.add_argument("--timeout", type=float, default=None,
+                            help="Per-request timeout (default WEBHOOK_DELIVERY_TIMEOUT).")
+
+    def handle(self, *args, **options):
+        port = _free_port()
+        ready = multiprocessing.Event()
+        receiver = multiprocessing.Process(target=_slow_receiver, args=(port, options["delay"], ready), daemon=True)
+        receiver.start()
+        ready.wait(10)
+        url = f"http://127.0.0.1:{port}/hook"
+        secret = "bench-secret"
+        body = serialize_body("task.updated", {"task_id": "0" * 32, "title": "Benchmark task", "status": "todo"})
+
+        try:
+            self.stdout.write(f"receiver latency {options['delay'] * 1000:.0f} ms, payload {len(body)} bytes")
+            self._report("requests.post (1 worker process)", options["sync_deliveries"],
+                         *self._measure(lambda: self._run_sync(url, secret, body, options["sync_deliveries"])))
+            stats = {}
+            self._report(
+                f"AsyncDeliveryEngine (concurrency {options['concurrency']}, per host {options['per_host']})",
+                options["deliveries"],
+                *self._measure(lambda: stats.update(asyncio.run(self._run_async(url, secret, body, options)))),
+            )
+            # no retries: a delivery that timed out while queued for a slot would show up as failed
+            self.stdout.write(f"    delivered {stats['delivered']}, failed {stats['failed']}")
+        finally:
+            receiver.terminate()
+
+    def _measure(self, fn):
+        wall, cpu = time.perf_counter(), time.process_time()
+        fn()
+        return time.perf_counter() - wall, time.process_time() - cpu
+
+    def _run_sync(self, url, secret, body, count):
+        for _ in range(count):
+            response = requests.post(url, data=body, headers=signed_headers(secret, body), timeout=5)
+            response.raise_for_status()
+
+    async def _run_async(self, url, secret, body, options):
+        async with AsyncDeliveryEngine(
+            concurrency=options["concurrency"], per_host=options["per_host"], timeout=options["timeout"], max_retries=0,
+        ) as engine:
+            for _ in range(options["deliveries"]):
+                engine.submit(url, secret, body)
+            await engine.drain()
+        return engine.stats
+
+    def _report(self, label, count, wall, cpu):
+        self.stdout.write(f"  {label}")
+        self.stdout.write(f"    {count} deliveries in {wall:.2f}s wall, {cpu:.2f}s CPU")
+        self.stdout.write(
+            f"    {count / wall:9.1f} deliveries/s   {count / cpu if cpu else float('inf'):9.1f} deliveries/CPU-second"
+        )
@@ -0,0 +1,140 @@
+# apps/webhooks/management/commands/relay_webhook_outbox.py
+import argparse
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.webhooks.outbox import (
+    aflush_batches, arelay_batch, arelease_parked, flush_batches, new_worker_id, outbox_backlog,
+    prune_dispatched, relay_batch, relay_metrics, release_parked,
+)
+from apps.webhooks.deliverylog import prune_delivery_log
+from apps.webhooks.scheduling import FairScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the webhook outbox in batches. Several relays can run side by "
+        "side; each claims its own rows. --mode celery (default) enqueues one "
+        "Celery job per delivery; --mode async delivers from this process on an "
+        "asyncio event loop. Unless --no-fair, claims are shared between "
+        "organizations by plan weight and rate limit (apps/webhooks/scheduling.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=getattr(settings, "WEBHOOK_OUTBOX_BATCH_SIZE", 200))
+        parser.add_argument(
+            "--poll-interval", type=float, default=getattr(settings, "WEBHOOK_OUTBOX_POLL_INTERVAL", 1.0),
+            help="Seconds to sleep when the outbox is empty.",
+        )
+        parser.add_argument("--once", action="store_true", help="Drain what is pending now, then exit.")
+        parser.add_argument(
+            "--report-every", type=float, default=60.0,
+            help="Seconds between throughput / lag reports (and pruning of dispatched rows and the delivery log).",
+        )
+        parser.add_argument(
+            "--mode", choices=("celery", "async"), default=getattr(settings, "WEBHOOK_DELIVERY_MODE", "celery"),
+        )
+        parser.add_argument(
+            "--release-every", type=float, default=getattr(settings, "WEBHOOK_PARKED_RELEASE_INTERVAL", 5.0),
+            help="Seconds between passes over parked deliveries (circuit probes and releases).",
+        )
+        parser.add_argument(
+            "--fair", action=argparse.BooleanOptionalAction,
+            default=getattr(settings, "WEBHOOK_FAIR_SCHEDULING", True),
+            help="Per-organization weighted round-robin and rate limits (--no-fair: oldest rows first).",
+        )
+        parser.add_argument("--concurrency", type=int, default=None, help="async mode: requests in flight.")
+        parser.add_argument("--per-host", type=int, default=None, help="async mode: requests in flight per host.")
+        parser.add_argument(
+            "--max-pending", type=int, default=getattr(settings, "WEBHOOK_DELIVERY_MAX_PENDING", 10_000),
+            help="async mode: stop claiming while this many deliveries (incl. retries) are pending.",
+        )
+
+    def handle(self, *args, **options):
+        self.worker_id = new_worker_id()
+        self.options = options
+        self.scheduler = FairScheduler() if options["fair"] else None
+        self.stdout.write(
+            f"{self.worker_id}: relaying webhook outbox ({options['mode']} mode, batch size {options['batch_size']}"
+            f"{', fair scheduling' if self.scheduler else ''})"
+        )
+        try:
+            if options["mode"] == "async":
+                asyncio.run(self._run_async())
+            else:
+                self._run()
+        except KeyboardInterrupt:
+            pass
+        self._report()
+
+    def _run(self):
+        options = self.options
+        next_report = time.monotonic() + options["report_every"]
+        next_release = time.monotonic()
+        while True:
+            relayed = relay_batch(self.worker_id, options["batch_size"], self.scheduler)
+            relayed += flush_batches()
+            if time.monotonic() >= next_release:
+                relayed += release_parked(options["batch_size"])
+                next_release = time.monotonic() + options["release_every"]
+            if time.monotonic() >= next_report:
+                self._report_and_prune()
+                next_report = time.monotonic() + options["report_every"]
+            if relayed:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
+
+    async def _run_async(self):
+        from apps.webhooks.delivery import AsyncDeliveryEngine
+
+        options = self.options
+        next_report = time.monotonic() + options["report_every"]
+        next_release = time.monotonic()
+        async with AsyncDeliveryEngine(concurrency=options["concurrency"], per_host=options["per_host"]) as engine:
+            while True:
+                await engine.wait_below(options["max_pending"])
+                relayed = await arelay_batch(engine, self.worker_id, options["batch_size"], self.scheduler)
+                relayed += await aflush_batches(engine)
+                if time.monotonic() >= next_release:
+                    relayed += await arelease_parked(engine, options["batch_size"])
+                    next_release = time.monotonic() + options["release_every"]
+                if time.monotonic() >= next_report:
+                    await sync_to_async(self._report_and_prune)()
+                    self.stdout.write(f"  async engine: {engine.stats}, pending {engine.in_flight}")
+                    next_report = time.monotonic() + options["report_every"]
+                if relayed:
+                    continue
+                if options["once"]:
+                    break
+                await asyncio.sleep(options["poll_interval"])
+        self.stdout.write(f"  async engine: {engine.stats}")
+
+    def _report_and_prune(self):
+        self._report()
+        pruned = prune_dispatched()
+        if pruned:
+            self.stdout.write(f"  pruned {pruned} dispatched rows")
+        pruned = prune_delivery_log()
+        if pruned:
+            self.stdout.write(f"  pruned {pruned} delivery log rows")
+
+    def _report(self):
+        stats = relay_metrics.snapshot()
+        backlog = outbox_backlog()
+        self.stdout.write(
+            f"  relayed {stats['events']} events / {stats['deliveries']} deliveries "
+            f"in {stats['batches']} batches | "
+            f"{stats['events_per_second']:.0f} events/s, {stats['deliveries_per_second']:.0f} deliveries/s | "
+            f"lag last {stats['last_lag_seconds']:.3f}s max {stats['max_lag_seconds']:.3f}s | "
+            f"backlog {backlog['pending']} (oldest {backlog['oldest_age_seconds']:.1f}s)"
+        )
+        if self.scheduler is not None:
+            throttled = sum(1 for tokens in self.scheduler.snapshot().values() if tokens <= 0)
+            if throttled:
+                self.stdout.write(f"  {throttled} organizations at their webhook rate limit")
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0003_webhook_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookHealth',
+            fields=[
+                ('subscription', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='health', serialize=False, to='webhooks.webhooksubscription')),
+                ('state', models.CharField(choices=[('closed', 'Closed'), ('open', 'Open'), ('half_open', 'Half open')], default='closed', max_length=16)),
+                ('consecutive_failures', models.PositiveIntegerField(default=0)),
+                ('times_opened', models.PositiveIntegerField(default=0)),
+                ('retry_at', models.DateTimeField(blank=True, null=True)),
+                ('last_failure_at', models.DateTimeField(blank=True, null=True)),
+                ('last_success_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['state', 'retry_at'], name='webhook_health_state_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WebhookParkedDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('parked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='webhooks.webhookevent')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parked_deliveries', to='webhooks.webhooksubscription')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subscription', 'id'], name='webhook_parked_sub_idx')],
+            },
+        ),
+    ]
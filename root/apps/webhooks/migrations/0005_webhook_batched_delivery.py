@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0004_webhook_health'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhooksubscription',
+            name='batch_max_events',
+            field=models.PositiveIntegerField(default=100),
+        ),
+        migrations.AddField(
+            model_name='webhooksubscription',
+            name='batch_window_seconds',
+            field=models.FloatField(default=2.0),
+        ),
+        migrations.AddField(
+            model_name='webhooksubscription',
+            name='delivery_mode',
+            field=models.CharField(choices=[('immediate', 'One request per event'), ('batched', 'JSON array of buffered events')], default='immediate', max_length=16),
+        ),
+        migrations.CreateModel(
+            name='WebhookBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('batched_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='batch_items', to='webhooks.webhookevent')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='webhooks.webhookevent')),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batch_items', to='webhooks.webhooksubscription')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subscription', 'batch', 'id'], name='webhook_batch_item_idx')],
+            },
+        ),
+    ]
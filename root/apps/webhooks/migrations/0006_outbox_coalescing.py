@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0004_organizationinvitation'),
+        ('webhooks', '0005_webhook_batched_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookoutbox',
+            name='available_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='webhookoutbox',
+            name='coalesce_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='webhookoutbox',
+            index=models.Index(fields=['coalesce_key', 'dispatched_at'], name='webhook_outbox_coalesce_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0005_plan_webhook_limits'),
+        ('webhooks', '0006_outbox_coalescing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='webhookoutbox',
+            index=models.Index(fields=['organization', 'dispatched_at', 'id'], name='webhook_outbox_org_pending_idx'),
+        ),
+    ]
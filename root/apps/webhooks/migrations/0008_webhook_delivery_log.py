@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webhooks', '0007_outbox_org_pending_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.UUIDField()),
+                ('attempt', models.PositiveSmallIntegerField(default=1)),
+                ('success', models.BooleanField(default=False)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('response_body', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='webhooks.webhooksubscription')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subscription', '-created_at', '-id'], name='webhook_delivery_log_idx'), models.Index(fields=['created_at'], name='webhook_delivery_created_idx')],
+            },
+        ),
+    ]
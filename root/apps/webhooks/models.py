@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 
 class WebhookSubscription(models.Model):
@@ -18,10 +21,197 @@ class WebhookSubscription(models.Model):
     url = models.URLField()
     events = models.JSONField(default=list, blank=True, null=False)
 
+    DELIVERY_IMMEDIATE = "immediate"
+    DELIVERY_BATCHED = "batched"
+
+    DELIVERY_MODE_CHOICES = [
+        (DELIVERY_IMMEDIATE, "One request per event"),
+        (DELIVERY_BATCHED, "JSON array of buffered events"),
+    ]
+
     secret = models.CharField(max_length=255)   # used for HMAC SHA256 signing
     is_active = models.BooleanField(default=True)
+
+    # batched: events are buffered and flushed as one POST when either limit is reached
+    delivery_mode = models.CharField(max_length=16, choices=DELIVERY_MODE_CHOICES, default=DELIVERY_IMMEDIATE)
+    batch_max_events = models.PositiveIntegerField(default=100)
+    batch_window_seconds = models.FloatField(default=2.0)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Webhook({self.organization.name} → {self.url})"
+
+
+class WebhookOutbox(models.Model):
+    """
+    Transactional outbox: one row per emitted event, written in the same DB
+    transaction as the change that caused it. A relay process
+    (manage.py relay_webhook_outbox) claims pending rows in batches and fans
+    them out to Celery, so the request path never talks to the broker.
+    """
+    organization = models.ForeignKey(
+        "tenants.Organization",
+        on_delete=models.CASCADE,
+        related_name="webhook_outbox"
+    )
+    event = models.CharField(max_length=64)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    # set when a relay claims the row; a claim older than
+    # WEBHOOK_OUTBOX_CLAIM_TIMEOUT is considered abandoned and re-claimed
+    claimed_by = models.CharField(max_length=64, null=True, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    # coalescing (apps/webhooks/dispatcher.py): while a row with the same key
+    # is still unclaimed, later events for that object overwrite it instead of
+    # adding rows; the relay skips rows until available_at
+    coalesce_key = models.CharField(max_length=64, null=True, blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # relay: WHERE dispatched_at IS NULL ORDER BY id; pruning: dispatched_at < cutoff
+            models.Index(fields=["dispatched_at", "id"], name="webhook_outbox_pending_idx"),
+            # fair claims (apps/webhooks/scheduling.py): one organization's pending rows in order
+            models.Index(fields=["organization", "dispatched_at", "id"], name="webhook_outbox_org_pending_idx"),
+            # emit_event: the pending row of a coalesce key
+            models.Index(fields=["coalesce_key", "dispatched_at"], name="webhook_outbox_coalesce_idx"),
+        ]
+
+    def __str__(self):
+        return f"Outbox({self.event} #{self.pk})"
+
+
+class WebhookEvent(models.Model):
+    """
+    A webhook request body, serialized once by the outbox relay and shared by
+    every subscription receiving it. Celery messages carry only the
+    subscription id and this row's id. Rows are pruned together with
+    dispatched outbox rows (WEBHOOK_OUTBOX_RETENTION), well after retries end.
+    """
+    # generated client-side so bulk_create returns usable ids on every backend (MySQL too)
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.CharField(max_length=64)
+    body = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"WebhookEvent({self.event} {self.pk})"
+
+
+class WebhookHealth(models.Model):
+    """
+    Circuit breaker state of one subscription (apps/webhooks/health.py).
+
+    closed: deliver normally. open: deliveries are parked until retry_at.
+    half_open: one probe delivery is in flight (until retry_at); its outcome
+    closes the circuit or opens it again with a longer cooldown.
+    No row means closed and healthy.
+    """
+    STATE_CLOSED = "closed"
+    STATE_OPEN = "open"
+    STATE_HALF_OPEN = "half_open"
+
+    STATE_CHOICES = [
+        (STATE_CLOSED, "Closed"),
+        (STATE_OPEN, "Open"),
+        (STATE_HALF_OPEN, "Half open"),
+    ]
+
+    subscription = models.OneToOneField(
+        WebhookSubscription,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="health"
+    )
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default=STATE_CLOSED)
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    times_opened = models.PositiveIntegerField(default=0)  # since the last success; grows the cooldown
+    retry_at = models.DateTimeField(null=True, blank=True)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["state", "retry_at"], name="webhook_health_state_idx"),
+        ]
+
+    def __str__(self):
+        return f"WebhookHealth({self.subscription_id}: {self.state})"
+
+
+class WebhookParkedDelivery(models.Model):
+    """A delivery held back while its subscription's circuit is open; released in order once it closes."""
+    subscription = models.ForeignKey(
+        WebhookSubscription,
+        on_delete=models.CASCADE,
+        related_name="parked_deliveries"
+    )
+    event = models.ForeignKey(WebhookEvent, on_delete=models.CASCADE, related_name="+")
+    parked_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["subscription", "id"], name="webhook_parked_sub_idx"),
+        ]
+
+
+class WebhookBatchItem(models.Model):
+    """
+    One event buffered for a batched subscription. Items are flushed in id
+    order into a batch body (a WebhookEvent whose body is the JSON array of
+    the items' bodies); `batch` is set while that request is in flight and the
+    items are deleted once it is delivered. A subscription has at most one
+    batch in flight, which keeps its events in order.
+    """
+    subscription = models.ForeignKey(
+        WebhookSubscription,
+        on_delete=models.CASCADE,
+        related_name="batch_items"
+    )
+    event = models.ForeignKey(WebhookEvent, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+    batch = models.ForeignKey(WebhookEvent, on_delete=models.CASCADE, null=True, blank=True, related_name="batch_items")
+    batched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["subscription", "batch", "id"], name="webhook_batch_item_idx"),
+        ]
+
+
+class WebhookDelivery(models.Model):
+    """
+    One delivery attempt, for the subscription's delivery log. Written in
+    bulk from an in-process buffer (apps/webhooks/deliverylog.py) and pruned
+    after WEBHOOK_DELIVERY_LOG_RETENTION seconds.
+    """
+    subscription = models.ForeignKey(
+        WebhookSubscription,
+        on_delete=models.CASCADE,
+        related_name="deliveries"
+    )
+    # not a foreign key: event bodies are pruned independently of the log
+    event_id = models.UUIDField()
+    attempt = models.PositiveSmallIntegerField(default=1)
+    success = models.BooleanField(default=False)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # None: no HTTP response
+    duration_ms = models.PositiveIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    response_body = models.TextField(blank=True)  # truncated to WEBHOOK_DELIVERY_LOG_RESPONSE_CHARS
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # delivery log API: one subscription, newest first, keyset on (created_at, id)
+            models.Index(fields=["subscription", "-created_at", "-id"], name="webhook_delivery_log_idx"),
+            # pruning: created_at < cutoff
+            models.Index(fields=["created_at"], name="webhook_delivery_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Delivery({self.subscription_id} {self.event_id} #{self.attempt} {self.status_code})"
@@ -0,0 +1,333 @@
+# apps/webhooks/outbox.py
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .batching import buffer_events, take_due_batches
+from .cache import get_subscription_index
+from .health import Delivery, gate_deliveries, take_released
+from .models import WebhookEvent, WebhookOutbox
+from .signing import serialize_body
+from .tasks import send_webhook_request
+
+logger = logging.getLogger(__name__)
+
+BULK_EVENT = "task.bulk"
+METRICS_CACHE_KEY = "webhooks:outbox:metrics"
+
+
+def _batch_size():
+    return getattr(settings, "WEBHOOK_OUTBOX_BATCH_SIZE", 200)
+
+
+def _claim_timeout():
+    return getattr(settings, "WEBHOOK_OUTBOX_CLAIM_TIMEOUT", 60)
+
+
+class RelayMetrics:
+    """
+    Running relay counters: throughput (events and deliveries per second of
+    relay time) and lag (commit -> handed to Celery). snapshot() is also
+    published to the shared cache under METRICS_CACHE_KEY after every batch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.batches = 0
+            self.events = 0
+            self.deliveries = 0
+            self.busy_seconds = 0.0
+            self.last_lag_seconds = 0.0
+            self.max_lag_seconds = 0.0
+
+    def record(self, events, deliveries, elapsed, lag):
+        with self._lock:
+            self.batches += 1
+            self.events += events
+            self.deliveries += deliveries
+            self.busy_seconds += elapsed
+            self.last_lag_seconds = lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+
+    def snapshot(self):
+        with self._lock:
+            busy = self.busy_seconds
+            return {
+                "batches": self.batches,
+                "events": self.events,
+                "deliveries": self.deliveries,
+                "events_per_second": (self.events / busy) if busy else 0.0,
+                "deliveries_per_second": (self.deliveries / busy) if busy else 0.0,
+                "last_lag_seconds": self.last_lag_seconds,
+                "max_lag_seconds": self.max_lag_seconds,
+            }
+
+
+relay_metrics = RelayMetrics()
+
+
+def pending_outbox():
+    """Rows not dispatched yet, past their coalescing delay and not held by a live claim."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=_claim_timeout())
+    return WebhookOutbox.objects.filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale),
+        dispatched_at__isnull=True,
+        available_at__lte=now,
+    )
+
+
+def outbox_backlog():
+    """Pending row count and age in seconds of the oldest one (DB-side lag)."""
+    pending = pending_outbox()
+    oldest = pending.order_by("id").values_list("available_at", flat=True).first()
+    return {
+        "pending": pending.count(),
+        "oldest_age_seconds": (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+def pending_by_organization():
+    """{organization_id: pending row count}."""
+    return dict(
+        pending_outbox().order_by().values("organization_id").annotate(n=Count("id")).values_list("organization_id", "n")
+    )
+
+
+def _claim(queryset, token, limit, now):
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                queryset.select_for_update(skip_locked=True)
+                .order_by("id").values_list("id", flat=True)[:limit]
+            )
+            WebhookOutbox.objects.filter(pk__in=ids).update(claimed_by=token, claimed_at=now)
+    else:
+        ids = list(queryset.order_by("id").values_list("id", flat=True)[:limit])
+        queryset.filter(pk__in=ids).update(claimed_by=token, claimed_at=now)
+    return ids
+
+
+def claim_batch(worker_id, limit=None, scheduler=None):
+    """
+    Claim up to `limit` pending rows for `worker_id`; returns (token, rows),
+    rows oldest first. The token is stored in claimed_by and identifies this batch.
+
+    With SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL, MySQL 8) concurrent
+    relays lock disjoint rows. Elsewhere (SQLite) rows are claimed with a
+    conditional UPDATE that only succeeds while they are still unclaimed, so a
+    row lost to another relay is simply not returned.
+
+    With a FairScheduler (apps/webhooks/scheduling.py) the batch is split
+    between organizations by plan weight and rate limit instead of taking
+    the oldest rows; each organization's rows stay in order.
+    """
+    limit = limit or _batch_size()
+    token = f"{worker_id}:{uuid.uuid4().hex}"
+    now = timezone.now()
+    if scheduler is None:
+        ids = _claim(pending_outbox(), token, limit, now)
+    else:
+        ids = []
+        for org_id, quota in scheduler.allocate(pending_by_organization(), limit).items():
+            ids += _claim(pending_outbox().filter(organization_id=org_id), token, quota, now)
+    if not ids:
+        return token, []
+    return token, list(WebhookOutbox.objects.filter(claimed_by=token).order_by("id"))
+
+
+def _fan_out(row, index):
+    """
+    [(body_event, [subscription, ...]), ...] for `row`: one serialized body per
+    distinct payload, shared by every subscription receiving it. A bulk row
+    yields one body per distinct subset of its event types.
+    """
+    if row.event != BULK_EVENT:
+        subscriptions = index.get(row.event, ())
+        if not subscriptions:
+            return []
+        return [(WebhookEvent(event=row.event, body=serialize_body(row.event, row.payload).decode()), list(subscriptions))]
+
+    groups = {}
+    for name in row.payload:
+        for subscription in index.get(name, ()):
+            groups.setdefault(subscription.id, subscription)
+    by_subset = {}
+    for subscription in groups.values():
+        subset = tuple(name for name in row.payload if name in subscription.events)
+        by_subset.setdefault(subset, []).append(subscription)
+    return [
+        (
+            WebhookEvent(
+                event=BULK_EVENT,
+                body=serialize_body(BULK_EVENT, {name: row.payload[name] for name in subset}).decode(),
+            ),
+            subscriptions,
+        )
+        for subset, subscriptions in by_subset.items()
+    ]
+
+
+def _prepare_batch(worker_id, limit, scheduler=None):
+    """
+    Claim a batch, store its bodies and gate it through the circuit breakers.
+    Returns (token, rows, deliveries) or None if nothing is pending.
+    """
+    token, rows = claim_batch(worker_id, limit, scheduler)
+    if not rows:
+        return None
+    indexes = {org_id: get_subscription_index(org_id) for org_id in {row.organization_id for row in rows}}
+    fan_out, per_org = [], {}
+    for row in rows:
+        groups = _fan_out(row, indexes[row.organization_id])
+        fan_out += groups
+        counts = per_org.setdefault(row.organization_id, [0, 0])
+        counts[0] += 1
+        counts[1] += sum(len(subscriptions) for _, subscriptions in groups)
+    if scheduler is not None:
+        for org_id, (org_rows, org_deliveries) in per_org.items():
+            scheduler.charge(org_id, org_rows, org_deliveries)
+    WebhookEvent.objects.bulk_create([event for event, _ in fan_out])
+
+    deliveries, buffered = [], []
+    for event, subscriptions in fan_out:
+        body = event.body.encode()
+        for subscription in subscriptions:
+            if subscription.batched:
+                buffered.append((subscription.id, event))
+            else:
+                deliveries.append(
+                    Delivery(subscription.id, subscription.url, subscription.secret, event.id, body, False, False)
+                )
+    if buffered:
+        buffer_events(buffered)
+    return token, rows, gate_deliveries(deliveries)
+
+
+def _complete_batch(token, rows, deliveries, started):
+    now = timezone.now()
+    WebhookOutbox.objects.filter(claimed_by=token).update(dispatched_at=now)
+
+    # lag counts from when a row became available, not the deliberate coalescing delay
+    lag = max((now - row.available_at).total_seconds() for row in rows)
+    relay_metrics.record(len(rows), deliveries, time.monotonic() - started, lag)
+    shared_cache.set(METRICS_CACHE_KEY, relay_metrics.snapshot(), None)
+    logger.info(
+        "webhook outbox relayed %d events (%d deliveries), lag %.3fs",
+        len(rows), deliveries, lag,
+        extra={"outbox_events": len(rows), "outbox_deliveries": deliveries, "outbox_lag_seconds": lag},
+    )
+
+
+def _enqueue(deliveries):
+    """Publish deliveries as send_webhook_request jobs on a single broker connection."""
+    with send_webhook_request.app.producer_or_acquire() as producer:
+        for delivery in deliveries:
+            send_webhook_request.apply_async(
+                kwargs={
+                    "subscription_id": delivery.subscription_id,
+                    "event_id": str(delivery.event_id),
+                    "probe": delivery.probe,
+                    "suspect": delivery.suspect,
+                    "batch": delivery.batch,
+                },
+                producer=producer,
+            )
+
+
+def relay_batch(worker_id, limit=None, scheduler=None):
+    """
+    Claim one batch, serialize each event body once (WebhookEvent), enqueue
+    (subscription id, event id) deliveries on a single broker connection and
+    mark the rows dispatched. Deliveries to an open circuit are parked
+    instead (apps/webhooks/health.py). Returns the number of outbox rows relayed.
+
+    Delivery is at-least-once: if the relay dies between publishing and
+    marking, the claim expires and the rows are relayed again.
+    scheduler: optional FairScheduler sharing the relay between tenants.
+    """
+    started = time.monotonic()
+    batch = _prepare_batch(worker_id, limit, scheduler)
+    if batch is None:
+        return 0
+    token, rows, deliveries = batch
+    _enqueue(deliveries)
+    _complete_batch(token, rows, len(deliveries), started)
+    return len(rows)
+
+
+def release_parked(limit=None):
+    """Send parked deliveries that may go now (probes, closed circuits); returns how many."""
+    deliveries = take_released(limit or _batch_size())
+    _enqueue(deliveries)
+    return len(deliveries)
+
+
+def flush_batches():
+    """Flush due buffers of batched subscriptions (apps/webhooks/batching.py); returns deliveries sent."""
+    deliveries = take_due_batches()
+    _enqueue(deliveries)
+    return len(deliveries)
+
+
+async def arelay_batch(engine, worker_id, limit=None, scheduler=None):
+    """
+    relay_batch for the async delivery mode: deliveries go straight to an
+    AsyncDeliveryEngine (apps/webhooks/delivery.py) running on this event loop
+    instead of through Celery. Rows are marked dispatched once handed to the
+    engine; retries then live in this process.
+    """
+    started = time.monotonic()
+    batch = await sync_to_async(_prepare_batch)(worker_id, limit, scheduler)
+    if batch is None:
+        return 0
+    token, rows, deliveries = batch
+    for delivery in deliveries:
+        engine.submit_delivery(delivery)
+    await sync_to_async(_complete_batch)(token, rows, len(deliveries), started)
+    return len(rows)
+
+
+async def arelease_parked(engine, limit=None):
+    deliveries = await sync_to_async(take_released)(limit or _batch_size())
+    for delivery in deliveries:
+        engine.submit_delivery(delivery)
+    return len(deliveries)
+
+
+def prune_dispatched(older_than_seconds=None):
+    """
+    Delete outbox rows dispatched, and event bodies created, more than
+    WEBHOOK_OUTBOX_RETENTION seconds ago. Returns the outbox rows deleted.
+    """
+    if older_than_seconds is None:
+        older_than_seconds = getattr(settings, "WEBHOOK_OUTBOX_RETENTION", 7 * 24 * 3600)
+    cutoff = timezone.now() - timedelta(seconds=older_than_seconds)
+    deleted, _ = WebhookOutbox.objects.filter(dispatched_at__lt=cutoff).delete()
+    # parked deliveries older than the retention go with their bodies (FK cascade)
+    WebhookEvent.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def new_worker_id():
+    return f"relay-{uuid.uuid4().hex[:8]}"
+
+
+async def aflush_batches(engine):
+    deliveries = await sync_to_async(take_due_batches)()
+    for delivery in deliveries:
+        engine.submit_delivery(delivery)
+    return len(deliveries)
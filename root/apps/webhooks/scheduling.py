@@ -0,0 +1,161 @@
+# apps/webhooks/scheduling.py
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from root.utils.cache import LocalTTLCache
+
+# Scheduling parameters of one organization, from its Plan (or the
+# WEBHOOK_DEFAULT_* settings when it has none).
+Share = namedtuple("Share", ["weight", "rate", "burst"])
+
+
+def default_share():
+    return Share(
+        getattr(settings, "WEBHOOK_DEFAULT_WEIGHT", 1),
+        getattr(settings, "WEBHOOK_DEFAULT_RATE", 50.0),
+        getattr(settings, "WEBHOOK_DEFAULT_BURST", 500),
+    )
+
+
+def load_shares(org_ids):
+    """{org_id: Share} from the organizations' plans; one query."""
+    from apps.tenants.models import Organization
+
+    fallback = default_share()
+    rows = Organization.objects.filter(pk__in=org_ids).values_list(
+        "pk", "plan__webhook_weight", "plan__webhook_rate", "plan__webhook_burst",
+    )
+    return {
+        pk: Share(weight, rate, burst) if weight is not None else fallback
+        for pk, weight, rate, burst in rows
+    }
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second up to `burst`. charge() may take it below zero:
+    a batch is charged after its fan-out is known, and the debt is paid back
+    before the organization is scheduled again.
+    """
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def charge(self, amount):
+        self.tokens -= amount
+
+
+class FairScheduler:
+    """
+    Decides how many pending outbox rows of each organization the relay
+    claims next, so one tenant's burst cannot hold up everyone else.
+
+    - Weighted round-robin: a claim of `limit` rows is split between the
+      organizations with pending rows in proportion to their plan weight;
+      what one of them cannot use goes to the others.
+    - Token buckets: each organization is limited to its plan's
+      deliveries/second (with a burst allowance). Rows over the limit simply
+      stay pending in the outbox, which is the per-tenant sub-queue.
+
+    Cost is counted in deliveries. Before a claim only rows are known, so
+    rows are converted with a running average of deliveries per row, and the
+    real fan-out is charged afterwards (charge()).
+
+    State is per process: with several relays each applies the limits to the
+    rows it claims.
+    """
+
+    def __init__(self, shares=load_shares, clock=time.monotonic):
+        self._load_shares = shares
+        self._clock = clock
+        self._shares = LocalTTLCache(
+            maxsize=getattr(settings, "WEBHOOK_FAIR_SHARE_CACHE_SIZE", 4096),
+            ttl=getattr(settings, "WEBHOOK_FAIR_SHARE_CACHE_TTL", 60),
+        )
+        self._buckets = {}
+        self._cost = {}  # org_id -> average deliveries per outbox row
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    def _shares_for(self, org_ids):
+        shares = {org_id: self._shares.get(org_id) for org_id in org_ids}
+        missing = [org_id for org_id, share in shares.items() if share is None]
+        if missing:
+            loaded = self._load_shares(missing)
+            for org_id in missing:
+                shares[org_id] = loaded.get(org_id) or default_share()
+                self._shares.set(org_id, shares[org_id])
+        return shares
+
+    def _bucket(self, org_id, share, now):
+        bucket = self._buckets.get(org_id)
+        if bucket is None:
+            bucket = self._buckets[org_id] = TokenBucket(share.rate, share.burst, now)
+        else:
+            # plan changes apply once the share cache entry expires
+            bucket.rate, bucket.burst = share.rate, share.burst
+        bucket.refill(now)
+        return bucket
+
+    def allocate(self, pending, limit):
+        """
+        pending: {org_id: pending row count}. Returns {org_id: rows to claim},
+        at most `limit` rows in total; organizations without tokens get none.
+        """
+        with self._lock:
+            now = self._clock()
+            shares = self._shares_for(list(pending))
+            demand = {}
+            for org_id, count in pending.items():
+                bucket = self._bucket(org_id, shares[org_id], now)
+                if count <= 0 or bucket.tokens <= 0:
+                    continue  # over its rate: its rows wait in the outbox
+                affordable = bucket.tokens / self._cost.get(org_id, 1.0)
+                demand[org_id] = count if affordable >= count else max(int(affordable), 1)
+
+            # start each allocation at a different organization, so leftovers
+            # of the integer division do not always favour the same one
+            order = sorted(demand, key=str)
+            if order:
+                self._turn = (self._turn + 1) % len(order)
+                order = order[self._turn:] + order[:self._turn]
+
+            quotas = dict.fromkeys(order, 0)
+            while limit > 0 and order:
+                # each round splits what was left at its start, whoever goes first
+                budget = limit
+                total = sum(shares[org_id].weight for org_id in order) or 1
+                for org_id in order:
+                    if limit <= 0:
+                        break
+                    grant = min(demand[org_id] - quotas[org_id], max(1, budget * shares[org_id].weight // total), limit)
+                    quotas[org_id] += grant
+                    limit -= grant
+                order = [org_id for org_id in order if quotas[org_id] < demand[org_id]]
+            return {org_id: n for org_id, n in quotas.items() if n}
+
+    def charge(self, org_id, rows, deliveries):
+        """Record that `rows` claimed rows of `org_id` fanned out to `deliveries` deliveries."""
+        with self._lock:
+            bucket = self._buckets.get(org_id)
+            if bucket is not None:
+                bucket.charge(deliveries)
+            if rows:
+                observed = max(deliveries / rows, 1.0)
+                self._cost[org_id] = 0.8 * self._cost.get(org_id, observed) + 0.2 * observed
+
+    def snapshot(self):
+        """{org_id: tokens left} for reporting."""
+        with self._lock:
+            return {org_id: bucket.tokens for org_id, bucket in self._buckets.items()}
@@ -1,14 +1,24 @@
 # apps/webhooks/serializers.py
 from rest_framework import serializers
-from .models import WebhookSubscription
+from .models import WebhookDelivery, WebhookHealth, WebhookSubscription
 
 ALLOWED_EVENTS = {"task.created", "task.updated", "task.deleted", "comment.added"}
+MAX_BATCH_EVENTS = 1000
+MAX_BATCH_WINDOW_SECONDS = 60
 
 class WebhookSubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = WebhookSubscription
-        fields = ["id", "organization", "url", "events", "is_active", "created_at", "updated_at"]
+        fields = [
+            "id", "organization", "url", "events", "is_active",
+            "delivery_mode", "batch_max_events", "batch_window_seconds",
+            "created_at", "updated_at",
+        ]
         read_only_fields = ["id", "organization", "created_at", "updated_at"]
+        extra_kwargs = {
+            "batch_max_events": {"min_value": 1, "max_value": MAX_BATCH_EVENTS},
+            "batch_window_seconds": {"min_value": 0.1, "max_value": MAX_BATCH_WINDOW_SECONDS},
+        }
 
     def validate_events(self, value):
         if not isinstance(value, (list, tuple)):
@@ -22,3 +32,36 @@ class WebhookSubscriptionSerializer(serializers.ModelSerializer):
         # attach organization from request context
         validated_data["organization"] = self.context["request"].organization
         return super().create(validated_data)
+
+
+class WebhookHealthSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookHealth
+        fields = [
+            "state", "consecutive_failures", "times_opened", "retry_at",
+            "last_failure_at", "last_success_at", "last_error",
+        ]
+        read_only_fields = fields
+
+
+class WebhookSubscriptionDetailSerializer(WebhookSubscriptionSerializer):
+    """
+    Detail view: adds the circuit breaker state (null until the first
+    failure, i.e. closed) and the number of deliveries parked behind it.
+    Expects the queryset to select_related("health") and annotate parked_count.
+    """
+    health = WebhookHealthSerializer(read_only=True)
+    parked_deliveries = serializers.IntegerField(source="parked_count", read_only=True, default=0)
+
+    class Meta(WebhookSubscriptionSerializer.Meta):
+        fields = WebhookSubscriptionSerializer.Meta.fields + ["health", "parked_deliveries"]
+
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = [
+            "id", "event_id", "attempt", "success", "status_code", "duration_ms",
+            "error", "response_body", "created_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,19 @@
+# apps/webhooks/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import WebhookSubscription
+from .cache import invalidate_subscription_index
+
+
+@receiver(post_save, sender=WebhookSubscription)
+@receiver(post_delete, sender=WebhookSubscription)
+def subscription_changed(sender, instance: WebhookSubscription, **kwargs):
+    """
+    Rebuild the organization's subscription index on next use. Covers the
+    soft delete in WebhookDetailAPIView.delete (a save of is_active=False).
+    Deferred to commit so a concurrent reader can't re-cache the old rows.
+    """
+    org_id = instance.organization_id
+    transaction.on_commit(lambda: invalidate_subscription_index(org_id))
@@ -0,0 +1,23 @@
+# apps/webhooks/signing.py
+import hashlib
+import hmac
+import json
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+
+def serialize_body(event, payload):
+    """The request body for one event, as bytes; computed once per event, not per subscription."""
+    return json.dumps({"event": event, "payload": payload}).encode()
+
+
+def sign(secret, body):
+    """Hex HMAC-SHA256 of the body bytes with the subscription secret."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def signed_headers(secret, body):
+    return {
+        "Content-Type": "application/json",
+        SIGNATURE_HEADER: sign(secret, body),
+    }
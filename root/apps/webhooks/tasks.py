@@ -1,27 +1,109 @@
+import time
+
 from celery import shared_task
-import hashlib, hmac, requests, json
+from celery.signals import worker_process_shutdown
+import requests
+from django.conf import settings
+
+from root.utils.cache import LocalTTLCache
+from . import batching, health
+from .deliverylog import attempt_record, delivery_log
+from .models import WebhookEvent, WebhookSubscription
+from .signing import signed_headers
+
+MAX_RETRIES = 5
+
+
+def retry_countdown(retries):
+    """Seconds to wait before retry number retries + 1: 2**retries, jittered and capped."""
+    return health.jittered_backoff(retries, cap=getattr(settings, "WEBHOOK_RETRY_MAX_DELAY", 300))
+
+
+# Every subscription of an event shares one body; a worker loads it once.
+_event_bodies = LocalTTLCache(
+    maxsize=getattr(settings, "WEBHOOK_EVENT_BODY_CACHE_SIZE", 1024),
+    ttl=getattr(settings, "WEBHOOK_EVENT_BODY_CACHE_TTL", 300),
+)
 
-@shared_task(bind=True, max_retries=5)
-def send_webhook_request(self, webhook_id, url, secret, event, payload):
-    try:
-        body = json.dumps({"event": event, "payload": payload})
 
-        signature = hmac.new(
-            secret.encode(),
-            body.encode(),
-            hashlib.sha256
-        ).hexdigest()
+def load_event_body(event_id):
+    """Body bytes of a WebhookEvent (None if it was pruned)."""
+    key = str(event_id)
+    body = _event_bodies.get(key)
+    if body is None:
+        body = WebhookEvent.objects.filter(pk=event_id).values_list("body", flat=True).first()
+        if body is None:
+            return None
+        body = body.encode()
+        _event_bodies.set(key, body)
+    return body
 
-        headers = {
-            "Content-Type": "application/json",
-            "X-Webhook-Signature": signature,
-        }
 
-        response = requests.post(url, data=body, headers=headers, timeout=5)
+@worker_process_shutdown.connect
+def flush_delivery_log(**kwargs):
+    # pool processes may exit without running atexit handlers
+    delivery_log.flush()
+
+
+@shared_task(bind=True, max_retries=MAX_RETRIES)
+def send_webhook_request(self, subscription_id, event_id, probe=False, suspect=False, batch=False):
+    """
+    Deliver one event body to one subscription.
+
+    probe: this delivery tests a half-open circuit (no retries; a failure
+    re-opens it and parks the delivery). suspect: the subscription has recent
+    failures, so a success is recorded to reset its health. batch: the body is
+    a flushed batch; its buffered items are released when the request is
+    delivered or finally given up on, so the next batch can go.
+    """
+    webhook = (
+        WebhookSubscription.objects
+        .filter(pk=subscription_id, is_active=True)
+        .only("url", "secret")
+        .first()
+    )
+    body = load_event_body(event_id)
+    if webhook is None or body is None:
+        return  # subscription disabled/deleted or event pruned: nothing to deliver
+
+    if self.request.retries and health.is_open(subscription_id):
+        # the circuit opened while this delivery waited for its retry
+        health.park(subscription_id, event_id)
+        return
+
+    attempt = self.request.retries + 1
+    started = time.monotonic()
+    response = None
+    try:
+        response = requests.post(
+            webhook.url, data=body, headers=signed_headers(webhook.secret, body),
+            timeout=getattr(settings, "WEBHOOK_DELIVERY_TIMEOUT", 5.0),
+        )
 
         if response.status_code >= 400:
             raise Exception(f"Webhook failed: {response.status_code}")
 
     except Exception as exc:
-        retry_in = 2 ** self.request.retries
-        raise self.retry(exc=exc, countdown=retry_in)
+        delivery_log.record(attempt_record(
+            subscription_id, event_id, attempt, time.monotonic() - started,
+            getattr(response, "status_code", None), getattr(response, "content", b""), exc,
+        ))
+        state = health.record_failure(subscription_id, exc)
+        if probe or state != health.CLOSED:
+            health.park(subscription_id, event_id)
+            return
+        if batch and self.request.retries >= self.max_retries:
+            batching.complete_batch(subscription_id, event_id)
+        raise self.retry(
+            exc=exc,
+            countdown=retry_countdown(self.request.retries),
+            kwargs={**self.request.kwargs, "suspect": True},
+        )
+
+    delivery_log.record(attempt_record(
+        subscription_id, event_id, attempt, time.monotonic() - started, response.status_code, response.content,
+    ))
+    if probe or suspect or self.request.retries:
+        health.record_success(subscription_id)
+    if batch:
+        batching.complete_batch(subscription_id, event_id)
@@ -1,3 +1,456 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.tenants.models import Organization, OrganizationMembership
+
+from .batching import buffer_events, complete_batch, take_due_batches
+from .cache import get_subscription_index
+from .delivery import AsyncDeliveryEngine
+from .deliverylog import DeliveryLog, attempt_record, prune_delivery_log
+from .dispatcher import emit_bulk_event, emit_event
+from .health import CLOSED, HALF_OPEN, OPEN, Delivery, delivery_gate, record_failure, record_success
+from .models import (
+    WebhookDelivery, WebhookEvent, WebhookHealth, WebhookOutbox, WebhookParkedDelivery, WebhookSubscription,
+)
+from .outbox import claim_batch, relay_batch
+from .scheduling import FairScheduler, Share
+from .views import delivery_paginator
+
+
+async def _endpoint(delay=0.0, status=b"200 OK"):
+    """
+    Local keep-alive endpoint answering `status` after `delay` seconds.
+    Returns (server, url, hits); hits collects the arrival time of each request.
+    """
+    hits = []
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        await reader.readexactly(int(line.split(b":", 1)[1]))
+                hits.append(time.monotonic())
+                await asyncio.sleep(delay)
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}/hook", hits
+
+
+class AsyncDeliveryEngineTests(SimpleTestCase):
+    def test_waiting_for_a_host_slot_does_not_count_against_the_timeout(self):
+        # 12 deliveries, 2 at a time, 0.1s each: the last ones wait ~0.5s for a
+        # slot, longer than the 0.3s request timeout
+        async def run():
+            server, url, _ = await _endpoint(0.1)
+            async with server:
+                async with AsyncDeliveryEngine(concurrency=50, per_host=2, timeout=0.3, max_retries=0) as engine:
+                    for _ in range(12):
+                        engine.submit(url, "secret", b"{}")
+                    await engine.drain()
+            return engine.stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["delivered"], 12)
+        self.assertEqual(stats["failed"], 0)
+
+    def test_a_slow_host_does_not_hold_up_other_hosts(self):
+        # a backlog of 8 to a slow host, one request at a time, must not take
+        # the 4 global slots away from a delivery to a fast host
+        async def run():
+            slow_server, slow_url, _ = await _endpoint(0.2)
+            fast_server, fast_url, _ = await _endpoint()
+            async with slow_server, fast_server:
+                async with AsyncDeliveryEngine(concurrency=4, per_host=1, timeout=10, max_retries=0) as engine:
+                    for _ in range(8):
+                        engine.submit(slow_url, "secret", b"{}")
+                    await asyncio.sleep(0.05)
+                    started = time.monotonic()
+                    await engine.submit(fast_url, "secret", b"{}")
+                    elapsed = time.monotonic() - started
+                    await engine.drain()
+            return elapsed, engine.stats
+
+        elapsed, stats = asyncio.run(run())
+        self.assertLess(elapsed, 0.15)
+        self.assertEqual(stats["delivered"], 9)
+
+
+class FairSchedulerTests(SimpleTestCase):
+    def scheduler(self, shares):
+        self.now = 0.0
+        return FairScheduler(shares=lambda org_ids: {org_id: shares[org_id] for org_id in org_ids}, clock=lambda: self.now)
+
+    def test_quiet_tenants_get_their_rows_next_to_a_noisy_one(self):
+        share = Share(1, 1000.0, 100000)
+        scheduler = self.scheduler({"noisy": share, "a": share, "b": share, "c": share})
+        quotas = scheduler.allocate({"noisy": 10000, "a": 5, "b": 3, "c": 40}, 100)
+        self.assertEqual(quotas, {"noisy": 52, "a": 5, "b": 3, "c": 40})
+
+    def test_rows_are_split_by_plan_weight(self):
+        scheduler = self.scheduler({"free": Share(1, 1000.0, 100000), "pro": Share(3, 1000.0, 100000)})
+        for _ in range(2):  # whichever organization's turn it is
+            self.assertEqual(scheduler.allocate({"free": 1000, "pro": 1000}, 100), {"free": 25, "pro": 75})
+
+    def test_a_tenant_over_its_rate_waits_for_tokens(self):
+        scheduler = self.scheduler({"noisy": Share(1, 10.0, 50), "quiet": Share(1, 10.0, 50)})
+        self.assertEqual(scheduler.allocate({"noisy": 1000, "quiet": 2}, 100), {"noisy": 50, "quiet": 2})
+        scheduler.charge("noisy", 50, 50)
+        scheduler.charge("quiet", 2, 2)
+        self.assertEqual(scheduler.allocate({"noisy": 950, "quiet": 2}, 100), {"quiet": 2})
+        self.now += 1.0
+        self.assertEqual(scheduler.allocate({"noisy": 950, "quiet": 2}, 100), {"noisy": 10, "quiet": 2})
+
+
+class WebhookTestCase(TestCase):
+    """An organization with one owner and one active subscription."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create(username="owner")
+        self.outsider = User.objects.create(username="outsider")
+        self.org = Organization.objects.create(name="Acme", slug="acme", owner=self.owner)
+        OrganizationMembership.objects.create(
+            user=self.owner, organization=self.org, role=OrganizationMembership.ROLE_OWNER,
+        )
+        self.subscription = WebhookSubscription.objects.create(
+            organization=self.org, url="https://example.com/hook", events=["task.created", "task.updated"],
+        )
+
+
+class WebhookAccessTests(WebhookTestCase):
+    def get(self, user, name):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client.get(reverse(name, args=[self.subscription.pk]), HTTP_X_ORGANIZATION_ID=str(self.org.pk))
+
+    def test_non_members_cannot_read_another_organizations_webhooks(self):
+        for name in ("webhook-detail", "webhook-deliveries"):
+            self.assertEqual(self.get(self.outsider, name).status_code, 403, name)
+
+    def test_members_can_read_their_webhooks(self):
+        for name in ("webhook-detail", "webhook-deliveries"):
+            self.assertEqual(self.get(self.owner, name).status_code, 200, name)
+
+    def test_tampered_delivery_cursor_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(user=self.owner)
+        url = reverse("webhook-deliveries", args=[self.subscription.pk])
+        for position in (["x", "y"], [None, 1], ["2025-01-01T00:00:00+00:00", "y"]):
+            response = client.get(
+                url, {"cursor": delivery_paginator.encode_cursor(position)}, HTTP_X_ORGANIZATION_ID=str(self.org.pk),
+            )
+            self.assertEqual(response.status_code, 400, position)
+
+
+class OutboxClaimTests(WebhookTestCase):
+    def emit(self, n):
+        for i in range(n):
+            emit_event(self.org, "task.created", {"n": i})
+
+    def test_each_row_is_claimed_once(self):
+        self.emit(5)
+        _, first = claim_batch("a", limit=3)
+        _, second = claim_batch("b", limit=10)
+        _, third = claim_batch("c", limit=10)
+        self.assertEqual([row.payload["n"] for row in first], [0, 1, 2])
+        self.assertEqual([row.payload["n"] for row in second], [3, 4])
+        self.assertEqual(third, [])
+
+    def test_dispatched_rows_are_not_claimed(self):
+        self.emit(2)
+        token, _ = claim_batch("a")
+        WebhookOutbox.objects.filter(claimed_by=token).update(dispatched_at=timezone.now())
+        WebhookOutbox.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim_batch("b")[1], [])
+
+    def test_abandoned_claims_are_claimed_again(self):
+        self.emit(2)
+        claim_batch("a")
+        WebhookOutbox.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        token, rows = claim_batch("b")
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row.claimed_by == token for row in rows))
+
+    def test_events_nobody_subscribed_to_are_dropped(self):
+        emit_event(self.org, "task.deleted", {})
+        self.assertFalse(WebhookOutbox.objects.exists())
+
+
+class FairClaimTests(WebhookTestCase):
+    def test_a_noisy_backlog_does_not_crowd_out_quiet_tenants(self):
+        for i in range(30):
+            emit_event(self.org, "task.created", {"n": i})
+        quiet = []
+        for slug in ("a", "b", "c"):
+            org = Organization.objects.create(name=slug, slug=slug, owner=self.owner)
+            WebhookSubscription.objects.create(organization=org, url="https://example.com/hook", events=["task.created"])
+            emit_event(org, "task.created", {"n": 0})
+            emit_event(org, "task.created", {"n": 1})
+            quiet.append(org.pk)
+
+        # the quiet tenants' rows are newer than all of the noisy backlog
+        _, oldest_first = claim_batch("a", limit=10)
+        self.assertEqual({row.organization_id for row in oldest_first}, {self.org.pk})
+        WebhookOutbox.objects.update(claimed_by=None, claimed_at=None)
+
+        _, rows = claim_batch("b", limit=10, scheduler=FairScheduler(shares=lambda org_ids: {}))
+        claimed = {}
+        for row in rows:
+            claimed.setdefault(row.organization_id, []).append(row.payload["n"])
+        self.assertEqual({org_id: claimed[org_id] for org_id in quiet}, dict.fromkeys(quiet, [0, 1]))
+        self.assertEqual(claimed[self.org.pk], [0, 1, 2, 3])
+
+
+class SubscriptionIndexTests(WebhookTestCase):
+    def test_index_is_built_once(self):
+        get_subscription_index(self.org.pk)
+        with self.assertNumQueries(0):
+            index = get_subscription_index(self.org.pk)
+        self.assertEqual([sub.id for sub in index["task.created"]], [self.subscription.pk])
+
+    def test_subscription_changes_apply_on_commit(self):
+        get_subscription_index(self.org.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.events = ["task.deleted"]
+            self.subscription.save()
+        index = get_subscription_index(self.org.pk)
+        self.assertNotIn("task.created", index)
+        self.assertEqual([sub.id for sub in index["task.deleted"]], [self.subscription.pk])
+
+
+@override_settings(WEBHOOK_CIRCUIT_FAILURE_THRESHOLD=3, WEBHOOK_CIRCUIT_COOLDOWN=30)
+class CircuitBreakerTests(WebhookTestCase):
+    def fail(self, times=1):
+        for _ in range(times):
+            state = record_failure(self.subscription.pk, "boom")
+        return state
+
+    def gate(self):
+        return delivery_gate({self.subscription.pk})
+
+    def cool_down(self):
+        WebhookHealth.objects.filter(pk=self.subscription.pk).update(retry_at=timezone.now() - timedelta(seconds=1))
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertEqual(self.fail(2), CLOSED)
+        self.assertEqual(self.gate(), (set(), set(), {self.subscription.pk}))
+        self.assertEqual(self.fail(), OPEN)
+        blocked, probes, _ = self.gate()
+        self.assertEqual((blocked, probes), ({self.subscription.pk}, set()))
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        record_success(self.subscription.pk)
+        self.assertEqual(self.fail(2), CLOSED)
+        self.assertEqual(self.fail(), OPEN)
+
+    def test_one_probe_after_the_cooldown(self):
+        self.fail(3)
+        self.cool_down()
+        _, probes, _ = self.gate()
+        self.assertEqual(probes, {self.subscription.pk})
+        self.assertEqual(WebhookHealth.objects.get(pk=self.subscription.pk).state, HALF_OPEN)
+        # the probe is in flight: everything else is held back
+        blocked, probes, _ = self.gate()
+        self.assertEqual((blocked, probes), ({self.subscription.pk}, set()))
+
+    def test_failed_probe_reopens_with_a_longer_cooldown(self):
+        self.fail(3)
+        first = WebhookHealth.objects.get(pk=self.subscription.pk)
+        self.cool_down()
+        self.gate()
+        self.assertEqual(self.fail(), OPEN)
+        health = WebhookHealth.objects.get(pk=self.subscription.pk)
+        self.assertEqual(health.times_opened, 2)
+        # jittered cooldowns: 15-30s after the first opening, 30-60s after the second
+        self.assertGreater(health.retry_at - health.last_failure_at, first.retry_at - first.last_failure_at)
+
+    def test_successful_probe_closes_the_circuit(self):
+        self.fail(3)
+        self.cool_down()
+        self.gate()
+        self.assertTrue(record_success(self.subscription.pk))
+        self.assertEqual(self.gate(), (set(), set(), set()))
+
+
+class CoalescingTests(WebhookTestCase):
+    def test_pending_rows_of_a_key_are_merged(self):
+        emit_event(self.org, "task.created", {"title": "a"}, coalesce_key="task:1")
+        emit_event(self.org, "task.updated", {"title": "b"}, coalesce_key="task:1", delay=5)
+        emit_event(self.org, "task.updated", {"title": "c"}, coalesce_key="task:1", delay=5)
+        emit_event(self.org, "task.updated", {"title": "x"}, coalesce_key="task:2", delay=5)
+        rows = list(WebhookOutbox.objects.order_by("id"))
+        self.assertEqual(len(rows), 2)
+        # an update folded into a pending create is still a create, with the final state,
+        # and is not held back longer than the first event of the burst
+        self.assertEqual((rows[0].event, rows[0].payload), ("task.created", {"title": "c"}))
+        self.assertLessEqual(rows[0].available_at, timezone.now())
+
+    def test_held_back_rows_are_not_claimed_yet(self):
+        emit_event(self.org, "task.updated", {"title": "a"}, coalesce_key="task:1", delay=5)
+        self.assertEqual(claim_batch("a")[1], [])
+
+    def test_claimed_rows_are_not_overwritten(self):
+        emit_event(self.org, "task.updated", {"title": "a"}, coalesce_key="task:1")
+        _, claimed = claim_batch("a")
+        emit_event(self.org, "task.updated", {"title": "b"}, coalesce_key="task:1")
+        self.assertEqual(
+            list(WebhookOutbox.objects.order_by("id").values_list("payload", flat=True)),
+            [{"title": "a"}, {"title": "b"}],
+        )
+        self.assertEqual(len(claimed), 1)
+
+
+class BulkFanOutTests(WebhookTestCase):
+    def subscribe(self, events, organization=None):
+        return WebhookSubscription.objects.create(
+            organization=organization or self.org, url="https://example.com/other", events=events,
+        )
+
+    def test_bodies_are_stored_once_and_only_ids_go_through_the_broker(self):
+        created_only = [self.subscribe(["task.created"]), self.subscribe(["task.created"])]
+        self.subscribe(["task.deleted"])
+        other_org = Organization.objects.create(name="Other", slug="other", owner=self.outsider)
+        self.subscribe(["task.created"], organization=other_org)
+
+        emit_bulk_event(self.org, {"task.created": [{"id": 1}, {"id": 2}], "task.updated": [{"id": 3}]})
+        with mock.patch("apps.webhooks.outbox.send_webhook_request") as task:
+            self.assertEqual(relay_batch("relay"), 1)
+
+        # one body per distinct subset of event types, not one per subscription
+        bodies = {str(event.pk): json.loads(event.body)["payload"] for event in WebhookEvent.objects.all()}
+        self.assertEqual(
+            sorted(bodies.values(), key=len),
+            [
+                {"task.created": [{"id": 1}, {"id": 2}]},
+                {"task.created": [{"id": 1}, {"id": 2}], "task.updated": [{"id": 3}]},
+            ],
+        )
+
+        sent = [call.kwargs["kwargs"] for call in task.apply_async.call_args_list]
+        self.assertEqual(
+            sorted((str(kwargs["subscription_id"]), len(bodies[kwargs["event_id"]])) for kwargs in sent),
+            sorted([(str(s.id), 1) for s in created_only] + [(str(self.subscription.id), 2)]),
+        )
+        for kwargs in sent:
+            flags = {name: value for name, value in kwargs.items() if name not in ("subscription_id", "event_id")}
+            # the body stays in the database; the rest are flags (probe, suspect, ...)
+            self.assertTrue(all(isinstance(value, bool) for value in flags.values()), flags)
+
+
+class BatchingTests(WebhookTestCase):
+    def setUp(self):
+        super().setUp()
+        WebhookSubscription.objects.filter(pk=self.subscription.pk).update(
+            delivery_mode=WebhookSubscription.DELIVERY_BATCHED, batch_max_events=2, batch_window_seconds=0,
+        )
+        buffer_events([
+            (self.subscription.pk, WebhookEvent.objects.create(event="task.created", body=json.dumps({"n": n})))
+            for n in range(5)
+        ])
+
+    def items(self, delivery):
+        return [item["n"] for item in json.loads(delivery.body)]
+
+    def test_one_batch_in_flight_at_a_time_in_order(self):
+        flushed = []
+        for _ in range(3):
+            [delivery] = take_due_batches()
+            self.assertTrue(delivery.batch)
+            self.assertEqual(take_due_batches(), [])  # the next batch waits for this one
+            flushed.append(self.items(delivery))
+            complete_batch(self.subscription.pk, delivery.event_id)
+        self.assertEqual(flushed, [[0, 1], [2, 3], [4]])
+        self.assertEqual(take_due_batches(), [])
+
+    async def test_delivered_and_failed_batches_release_the_next_one(self):
+        ok_server, ok_url, _ = await _endpoint()
+        failing_server, failing_url, _ = await _endpoint(status=b"500 Internal Server Error")
+        async with ok_server, failing_server:
+            async with AsyncDeliveryEngine(max_retries=0) as engine:
+                [delivery] = await sync_to_async(take_due_batches)()
+                self.assertTrue(await engine.submit_delivery(delivery._replace(url=ok_url)))
+                [delivery] = await sync_to_async(take_due_batches)()
+                self.assertEqual(self.items(delivery), [2, 3])
+                # out of retries with the circuit still closed: given up on, not parked
+                self.assertFalse(await engine.submit_delivery(delivery._replace(url=failing_url)))
+                [delivery] = await sync_to_async(take_due_batches)()
+                self.assertEqual(self.items(delivery), [4])
+        self.assertEqual((engine.stats["delivered"], engine.stats["failed"], engine.stats["parked"]), (1, 1, 0))
+
+
+class DeliveryLogTests(WebhookTestCase):
+    def record(self, attempt=1):
+        return attempt_record(self.subscription.pk, uuid.uuid4(), attempt, 0.01, 200, b"ok")
+
+    def test_rows_are_written_in_one_insert_at_the_threshold(self):
+        log = DeliveryLog(batch_size=3, flush_interval=60)
+        with self.assertNumQueries(0):
+            self.assertFalse(log.add(self.record(1)))
+            log.record(self.record(2))
+        with self.assertNumQueries(1):
+            log.record(self.record(3))
+        self.assertEqual(sorted(WebhookDelivery.objects.values_list("attempt", flat=True)), [1, 2, 3])
+        self.assertEqual(log.flush(), 0)
+
+    async def test_the_engine_writes_what_is_left_when_it_stops(self):
+        event = await WebhookEvent.objects.acreate(event="task.created", body="{}")
+        server, url, _ = await _endpoint()
+        async with server:
+            async with AsyncDeliveryEngine() as engine:
+                delivery = Delivery(self.subscription.pk, url, "secret", event.pk, b"{}", False, False)
+                self.assertTrue(await engine.submit_delivery(delivery))
+                # below the threshold: still buffered
+                self.assertFalse(await WebhookDelivery.objects.aexists())
+        self.assertEqual(
+            [(row.event_id, row.success, row.status_code) async for row in WebhookDelivery.objects.all()],
+            [(event.pk, True, 200)],
+        )
+
+    @override_settings(WEBHOOK_DELIVERY_LOG_RETENTION=3600)
+    def test_prune_removes_only_rows_past_the_retention(self):
+        WebhookDelivery.objects.bulk_create([self.record() for _ in range(7)])
+        old = list(WebhookDelivery.objects.values_list("pk", flat=True)[:5])
+        WebhookDelivery.objects.filter(pk__in=old).update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(prune_delivery_log(chunk_size=2), 5)
+        self.assertEqual(WebhookDelivery.objects.count(), 2)
+        self.assertFalse(WebhookDelivery.objects.filter(pk__in=old).exists())
+
+
+@override_settings(WEBHOOK_RETRY_MAX_DELAY=0.4)
+class AsyncDeliveryBreakerTests(WebhookTestCase):
+    async def test_retries_stop_once_another_delivery_opens_the_circuit(self):
+        event = await WebhookEvent.objects.acreate(event="task.created", body="{}")
+        server, url, hits = await _endpoint(status=b"500 Internal Server Error")
+        delivery = Delivery(self.subscription.pk, url, "secret", event.pk, b"{}", False, False)
+        async with server:
+            async with AsyncDeliveryEngine(max_retries=3) as engine:
+                pending = engine.submit_delivery(delivery)
+                while not hits:
+                    await asyncio.sleep(0.01)
+                await asyncio.sleep(0.1)  # the first failure is recorded; the retry waits 0.2-0.4s
+                await WebhookHealth.objects.filter(pk=self.subscription.pk).aupdate(state=OPEN)
+                self.assertFalse(await pending)
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(engine.stats["parked"], 1)
+        self.assertTrue(await WebhookParkedDelivery.objects.filter(subscription=self.subscription).aexists())
@@ -1,8 +1,9 @@
 # apps/webhooks/urls.py
 from django.urls import path
-from .views import WebhookListCreateAPIView, WebhookDetailAPIView
+from .views import WebhookListCreateAPIView, WebhookDetailAPIView, WebhookDeliveryListAPIView
 
 urlpatterns = [
     path("webhooks/", WebhookListCreateAPIView.as_view(), name="webhook-list-create"),
     path("webhooks/<int:pk>/", WebhookDetailAPIView.as_view(), name="webhook-detail"),
+    path("webhooks/<int:pk>/deliveries/", WebhookDeliveryListAPIView.as_view(), name="webhook-deliveries"),
 ]
@@ -2,26 +2,24 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.conf import settings
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 
-from .models import WebhookSubscription
-from .serializers import WebhookSubscriptionSerializer
+from apps.tasks.permissions import IsOrgMember
+from root.utils.pagination import KeysetPaginator, InvalidCursor
+from .models import WebhookDelivery, WebhookSubscription
+from .serializers import WebhookDeliverySerializer, WebhookSubscriptionSerializer, WebhookSubscriptionDetailSerializer
 
-class IsTenantMember(permissions.BasePermission):
-    """
-    Ensure the request has request.organization (middleware must set it)
-    and that the object belongs to the same organization.
-    """
-
-    def has_permission(self, request, view):
-        return getattr(request, "user", None) and getattr(request, "organization", None)
-
-    def has_object_permission(self, request, view, obj):
-        return obj.organization == request.organization
+delivery_paginator = KeysetPaginator(
+    ordering=("-created_at", "-id"),
+    page_size=getattr(settings, "WEBHOOK_DELIVERY_LOG_PAGE_SIZE", 50),
+    max_page_size=getattr(settings, "WEBHOOK_DELIVERY_LOG_MAX_PAGE_SIZE", 200),
+)
 
 
 class WebhookListCreateAPIView(APIView):
-    permission_classes = [permissions.IsAuthenticated, IsTenantMember]
+    permission_classes = [permissions.IsAuthenticated, IsOrgMember]
 
     def get(self, request):
         qs = WebhookSubscription.objects.filter(organization=request.organization, is_active=True)
@@ -54,7 +52,7 @@ class WebhookListCreateAPIView(APIView):
 
 
 class WebhookDetailAPIView(APIView):
-    permission_classes = [permissions.IsAuthenticated, IsTenantMember]
+    permission_classes = [permissions.IsAuthenticated, IsOrgMember]
 
     def get_object(self, pk, organization):
         # returns active or raises 404
@@ -62,8 +60,13 @@ class WebhookDetailAPIView(APIView):
         return obj
 
     def get(self, request, pk):
-        obj = self.get_object(pk, request.organization)
-        serializer = WebhookSubscriptionSerializer(obj)
+        qs = (
+            WebhookSubscription.objects
+            .select_related("health")
+            .annotate(parked_count=Count("parked_deliveries"))
+        )
+        obj = get_object_or_404(qs, pk=pk, organization=request.organization)
+        serializer = WebhookSubscriptionDetailSerializer(obj)
         return Response({
             "ok": True,
             "status": status.HTTP_200_OK,
@@ -122,3 +125,36 @@ class WebhookDetailAPIView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+class WebhookDeliveryListAPIView(APIView):
+    """
+    GET -> the subscription's delivery attempts, newest first, keyset-paginated
+    on (created_at, id): pass data.next_cursor back as ?cursor=.
+    ?success=true|false keeps only successful / failed attempts.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOrgMember]
+
+    def get(self, request, pk):
+        subscription = get_object_or_404(WebhookSubscription, pk=pk, organization=request.organization)
+        deliveries = WebhookDelivery.objects.filter(subscription=subscription)
+        success = request.query_params.get("success")
+        if success in ("true", "false"):
+            deliveries = deliveries.filter(success=success == "true")
+        try:
+            page, next_cursor = delivery_paginator.paginate(deliveries, request)
+        except InvalidCursor as e:
+            return Response({
+                "ok": False,
+                "status": status.HTTP_400_BAD_REQUEST,
+                "message": "Invalid cursor",
+                "data": str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "ok": True,
+            "status": status.HTTP_200_OK,
+            "message": "Webhook deliveries fetched",
+            "data": {
+                "results": WebhookDeliverySerializer(page, many=True).data,
+                "next_cursor": next_cursor,
+            }
+        }, status=status.HTTP_200_OK)
@@ -3,6 +3,8 @@ ASGI config for root project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+HTTP goes to Django; WebSockets are routed by Channels (apps/tasks/routing.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +15,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'root.settings')
 
-application = get_asgi_application()
+# initialise Django before importing consumers (they import models)
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+
+from apps.tasks.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    # only pages served from ALLOWED_HOSTS may open sockets
+    "websocket": AllowedHostsOriginValidator(URLRouter(websocket_urlpatterns)),
+})
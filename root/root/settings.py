@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 from datetime import timedelta
 import os
+import sys
 from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -129,11 +130,15 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "root.utils.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
@@ -152,6 +157,25 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Shared cache tier for tenant/membership lookups and token revocation stamps;
+# must be shared across processes for revocation to reach every worker.
+# The test runner gets a per-process LocMemCache so it doesn't need Redis.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+
+if TESTING:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL", "redis://127.0.0.1:6379/1"),
+        }
+    }
+
 SWAGGER_SETTINGS = {
    'SECURITY_DEFINITIONS': {
       'Basic': {
@@ -259,4 +283,107 @@ RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET')
 "807059928475-j1dgg1bfjpvjrv5napccv44tti8imv73.apps.googleusercontent.com"
 
 
-GOOGLE_CLIENT_ID = os.getenv('807059928475-j1dgg1bfjpvjrv5napccv44tti8imv73.apps.googleusercontent.com')
\ No newline at end of file
+GOOGLE_CLIENT_ID = os.getenv('807059928475-j1dgg1bfjpvjrv5napccv44tti8imv73.apps.googleusercontent.com')
+
+# Tenant resolution cache (apps/tenants/cache.py)
+TENANT_CACHE_LOCAL_MAXSIZE = 1024
+TENANT_CACHE_LOCAL_TTL = 30      # seconds; bounds staleness in other processes
+TENANT_CACHE_SHARED_TTL = 300    # seconds
+
+# Versioned list response cache (apps/tenants/cache.py response_cache). Model
+# signals bump per-scope version counters; stale entries just expire.
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TTL = 300          # seconds an entry lives if its scopes never change
+RESPONSE_CACHE_LOCK_TIMEOUT = 10  # seconds a single-flight fill may hold its lock
+RESPONSE_CACHE_WAIT = 2.0         # seconds other misses wait for that fill before computing too
+
+# Path prefixes that skip TenantMiddleware entirely (see root/urls.py for the
+# un-slashed include prefixes, e.g. 'users' + 'login' -> /userslogin)
+TENANT_EXEMPT_PATHS = (
+    "/swagger",
+    "/api/docs/",
+    "/userslogin",
+    "/userstoken/refresh",
+)
+
+# Per-request membership resolver cache (apps/tenants/membership.py)
+MEMBERSHIP_CACHE_LOCAL_MAXSIZE = 4096
+MEMBERSHIP_CACHE_LOCAL_TTL = 5
+MEMBERSHIP_CACHE_SHARED_TTL = 60
+
+# Trust org_id/role JWT claims (checked against the membership version stamp)
+# instead of querying OrganizationMembership; downgrades apply within
+# TENANT_JWT_CLAIMS_VERSION_TTL seconds.
+TENANT_AUTHZ_TRUST_JWT_CLAIMS = True
+TENANT_JWT_CLAIMS_VERSION_TTL = 5
+
+# Cached user snapshot used by CachedJWTAuthentication (apps/users/authentication.py)
+USER_SNAPSHOT_CACHE_LOCAL_MAXSIZE = 4096
+USER_SNAPSHOT_CACHE_LOCAL_TTL = 30
+USER_SNAPSHOT_CACHE_SHARED_TTL = 300
+
+# Task list keyset pagination (?page_size= is clamped to TASK_MAX_PAGE_SIZE)
+TASK_PAGE_SIZE = 50
+TASK_MAX_PAGE_SIZE = 200
+
+# Task board (GET tasks/<project>/board/): tasks per status column (?page_size=)
+TASK_BOARD_COLUMN_SIZE = 20
+TASK_BOARD_MAX_COLUMN_SIZE = 100
+# Task board socket (ws/tasks/<project>/): seconds between membership re-checks
+TASK_BOARD_AUTH_RECHECK_INTERVAL = 15
+
+# Delta sync (GET tasks/<project>/changes/)
+TASK_SYNC_PAGE_SIZE = 500
+TASK_SYNC_MAX_PAGE_SIZE = 2000
+TASK_SYNC_SETTLE_SECONDS = 2.0  # changes younger than this wait for the next sync (in-flight transactions)
+
+TASK_BULK_MAX_ITEMS = 500
+
+# Webhook outbox relay (manage.py relay_webhook_outbox)
+WEBHOOK_OUTBOX_BATCH_SIZE = 200
+WEBHOOK_OUTBOX_POLL_INTERVAL = 1.0   # seconds to sleep when the outbox is empty
+WEBHOOK_OUTBOX_CLAIM_TIMEOUT = 60    # seconds before an unfinished claim is re-claimed
+WEBHOOK_OUTBOX_RETENTION = 7 * 24 * 3600  # seconds dispatched rows are kept
+WEBHOOK_COALESCE_WINDOW = 2.0        # seconds task.updated waits so a burst of saves becomes one event
+
+# Per-organization event -> webhook subscriptions index (apps/webhooks/cache.py)
+WEBHOOK_INDEX_CACHE_LOCAL_MAXSIZE = 4096
+WEBHOOK_INDEX_CACHE_LOCAL_TTL = 5      # seconds; other processes see subscription changes within this
+WEBHOOK_INDEX_CACHE_SHARED_TTL = 300
+
+# Worker-side cache of serialized webhook bodies (shared by all subscriptions of an event)
+WEBHOOK_EVENT_BODY_CACHE_SIZE = 1024
+WEBHOOK_EVENT_BODY_CACHE_TTL = 300
+
+# Webhook delivery: "celery" (one job per delivery) or "async" (relay delivers on an event loop)
+WEBHOOK_DELIVERY_MODE = "celery"
+WEBHOOK_DELIVERY_CONCURRENCY = 200     # async mode: requests in flight per relay process
+WEBHOOK_DELIVERY_PER_HOST_LIMIT = 20   # async mode: requests in flight per receiving host
+WEBHOOK_DELIVERY_TIMEOUT = 5.0         # seconds per delivery request, Celery task and async mode
+WEBHOOK_DELIVERY_MAX_PENDING = 10000   # async mode: backpressure on claiming new outbox batches
+
+# Webhook retries and per-subscription circuit breaker (apps/webhooks/health.py)
+WEBHOOK_RETRY_MAX_DELAY = 300              # seconds; retries back off 2**n with jitter up to this
+WEBHOOK_CIRCUIT_FAILURE_THRESHOLD = 5      # consecutive failures that open the circuit
+WEBHOOK_CIRCUIT_COOLDOWN = 30              # seconds open before the first half-open probe
+WEBHOOK_CIRCUIT_MAX_COOLDOWN = 3600        # cooldown doubles on each reopening, up to this
+WEBHOOK_CIRCUIT_PROBE_TIMEOUT = 60         # a probe without an outcome after this is retried
+WEBHOOK_PARKED_RELEASE_INTERVAL = 5.0      # relay: seconds between probe/release passes
+
+# Batched webhook delivery (WebhookSubscription.delivery_mode = "batched")
+WEBHOOK_BATCH_INFLIGHT_TIMEOUT = 900  # seconds; resend a batch whose outcome never came back
+
+# Per-tenant fair queuing in the outbox relay (apps/webhooks/scheduling.py)
+WEBHOOK_FAIR_SCHEDULING = True
+WEBHOOK_DEFAULT_WEIGHT = 1        # organizations without a plan
+WEBHOOK_DEFAULT_RATE = 50.0       # deliveries/second
+WEBHOOK_DEFAULT_BURST = 500
+WEBHOOK_FAIR_SHARE_CACHE_TTL = 60  # seconds plan limits are cached by the relay
+
+# Webhook delivery log (apps/webhooks/deliverylog.py, GET webhooks/<id>/deliveries/)
+WEBHOOK_DELIVERY_LOG_BATCH_SIZE = 200       # buffered attempts per bulk INSERT
+WEBHOOK_DELIVERY_LOG_FLUSH_INTERVAL = 2.0   # seconds before a partial buffer is written
+WEBHOOK_DELIVERY_LOG_RESPONSE_CHARS = 1024  # response body kept per attempt
+WEBHOOK_DELIVERY_LOG_RETENTION = 3 * 24 * 3600  # seconds; pruned by the outbox relay
+WEBHOOK_DELIVERY_LOG_PAGE_SIZE = 50
+WEBHOOK_DELIVERY_LOG_MAX_PAGE_SIZE = 200
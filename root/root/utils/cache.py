@@ -0,0 +1,220 @@
+# root/utils/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache as shared_cache
+
+# Stored in place of a missing row so "not found" is cached too.
+_NOT_FOUND = "__two_tier_cache_not_found__"
+
+
+class LocalTTLCache:
+    """
+    Small thread-safe LRU with a per-entry TTL, used as the in-process tier.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TwoTierCache:
+    """
+    Per-process LRU in front of the Django cache backend.
+
+    Behavior:
+    - get_or_load() checks the local LRU, then the shared cache, then calls the loader.
+    - Loader results (including None) are written back to both tiers.
+    - invalidate() drops the key from the local LRU and the shared cache. Other
+      processes keep their local copy until its TTL runs out, so keep local_ttl short.
+    """
+
+    def __init__(self, namespace, local_maxsize=1024, local_ttl=30, shared_ttl=300):
+        self.namespace = namespace
+        self.shared_ttl = shared_ttl
+        self.local = LocalTTLCache(maxsize=local_maxsize, ttl=local_ttl)
+        self._counters = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+        self._counters_lock = threading.Lock()
+
+    def _shared_key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _count(self, name):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def get_or_load(self, key, loader):
+        value = self.local.get(key, None)
+        if value is not None:
+            self._count("local_hits")
+            return None if value == _NOT_FOUND else value
+
+        value = shared_cache.get(self._shared_key(key))
+        if value is not None:
+            self._count("shared_hits")
+            self.local.set(key, value)
+            return None if value == _NOT_FOUND else value
+
+        self._count("misses")
+        loaded = loader()
+        stored = _NOT_FOUND if loaded is None else loaded
+        shared_cache.set(self._shared_key(key), stored, self.shared_ttl)
+        self.local.set(key, stored)
+        return loaded
+
+    def invalidate(self, key):
+        self._count("invalidations")
+        self.local.delete(key)
+        shared_cache.delete(self._shared_key(key))
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        lookups = counters["local_hits"] + counters["shared_hits"] + counters["misses"]
+        hits = counters["local_hits"] + counters["shared_hits"]
+        counters["local_size"] = len(self.local)
+        counters["hit_ratio"] = (hits / lookups) if lookups else 0.0
+        return counters
+
+    def reset_stats(self):
+        with self._counters_lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+class VersionedCache:
+    """
+    Shared-cache entries that depend on named version scopes.
+
+    Behavior:
+    - Every key embeds the current counter of each scope it depends on, so
+      bump(scope) invalidates all of them with one INCR: nothing is scanned
+      or deleted, stale entries are never read again and age out after `ttl`.
+    - Counters are stored without expiry. One that is missing (never bumped,
+      or evicted) starts from the current time in nanoseconds, so an evicted
+      counter can never come back at a value old entries were stored under.
+    - Single flight: on a miss one caller takes a short lock (cache.add) and
+      computes; concurrent callers poll for its result for up to `wait`
+      seconds and only compute themselves if it does not show up.
+    """
+
+    def __init__(self, namespace, ttl=300, lock_timeout=10, wait=2.0, poll_interval=0.02):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self._counters = {"hits": 0, "misses": 0, "waits": 0, "bumps": 0}
+        self._counters_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _version_key(self, scope):
+        return f"{self.namespace}:version:{scope}"
+
+    def versions(self, scopes):
+        """{scope: counter}, one round trip (two for scopes seen for the first time)."""
+        keys = {self._version_key(scope): scope for scope in scopes}
+        found = shared_cache.get_many(list(keys))
+        missing = [key for key in keys if key not in found]
+        if missing:
+            for key in missing:
+                shared_cache.add(key, time.time_ns(), None)
+            # re-read: another process may have won the add
+            found.update(shared_cache.get_many(missing))
+        # still missing only if evicted right away: use a value nothing was stored under
+        return {scope: found.get(key, time.time_ns()) for key, scope in keys.items()}
+
+    def bump(self, *scopes):
+        for scope in scopes:
+            self._count("bumps")
+            key = self._version_key(scope)
+            try:
+                shared_cache.incr(key)
+            except ValueError:
+                # never read yet: nothing was cached under it
+                shared_cache.add(key, time.time_ns(), None)
+
+    def key(self, name, scopes, vary=()):
+        versions = self.versions(scopes)
+        parts = [name, *(f"{scope}={versions[scope]}" for scope in sorted(scopes)), *map(str, vary)]
+        digest = hashlib.blake2b("\x1f".join(parts).encode(), digest_size=20).hexdigest()
+        return f"{self.namespace}:{digest}"
+
+    def get_or_compute(self, name, scopes, compute, vary=()):
+        """
+        Cached compute() for `name` under the current versions of `scopes`;
+        `vary` holds whatever else the value depends on (user, query params).
+        Exceptions from compute() propagate and nothing is cached.
+        """
+        key = self.key(name, scopes, vary)
+        value = shared_cache.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        lock_key = f"{key}:lock"
+        owner = shared_cache.add(lock_key, 1, self.lock_timeout)
+        if not owner:
+            self._count("waits")
+            deadline = time.monotonic() + self.wait
+            delay = self.poll_interval
+            while time.monotonic() < deadline:
+                time.sleep(delay)
+                value = shared_cache.get(key)
+                if value is not None:
+                    return value
+                delay = min(delay * 2, 0.2)
+            # the owner is slow or gone: compute without the lock rather than fail
+
+        self._count("misses")
+        try:
+            value = compute()
+            shared_cache.set(key, value, self.ttl)
+            return value
+        finally:
+            if owner:
+                shared_cache.delete(lock_key)
+
+    def stats(self):
+        with self._counters_lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_ratio"] = (counters["hits"] / lookups) if lookups else 0.0
+        return counters
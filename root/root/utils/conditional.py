@@ -0,0 +1,70 @@
+# root/utils/conditional.py
+import hashlib
+from collections import namedtuple
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from root.utils.custom_response import build_envelope
+
+# ETag and Last-Modified of one resource version. The ETag is strong: it
+# names the version of the resource in `meta`, which is the same for every
+# request; the envelope around it (timestamp, request_id) is per response.
+Validators = namedtuple("Validators", ["etag", "last_modified"])
+
+CONDITIONAL_HEADERS = (
+    "HTTP_IF_MATCH",
+    "HTTP_IF_NONE_MATCH",
+    "HTTP_IF_MODIFIED_SINCE",
+    "HTTP_IF_UNMODIFIED_SINCE",
+)
+
+
+def make_validators(*parts, last_modified=None):
+    """Validators from the values that identify a version, e.g. (pk, updated_at)."""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return Validators(f'"{digest}"', last_modified)
+
+
+def is_conditional(request):
+    """True when the request carries any If-* precondition header."""
+    return any(header in request.META for header in CONDITIONAL_HEADERS)
+
+
+def conditional_response(request, validators):
+    """
+    Evaluate the request's preconditions against the current validators,
+    in the RFC 9110 order (Django's get_conditional_response). Returns a
+    304 / 412 response, or None when the request should go ahead.
+
+    Last-Modified has one-second resolution, so If-Modified-Since alone can
+    miss a change made in the same second; If-None-Match wins when both are sent.
+    """
+    last_modified = validators.last_modified
+    response = get_conditional_response(
+        request,
+        etag=validators.etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is None:
+        return None
+    if response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+        response = Response(
+            build_envelope(
+                "Precondition failed", {}, {"detail": "The resource has changed since it was fetched"},
+                status.HTTP_412_PRECONDITION_FAILED, request, success=False,
+            ),
+            status=status.HTTP_412_PRECONDITION_FAILED,
+        )
+    return with_validators(response, validators)
+
+
+def with_validators(response, validators):
+    """Set ETag / Last-Modified; clients may keep the body but must revalidate it."""
+    response["ETag"] = validators.etag
+    if validators.last_modified:
+        response["Last-Modified"] = http_date(validators.last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
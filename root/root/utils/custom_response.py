@@ -1,17 +1,45 @@
 from rest_framework.response import Response
-from datetime import datetime
+from datetime import datetime, timezone
+import re
 import uuid
 
-def custom_response(message, data=None, status_code=200, request=None, error=None):
-    response_data = {
+REQUEST_ID_HEADER = "X-Request-ID"
+MAX_REQUEST_ID_LENGTH = 128
+# what tracing ids look like (UUIDs, hex, base64url, dotted/colon spans); no
+# whitespace or control characters that could forge log lines
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:/+=-]+")
+
+
+def get_request_id(request=None):
+    """Reuse the caller's X-Request-ID when it looks like one, otherwise mint a new one."""
+    if request is not None:
+        incoming = request.headers.get(REQUEST_ID_HEADER)
+        if incoming and len(incoming) <= MAX_REQUEST_ID_LENGTH and REQUEST_ID_PATTERN.fullmatch(incoming):
+            return incoming
+    return uuid.uuid4()
+
+
+def build_envelope(message, meta=None, error=None, status_code=200, request=None, success=None):
+    """
+    Build the standard response envelope shared by custom_response and
+    apps.tenants.response. timestamp/request_id are left as datetime/UUID
+    objects; the renderer formats them (see root/utils/renderers.py).
+    """
+    envelope = {
         "message": message,
-        "meta": data if data else {},
+        "meta": meta if meta else {},
         "error": error,
         "status_code": status_code,
-        "timestamp": datetime.utcnow().isoformat() + "Z",
-        "request_id": str(uuid.uuid4()),
-        "path": request.path if request else None,
-        "method": request.method if request else None,
-        "version": "v1"
     }
-    return Response(response_data, status=status_code)
+    if success is not None:
+        envelope["success"] = success
+    envelope["timestamp"] = datetime.now(timezone.utc)
+    envelope["request_id"] = get_request_id(request)
+    envelope["path"] = request.path if request else None
+    envelope["method"] = request.method if request else None
+    envelope["version"] = "v1"
+    return envelope
+
+
+def custom_response(message, data=None, status_code=200, request=None, error=None):
+    return Response(build_envelope(message, data, error, status_code, request), status=status_code)
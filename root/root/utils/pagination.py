@@ -0,0 +1,119 @@
+# root/utils/pagination.py
+import base64
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _to_cursor_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    return str(value)
+
+
+class KeysetPaginator:
+    """
+    Keyset (seek) pagination: each page continues strictly after the last row
+    of the previous one, so page N costs the same as page 1 given an index on
+    the ordering columns.
+
+    ordering: field names with an optional "-" prefix, e.g. ("-created_at", "-id").
+    The last field must be unique so the ordering is total.
+    Cursors are opaque url-safe tokens encoding the last row's ordering values.
+    """
+
+    def __init__(self, ordering=("-created_at", "-id"), page_size=50, max_page_size=200):
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip("-") for name in self.ordering)
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    def encode_cursor(self, values):
+        raw = json.dumps([_to_cursor_value(v) for v in values], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, token, model=None):
+        """
+        Ordering values of a cursor token. With `model`, each value is also
+        converted by its model field (to_python), so a tampered cursor is an
+        InvalidCursor rather than an error inside the query.
+        """
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        except (ValueError, TypeError) as exc:
+            raise InvalidCursor("Invalid cursor") from exc
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor("Invalid cursor")
+        if model is not None:
+            values = [self._to_python(model, name, value) for name, value in zip(self.fields, values)]
+        return values
+
+    @staticmethod
+    def _to_python(model, name, value):
+        try:
+            field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        except FieldDoesNotExist as exc:
+            raise InvalidCursor("Invalid cursor") from exc
+        if value is None and not field.null:
+            raise InvalidCursor("Invalid cursor")
+        try:
+            return field.to_python(value)
+        except (ValidationError, ValueError, TypeError, AttributeError) as exc:
+            raise InvalidCursor("Invalid cursor") from exc
+
+    def get_page_size(self, request):
+        raw = request.query_params.get("page_size") if request is not None else None
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def seek_filter(self, values):
+        """Q selecting rows strictly after `values` in self.ordering."""
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            field = self.fields[i]
+            lookup = "lt" if name.startswith("-") else "gt"
+            branch = Q(**{self.fields[j]: values[j] for j in range(i)})
+            branch &= Q(**{f"{field}__{lookup}": values[i]})
+            condition |= branch
+        return condition
+
+    def paginate(self, queryset, request=None, cursor=None, page_size=None):
+        """
+        Return (rows, next_cursor). Rows are whatever the queryset yields
+        (instances or .values() dicts); next_cursor is None on the last page.
+        Raises InvalidCursor for a malformed cursor.
+        """
+        if cursor is None and request is not None:
+            cursor = request.query_params.get("cursor")
+        size = page_size or self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(self.decode_cursor(cursor, queryset.model)))
+
+        rows = list(queryset[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            if isinstance(last, dict):
+                values = [last[f] for f in self.fields]
+            else:
+                values = [getattr(last, f) for f in self.fields]
+            next_cursor = self.encode_cursor(values)
+        return rows, next_cursor
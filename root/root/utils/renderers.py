@@ -0,0 +1,34 @@
+# root/utils/renderers.py
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # orjson handles dict/list/str subclasses, UUID, datetime/date natively;
+    # everything else (Decimal, lazy translations, QuerySets, ...) goes
+    # through DRF's encoder so output matches the stock JSONRenderer.
+    return _fallback_encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Drop-in replacement for rest_framework.renderers.JSONRenderer backed by orjson.
+    Aware UTC datetimes render with a trailing "Z" like DRF's encoder.
+    """
+    media_type = "application/json"
+    format = "json"
+    charset = None
+    options = orjson.OPT_UTC_Z
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        try:
+            return orjson.dumps(data, default=_default, option=self.options)
+        except orjson.JSONEncodeError:
+            # non-str dict keys (e.g. per-index error maps) are rare; only pay
+            # for OPT_NON_STR_KEYS when they actually occur
+            return orjson.dumps(data, default=_default, option=self.options | orjson.OPT_NON_STR_KEYS)
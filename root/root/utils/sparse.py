@@ -0,0 +1,89 @@
+# root/utils/sparse.py
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.serializers import BaseSerializer
+
+
+class InvalidFieldSelection(ValueError):
+    pass
+
+
+def parse_field_list(request, param, allowed):
+    """
+    Parse a comma-separated query param (?fields=id,title / ?expand=project).
+    Returns None when the param is absent, otherwise the requested names in
+    order. Raises InvalidFieldSelection for names outside `allowed`.
+    """
+    raw = request.query_params.get(param)
+    if raw is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise InvalidFieldSelection(
+            f"Unknown {param}: {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}"
+        )
+    return names
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin for ?fields= / ?expand=.
+
+    fields: output field names to keep (None keeps all).
+    expand: {field_name: serializer instance} replacing e.g. a PK field with
+            the nested object; expanded fields are always kept.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, nested in (expand or {}).items():
+            self.fields[name] = nested
+        if fields is not None:
+            keep = set(fields) | set(expand or {})
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+    @classmethod
+    def readable_field_names(cls):
+        return {name for name, field in cls().fields.items() if not field.write_only}
+
+
+def expand_fields(names, available):
+    """Fresh read-only nested serializers for the requested ?expand= names."""
+    return {name: available[name](read_only=True) for name in names or ()}
+
+
+def narrow_queryset(queryset, serializer):
+    """
+    Restrict a queryset to what `serializer` will read: only() the concrete
+    columns behind its readable fields and select_related() every nested
+    serializer, so neither unused columns nor per-row lookups hit the DB.
+    """
+    model = queryset.model
+    columns = {model._meta.pk.name}
+    related = []
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+        if isinstance(field, BaseSerializer):
+            related.append(field.source)
+            nested_model = field.Meta.model
+            columns.add(f"{field.source}__{nested_model._meta.pk.name}")
+            columns.update(
+                f"{field.source}__{nested.source}"
+                for nested in field.fields.values()
+                if not nested.write_only and _is_concrete(nested_model, nested.source)
+            )
+        elif _is_concrete(model, field.source):
+            columns.add(field.source)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def _is_concrete(model, name):
+    try:
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False